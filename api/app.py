@@ -22,20 +22,30 @@ from blueprints.attendance import attendance_bp
 from blueprints.qrcode import qrcode_bp
 from blueprints.scanner import scanner_bp
 from blueprints.debug import debug_bp
+from blueprints.metrics import metrics_bp
+from blueprints.jobs import jobs_bp
+from blueprints.search import search_bp
+from blueprints.roster import roster_bp
 
 # Import config
-from config import API_CONFIG
+from config import API_CONFIG, SCHEMA_CONFIG, BACKUP_CONFIG, SEARCH_CONFIG, ABSENTEE_CONFIG, REKAP_CONFIG
 
+from utils.logger import setup_logging
+from utils.metrics import init_metrics
+from utils.database import init_query_stats
+from utils.cache import init_cache_sync
+from utils.schema import check_schema_async
+from utils.backup import start_scheduler as start_backup_scheduler
+from utils.jobs import recover_interrupted as recover_interrupted_jobs
+from utils.health import start_health_probe
+from utils.sampler import start_sampler
+from utils.search import build_index_async as build_search_index
+from utils.absentee import start_scheduler as start_alpha_scheduler
+from utils.rekap import ensure_rekap_async
 
-# Setup logging
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
-    handlers=[
-        logging.FileHandler("/var/www/html/api/logs/api.log"),
-        logging.StreamHandler(),
-    ],
-)
+
+# Setup logging (QueueHandler -> QueueListener, file dirotasi)
+setup_logging()
 
 logger = logging.getLogger(__name__)
 
@@ -52,6 +62,15 @@ else:
 # Flask app
 CORS(app)
 
+# Request timing middleware (latency histogram per route)
+init_metrics(app)
+
+# Header X-Query-Count / X-Query-Time-Ms per request
+init_query_stats(app)
+
+# Invalidasi cache dari worker lain (restore, fix-nisn, cleanup)
+init_cache_sync(app)
+
 # Register all blueprints
 app.register_blueprint(auth_bp)
 app.register_blueprint(system_bp)
@@ -62,6 +81,39 @@ app.register_blueprint(attendance_bp)
 app.register_blueprint(qrcode_bp)
 app.register_blueprint(scanner_bp)
 app.register_blueprint(debug_bp)
+app.register_blueprint(metrics_bp)
+app.register_blueprint(jobs_bp)
+app.register_blueprint(search_bp)
+app.register_blueprint(roster_bp)
+
+# Cek (dan buat) index yang dibutuhkan query hot path tanpa memblokir startup
+if SCHEMA_CONFIG['check_on_startup']:
+    check_schema_async(apply=SCHEMA_CONFIG['apply_indexes_on_startup'])
+
+# Probe database berkala untuk /api/system/health dan /ready
+start_health_probe()
+
+# Sample CPU/memori/disk + jumlah baris tabel untuk /api/system/info
+start_sampler()
+
+# Index pencarian siswa/guru untuk /api/search
+if SEARCH_CONFIG['build_on_startup']:
+    build_search_index()
+
+# Tabel counter absensi per siswa + trigger (rebuild jika baru dibuat)
+if REKAP_CONFIG['ensure_on_startup']:
+    ensure_rekap_async()
+
+# Job yang terhenti karena restart ditandai failed
+recover_interrupted_jobs()
+
+# Backup terjadwal (full + incremental) di background
+if BACKUP_CONFIG['schedule']:
+    start_backup_scheduler()
+
+# Siswa tanpa absensi ditandai Alpha setiap akhir hari sekolah
+if ABSENTEE_CONFIG['schedule']:
+    start_alpha_scheduler()
 
 # Root endpoint - API Documentation
 @app.route('/', methods=['GET'])
@@ -114,6 +166,13 @@ def index():
                 "student": "GET /api/attendance/student/<nis>",
                 "statistics": "GET /api/attendance/statistics",
                 "summary_by_class": "GET /api/attendance/summary/by-class",
+                "matrix": "GET /api/attendance/matrix?kelas_id=&month=YYYY-MM",
+                "absent": "GET /api/attendance/absent",
+                "mark_absent": "POST /api/attendance/absent/mark",
+                "schedules": "GET|PUT|DELETE /api/attendance/schedules",
+                "analytics_students": "GET /api/attendance/analytics/students",
+                "analytics_classes": "GET /api/attendance/analytics/classes",
+                "analytics_export": "POST /api/attendance/analytics/export",
                 "manual": "POST /api/attendance/manual",
                 "update": "PUT /api/attendance/<id>",
                 "delete": "DELETE /api/attendance/<id>"
@@ -122,6 +181,7 @@ def index():
                 "generate": "GET /api/qr/generate/<nis>",
                 "bulk_generate": "POST /api/qr/bulk/generate",
                 "verify": "POST /api/qr/verify",
+                "revoke": "POST /api/qr/revoke/<nis>",
                 "history": "GET /api/qr/history/<nis>",
                 "print": "GET /api/qr/print/<nis>",
                 "validate_nisn": "POST /api/qr/validate-nisn"
@@ -134,17 +194,41 @@ def index():
             },
             "system": {
                 "health": "GET /api/system/health",
+                "live": "GET /api/system/live",
+                "ready": "GET /api/system/ready",
+                "info": "GET /api/system/info",
                 "test": "GET /api/system/test"
             },
             "debug": {
                 "table_structure": "GET /api/debug/table-structure",
                 "backup": "POST /api/debug/backup",
+                "backup_status": "GET /api/debug/backup/<id>",
                 "backups": "GET /api/debug/backups",
                 "restore": "POST /api/debug/restore",
                 "logs": "GET /api/debug/logs",
                 "performance": "GET /api/debug/performance",
+                "indexes": "GET|POST /api/debug/indexes",
+                "archive": "GET|POST /api/debug/archive",
                 "fix_nisn": "POST /api/debug/fix-nisn",
-                "cleanup": "POST /api/debug/cleanup"
+                "cleanup": "POST /api/debug/cleanup",
+                "rekap_rebuild": "POST /api/debug/rekap/rebuild"
+            },
+            "metrics": {
+                "prometheus": "GET /metrics"
+            },
+            "jobs": {
+                "list": "GET /api/jobs",
+                "status": "GET /api/jobs/<id>",
+                "cancel": "POST /api/jobs/<id>/cancel"
+            },
+            "search": {
+                "search": "GET /api/search?q=&type=siswa|guru",
+                "status": "GET /api/search/status"
+            },
+            "roster": {
+                "snapshot": "GET /api/roster/snapshot",
+                "delta": "GET /api/roster/delta?since=<version>",
+                "status": "GET /api/roster/status"
             }
         }
     })
@@ -190,6 +274,7 @@ def create_directories():
         "/var/www/html/api/logs",
         "/var/www/html/api/qr_codes",
         "/var/www/html/api/backups",
+        "/var/www/html/api/jobs",
     ]
 
     for directory in directories:
@@ -218,6 +303,10 @@ if __name__ == "__main__":
     logger.info("  - qrcode")
     logger.info("  - scanner")
     logger.info("  - debug")
+    logger.info("  - metrics")
+    logger.info("  - jobs")
+    logger.info("  - search")
+    logger.info("  - roster")
     logger.info("=" * 60)
 
     # Run the application
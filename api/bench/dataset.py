@@ -0,0 +1,313 @@
+#!/usr/bin/env python3
+"""
+Generator data sekolah sintetis untuk benchmark Absensi API
+
+Menghasilkan tabel jurusan, guru, kelas, siswa dan absensi dengan pola
+yang realistis: distribusi jam datang per siswa, kecenderungan absen
+per siswa (sakit/izin/alpha), hari sekolah tanpa libur semester, dan
+NISN 10 digit yang valid dan unik. Data absensi dibuat secara streaming
+sehingga jutaan baris bisa dimuat tanpa menampung semuanya di memori.
+
+Contoh (database lokal, tabel dikosongkan terlebih dahulu):
+
+    python -m bench.dataset --students 5000 --days 540 --truncate
+
+Modul ini juga bisa dipakai langsung oleh benchmark:
+
+    from bench.dataset import SchoolDataset
+    dataset = SchoolDataset(students=1000, days=60, seed=1)
+    for batch in dataset.iter_absensi(): ...
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import date, datetime, timedelta
+
+import mysql.connector
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config import DB_CONFIG  # noqa: E402
+
+JURUSAN = [
+    ("TKJ", "Teknik Komputer dan Jaringan"),
+    ("RPL", "Rekayasa Perangkat Lunak"),
+    ("TITL", "Teknik Instalasi Tenaga Listrik"),
+    ("AK", "Akuntansi"),
+    ("OTKP", "Otomatisasi dan Tata Kelola Perkantoran"),
+    ("TBSM", "Teknik dan Bisnis Sepeda Motor"),
+]
+
+NAMA_DEPAN_L = [
+    "Ahmad", "Budi", "Dimas", "Eko", "Fajar", "Gilang", "Hendra", "Ilham", "Joko",
+    "Krisna", "Lutfi", "Muhammad", "Nanda", "Oki", "Putra", "Rizky", "Satria",
+    "Taufik", "Wahyu", "Yoga", "Zainal", "Arif", "Bayu", "Dedi", "Rahman",
+]
+NAMA_DEPAN_P = [
+    "Aisyah", "Bunga", "Citra", "Dewi", "Elsa", "Fitri", "Gita", "Hana", "Indah",
+    "Jihan", "Kartika", "Lestari", "Maya", "Nur", "Putri", "Rina", "Sari",
+    "Tiara", "Umi", "Vina", "Wulan", "Yuni", "Zahra", "Ayu", "Nabila",
+]
+NAMA_BELAKANG = [
+    "Pratama", "Saputra", "Wijaya", "Hidayat", "Kurniawan", "Setiawan", "Nugroho",
+    "Santoso", "Lestari", "Rahmawati", "Permata", "Maharani", "Syahputra",
+    "Ramadhan", "Firmansyah", "Kusuma", "Utami", "Anggraini", "Siregar", "Harahap",
+]
+LOKASI_SCANNER = ["Gerbang Utama", "Gerbang Belakang", "Lobi"]
+
+
+def school_days(start, days, weekdays=(0, 1, 2, 3, 4)):
+    """Yield `days` hari sekolah mulai `start`, melewati libur semester"""
+    current = start
+    produced = 0
+    while produced < days:
+        # Libur akhir tahun ajaran (20 Jun - 14 Jul) dan semester (20 Des - 5 Jan)
+        holiday = (
+            (current.month == 6 and current.day >= 20)
+            or (current.month == 7 and current.day <= 14)
+            or (current.month == 12 and current.day >= 20)
+            or (current.month == 1 and current.day <= 5)
+        )
+        if current.weekday() in weekdays and not holiday:
+            yield current
+            produced += 1
+        current += timedelta(days=1)
+
+
+def academic_year(day):
+    """Tahun ajaran (Juli - Juni) dalam format '2025/2026'"""
+    start = day.year if day.month >= 7 else day.year - 1
+    return f"{start}/{start + 1}"
+
+
+class SchoolDataset:
+    """Dataset sekolah sintetis yang deterministik untuk seed yang sama"""
+
+    def __init__(self, students=1000, days=180, start_date=None, class_size=36,
+                 weekdays=(0, 1, 2, 3, 4), bell_time="07:00", seed=42,
+                 alpha_rows=True):
+        self.n_students = students
+        self.n_days = days
+        self.class_size = class_size
+        self.weekdays = tuple(weekdays)
+        self.alpha_rows = alpha_rows
+        self.seed = seed
+        self.rng = random.Random(seed)
+
+        hour, minute = (int(part) for part in bell_time.split(":"))
+        self.bell_minute = hour * 60 + minute
+
+        if start_date is None:
+            # Mundur cukup jauh agar `days` hari sekolah berakhir sekitar hari ini
+            start_date = date.today() - timedelta(days=int(days * 7 / len(self.weekdays) * 1.15))
+        self.start_date = start_date
+
+        self.jurusan = []
+        self.guru = []
+        self.kelas = []
+        self.siswa = []
+        self._profiles = []
+        self._build_master_data()
+
+    # -------------------------------------------
+    # Master data
+    # -------------------------------------------
+    def _random_name(self, gender):
+        first = self.rng.choice(NAMA_DEPAN_L if gender == "L" else NAMA_DEPAN_P)
+        return f"{first} {self.rng.choice(NAMA_BELAKANG)}"
+
+    def _build_master_data(self):
+        rng = self.rng
+        year = academic_year(self.start_date)
+
+        self.jurusan = [(i + 1, kode, nama) for i, (kode, nama) in enumerate(JURUSAN)]
+
+        n_classes = max(1, -(-self.n_students // self.class_size))
+        n_guru = max(n_classes + 10, int(n_classes * 1.6))
+        for guru_id in range(1, n_guru + 1):
+            gender = rng.choice("LP")
+            nama = self._random_name(gender)
+            nip = f"19{rng.randint(70, 99)}{rng.randint(1, 12):02d}{rng.randint(1, 28):02d}{rng.randint(10**9, 10**10 - 1)}"
+            telp = f"08{rng.randint(10**9, 10**10 - 1)}"
+            email = f"{nama.lower().replace(' ', '.')}{guru_id}@sekolah.sch.id"
+            self.guru.append((guru_id, nip[:18], nama, telp, email))
+
+        # Kelas dibagi merata ke 3 tingkat dan semua jurusan
+        counters = {}
+        for kelas_id in range(1, n_classes + 1):
+            tingkat = str((kelas_id - 1) % 3 + 1)
+            jurusan_id, kode, _ = self.jurusan[((kelas_id - 1) // 3) % len(self.jurusan)]
+            counters[(tingkat, kode)] = counters.get((tingkat, kode), 0) + 1
+            roman = {"1": "X", "2": "XI", "3": "XII"}[tingkat]
+            nama_kelas = f"{roman} {kode} {counters[(tingkat, kode)]}"
+            self.kelas.append((kelas_id, jurusan_id, tingkat, nama_kelas, kelas_id, year))
+
+        used_nisn = set()
+        for siswa_id in range(1, self.n_students + 1):
+            kelas = self.kelas[(siswa_id - 1) % n_classes]
+            gender = rng.choice("LP")
+            birth_year = self.start_date.year - 15 - int(kelas[2])
+            while True:
+                nisn = f"{birth_year % 1000:03d}{rng.randint(0, 9999999):07d}"
+                if nisn not in used_nisn:
+                    used_nisn.add(nisn)
+                    break
+            nis = str(10000 + siswa_id)
+            self.siswa.append((siswa_id, nis, nisn, self._random_name(gender), kelas[3], kelas[0], gender, 1))
+
+            # Profil perilaku per siswa: rata-rata jam datang dan kecenderungan absen
+            self._profiles.append((
+                rng.gauss(-12, 6),               # rata-rata datang relatif jam masuk (menit)
+                abs(rng.gauss(4, 2)) + 1,        # variasi harian (menit)
+                min(0.4, rng.betavariate(1.2, 30)),  # peluang tidak hadir per hari
+            ))
+
+    # -------------------------------------------
+    # Absensi (streaming)
+    # -------------------------------------------
+    def iter_absensi(self, batch_size=5000):
+        """Yield batch baris absensi (tanpa id) urut per tanggal"""
+        rng = random.Random(self.seed + 1)
+        batch = []
+
+        for day in school_days(self.start_date, self.n_days, self.weekdays):
+            # Hari tertentu (hujan, ujian, ...) menggeser jam datang semua siswa
+            day_shift = rng.gauss(0, 3)
+            for (siswa_id, nis, *_), (mean, spread, absent_rate) in zip(self.siswa, self._profiles):
+                if rng.random() < absent_rate:
+                    reason = rng.random()
+                    if reason < 0.45:
+                        status, metode = "Sakit", "manual"
+                    elif reason < 0.8:
+                        status, metode = "Izin", "manual"
+                    elif self.alpha_rows:
+                        status, metode = "Alpha", "manual"
+                    else:
+                        continue
+                    minute = self.bell_minute + rng.randint(0, 120)
+                    lokasi = None
+                else:
+                    minute = self.bell_minute + mean + day_shift + rng.gauss(0, spread)
+                    minute = max(self.bell_minute - 75, min(minute, self.bell_minute + 90))
+                    status = "Terlambat" if minute > self.bell_minute else "Hadir"
+                    metode = "scanner"
+                    lokasi = rng.choice(LOKASI_SCANNER)
+
+                seconds = int(minute * 60) + rng.randint(0, 59)
+                waktu = f"{seconds // 3600:02d}:{seconds % 3600 // 60:02d}:{seconds % 60:02d}"
+                batch.append((siswa_id, nis, day, waktu, status, metode, lokasi))
+
+                if len(batch) >= batch_size:
+                    yield batch
+                    batch = []
+
+        if batch:
+            yield batch
+
+
+# ===========================================
+# BULK LOAD
+# ===========================================
+INSERTS = {
+    "jurusan": "INSERT INTO jurusan (id, kode, nama) VALUES (%s, %s, %s)",
+    "guru": "INSERT INTO guru (id, nip, nama, telp, email) VALUES (%s, %s, %s, %s, %s)",
+    "kelas": """INSERT INTO kelas (id, jurusan_id, tingkat, nama_kelas, wali_kelas_id, tahun_ajaran)
+                VALUES (%s, %s, %s, %s, %s, %s)""",
+    "siswa": """INSERT INTO siswa (id, nis, nisn, nama, kelas, kelas_id, gender, card_version)
+                VALUES (%s, %s, %s, %s, %s, %s, %s, %s)""",
+    "absensi": """INSERT INTO absensi (siswa_id, nis, tanggal, waktu, status, metode, scanner_lokasi)
+                  VALUES (%s, %s, %s, %s, %s, %s, %s)""",
+}
+
+
+def load_dataset(dataset, db_config=None, truncate=False, batch_size=5000, progress=print):
+    """Muat dataset ke MySQL dengan executemany per batch (multi-row INSERT)"""
+    conn = mysql.connector.connect(**(db_config or DB_CONFIG))
+    cursor = conn.cursor()
+    stats = {}
+    try:
+        cursor.execute("SET foreign_key_checks = 0")
+        cursor.execute("SET unique_checks = 0")
+
+        if truncate:
+            for table in ("absensi", "siswa", "kelas", "guru", "jurusan"):
+                cursor.execute(f"TRUNCATE TABLE {table}")
+        else:
+            cursor.execute("SELECT COUNT(*) FROM siswa")
+            if cursor.fetchone()[0]:
+                raise RuntimeError("Tabel siswa tidak kosong, gunakan --truncate")
+
+        for table, rows in (("jurusan", dataset.jurusan), ("guru", dataset.guru),
+                            ("kelas", dataset.kelas), ("siswa", dataset.siswa)):
+            for i in range(0, len(rows), batch_size):
+                cursor.executemany(INSERTS[table], rows[i:i + batch_size])
+            conn.commit()
+            stats[table] = len(rows)
+            progress(f"{table}: {len(rows)} baris")
+
+        started = time.perf_counter()
+        total = 0
+        for batch in dataset.iter_absensi(batch_size):
+            cursor.executemany(INSERTS["absensi"], batch)
+            conn.commit()
+            total += len(batch)
+            if total % (batch_size * 20) < batch_size:
+                elapsed = time.perf_counter() - started
+                progress(f"absensi: {total} baris ({total / elapsed:,.0f} baris/detik)")
+        stats["absensi"] = total
+        progress(f"absensi: {total} baris selesai dalam {time.perf_counter() - started:.1f} s")
+    finally:
+        cursor.execute("SET foreign_key_checks = 1")
+        cursor.execute("SET unique_checks = 1")
+        cursor.close()
+        conn.close()
+    return stats
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Generate dan muat data sekolah sintetis")
+    parser.add_argument("--students", type=int, default=5000)
+    parser.add_argument("--days", type=int, default=540, help="Jumlah hari sekolah (+-180 per tahun)")
+    parser.add_argument("--start-date", type=date.fromisoformat, default=None)
+    parser.add_argument("--class-size", type=int, default=36)
+    parser.add_argument("--weekdays", default="0,1,2,3,4",
+                        help="Hari sekolah (0=Senin ... 5=Sabtu)")
+    parser.add_argument("--bell", default="07:00", help="Jam masuk (HH:MM)")
+    parser.add_argument("--no-alpha-rows", action="store_true",
+                        help="Siswa alpha tidak mendapat baris absensi (perilaku scanner lama)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--batch-size", type=int, default=5000)
+    parser.add_argument("--database", default=DB_CONFIG["database"])
+    parser.add_argument("--truncate", action="store_true",
+                        help="Kosongkan tabel jurusan/guru/kelas/siswa/absensi sebelum load")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    dataset = SchoolDataset(
+        students=args.students,
+        days=args.days,
+        start_date=args.start_date,
+        class_size=args.class_size,
+        weekdays=[int(d) for d in args.weekdays.split(",")],
+        bell_time=args.bell,
+        seed=args.seed,
+        alpha_rows=not args.no_alpha_rows,
+    )
+    print(f"[{datetime.now():%H:%M:%S}] Dataset: {len(dataset.siswa)} siswa, {len(dataset.kelas)} kelas, "
+          f"{len(dataset.guru)} guru, {args.days} hari mulai {dataset.start_date} -> {args.database}")
+
+    try:
+        load_dataset(dataset, dict(DB_CONFIG, database=args.database),
+                     truncate=args.truncate, batch_size=args.batch_size)
+    except (RuntimeError, mysql.connector.Error) as e:
+        print(f"Gagal memuat dataset: {e}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
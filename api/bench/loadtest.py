@@ -0,0 +1,324 @@
+#!/usr/bin/env python3
+"""
+Load test Absensi API - simulasi jam masuk sekolah (gate rush)
+
+Mensimulasikan campuran trafik nyata secara paralel:
+  - kiosk scanner : burst POST /api/scan-nisn dan /api/qr/verify, termasuk re-tap
+  - dashboard     : polling GET /api/attendance/today
+  - laporan       : GET statistics, summary/by-class dan detail siswa
+
+Jalankan hanya terhadap API lokal dengan database uji (setiap scan
+menyisipkan baris absensi). Contoh:
+
+    python -m bench.loadtest --duration 60 --kiosks 8 --output bench/baselines/loadtest.json
+    python -m bench.loadtest --duration 60 --kiosks 8 --baseline bench/baselines/loadtest.json
+"""
+
+import argparse
+import json
+import random
+import sys
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime
+
+import requests
+
+BASE_URL = "http://localhost:5000"
+
+# Status yang memang diharapkan dari skenario (bukan error)
+EXPECTED_STATUS = {
+    "scan-nisn": {200, 409},
+    "qr-verify": {200, 409},
+    "attendance-today": {200},
+    "attendance-statistics": {200},
+    "summary-by-class": {200},
+    "student-detail": {200},
+}
+
+
+class Recorder:
+    """Kumpulkan latency dan status per endpoint (thread-safe)"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latencies = defaultdict(list)
+        self.statuses = defaultdict(lambda: defaultdict(int))
+        self.errors = defaultdict(int)
+
+    def record(self, name, elapsed, status):
+        with self.lock:
+            self.latencies[name].append(elapsed)
+            self.statuses[name][status] += 1
+            if status not in EXPECTED_STATUS.get(name, {200}):
+                self.errors[name] += 1
+
+
+def percentile(sorted_values, q):
+    """Nearest-rank percentile dari list yang sudah terurut"""
+    if not sorted_values:
+        return None
+    index = max(0, min(len(sorted_values) - 1, int(round(q * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[index]
+
+
+def timed_request(session, recorder, name, method, url, **kwargs):
+    """Kirim request dan catat hasilnya; status 'exception' untuk error jaringan"""
+    start = time.perf_counter()
+    try:
+        response = session.request(method, url, timeout=30, **kwargs)
+        status = response.status_code
+    except requests.RequestException:
+        response = None
+        status = "exception"
+    recorder.record(name, time.perf_counter() - start, status)
+    return response
+
+
+def login(base_url, username, password):
+    """Login dan return token JWT"""
+    response = requests.post(
+        f"{base_url}/api/auth/login",
+        json={"username": username, "password": password},
+        timeout=10,
+    )
+    response.raise_for_status()
+    return response.json()["token"]
+
+
+def load_students(base_url, headers):
+    """Ambil daftar (nis, nisn) siswa dengan NISN valid dari API"""
+    response = requests.get(f"{base_url}/api/students", headers=headers, timeout=60)
+    response.raise_for_status()
+    return [
+        (s["nis"], s["nisn"])
+        for s in response.json()["students"]
+        if s.get("nisn") and len(str(s["nisn"])) == 10
+    ]
+
+
+class GateRush:
+    """State bersama antar worker: antrian siswa yang belum scan dan yang sudah"""
+
+    def __init__(self, students, retap_rate):
+        self.lock = threading.Lock()
+        self.pending = list(students)
+        random.shuffle(self.pending)
+        self.scanned = []
+        self.retap_rate = retap_rate
+
+    def next_student(self):
+        with self.lock:
+            if self.scanned and (not self.pending or random.random() < self.retap_rate):
+                return random.choice(self.scanned)
+            if not self.pending:
+                return None
+            student = self.pending.pop()
+            self.scanned.append(student)
+            return student
+
+
+def kiosk_worker(args, recorder, rush, stop_at, kiosk_no):
+    """Satu kiosk: scan NISN (kiosk genap) atau QR (kiosk ganjil) berturut-turut"""
+    session = requests.Session()
+    location = f"Kiosk {kiosk_no}"
+    use_qr = kiosk_no % 2 == 1
+
+    while time.time() < stop_at:
+        student = rush.next_student()
+        if student is None:
+            break
+        nis, nisn = student
+        if use_qr:
+            timed_request(session, recorder, "qr-verify", "POST",
+                          f"{args.base_url}/api/qr/verify",
+                          json={"qr_data": nisn, "location": location})
+        else:
+            timed_request(session, recorder, "scan-nisn", "POST",
+                          f"{args.base_url}/api/scan-nisn",
+                          json={"nisn": nisn, "location": location})
+        if args.scan_interval > 0:
+            time.sleep(random.expovariate(1.0 / args.scan_interval))
+
+
+def dashboard_worker(args, recorder, headers, stop_at):
+    """Dashboard piket: polling absensi hari ini"""
+    session = requests.Session()
+    session.headers.update(headers)
+    while time.time() < stop_at:
+        timed_request(session, recorder, "attendance-today", "GET",
+                      f"{args.base_url}/api/attendance/today")
+        time.sleep(args.poll_interval)
+
+
+def report_worker(args, recorder, headers, students, stop_at):
+    """Guru/admin membuka laporan dan profil siswa secara acak"""
+    session = requests.Session()
+    session.headers.update(headers)
+    while time.time() < stop_at:
+        choice = random.random()
+        if choice < 0.4:
+            timed_request(session, recorder, "student-detail", "GET",
+                          f"{args.base_url}/api/students/{random.choice(students)[0]}")
+        elif choice < 0.7:
+            timed_request(session, recorder, "summary-by-class", "GET",
+                          f"{args.base_url}/api/attendance/summary/by-class")
+        else:
+            timed_request(session, recorder, "attendance-statistics", "GET",
+                          f"{args.base_url}/api/attendance/statistics")
+        time.sleep(random.expovariate(1.0 / args.report_interval))
+
+
+def build_report(recorder, elapsed, config):
+    """Hitung throughput, percentile latency dan error rate per endpoint"""
+    endpoints = {}
+    total_requests = 0
+    total_errors = 0
+
+    for name, values in sorted(recorder.latencies.items()):
+        values = sorted(values)
+        errors = recorder.errors[name]
+        total_requests += len(values)
+        total_errors += errors
+        endpoints[name] = {
+            "requests": len(values),
+            "throughput_rps": round(len(values) / elapsed, 2),
+            "p50_ms": round(percentile(values, 0.50) * 1000, 2),
+            "p95_ms": round(percentile(values, 0.95) * 1000, 2),
+            "p99_ms": round(percentile(values, 0.99) * 1000, 2),
+            "max_ms": round(values[-1] * 1000, 2),
+            "error_rate": round(errors / len(values), 4),
+            "status": {str(k): v for k, v in recorder.statuses[name].items()},
+        }
+
+    return {
+        "timestamp": datetime.now().isoformat(),
+        "config": config,
+        "duration_seconds": round(elapsed, 2),
+        "total_requests": total_requests,
+        "throughput_rps": round(total_requests / elapsed, 2) if elapsed else 0,
+        "error_rate": round(total_errors / total_requests, 4) if total_requests else 0,
+        "endpoints": endpoints,
+    }
+
+
+def compare_with_baseline(report, baseline, threshold):
+    """Return daftar regresi (p95 naik > threshold atau error rate naik)"""
+    regressions = []
+    for name, current in report["endpoints"].items():
+        previous = baseline.get("endpoints", {}).get(name)
+        if not previous:
+            continue
+        if previous["p95_ms"] and current["p95_ms"] > previous["p95_ms"] * (1 + threshold):
+            regressions.append(
+                f"{name}: p95 {previous['p95_ms']} ms -> {current['p95_ms']} ms"
+            )
+        if current["error_rate"] > previous["error_rate"] + 0.01:
+            regressions.append(
+                f"{name}: error rate {previous['error_rate']:.2%} -> {current['error_rate']:.2%}"
+            )
+    return regressions
+
+
+def print_report(report):
+    print("=" * 90)
+    print(f"{'ENDPOINT':<24}{'REQ':>8}{'RPS':>9}{'P50':>10}{'P95':>10}{'P99':>10}{'MAX':>10}{'ERR':>9}")
+    print("-" * 90)
+    for name, e in report["endpoints"].items():
+        print(f"{name:<24}{e['requests']:>8}{e['throughput_rps']:>9}"
+              f"{e['p50_ms']:>10}{e['p95_ms']:>10}{e['p99_ms']:>10}{e['max_ms']:>10}"
+              f"{e['error_rate']:>9.2%}")
+    print("-" * 90)
+    print(f"Total: {report['total_requests']} request, {report['throughput_rps']} req/s, "
+          f"error rate {report['error_rate']:.2%}, durasi {report['duration_seconds']} s")
+    print("=" * 90)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Load test jam masuk sekolah untuk Absensi API")
+    parser.add_argument("--base-url", default=BASE_URL)
+    parser.add_argument("--username", default="admin")
+    parser.add_argument("--password", default="admin123")
+    parser.add_argument("--duration", type=float, default=60, help="Durasi test (detik)")
+    parser.add_argument("--kiosks", type=int, default=6, help="Jumlah kiosk scanner paralel")
+    parser.add_argument("--dashboards", type=int, default=2, help="Jumlah dashboard polling")
+    parser.add_argument("--reporters", type=int, default=1, help="Jumlah pengguna laporan")
+    parser.add_argument("--scan-interval", type=float, default=1.5,
+                        help="Rata-rata jeda antar scan per kiosk (detik, 0 = tanpa jeda)")
+    parser.add_argument("--poll-interval", type=float, default=5.0)
+    parser.add_argument("--report-interval", type=float, default=10.0)
+    parser.add_argument("--retap-rate", type=float, default=0.05,
+                        help="Peluang siswa men-tap ulang kartu yang sudah discan")
+    parser.add_argument("--students", type=int, default=0,
+                        help="Batasi jumlah siswa yang ikut scan (0 = semua)")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--output", help="Simpan hasil sebagai JSON (mis. baseline baru)")
+    parser.add_argument("--baseline", help="Bandingkan dengan hasil JSON sebelumnya")
+    parser.add_argument("--threshold", type=float, default=0.20,
+                        help="Toleransi kenaikan p95 terhadap baseline (0.20 = 20%%)")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.seed is not None:
+        random.seed(args.seed)
+
+    token = login(args.base_url, args.username, args.password)
+    headers = {"Authorization": f"Bearer {token}"}
+    students = load_students(args.base_url, headers)
+    if not students:
+        print("Tidak ada siswa dengan NISN valid, load test dibatalkan")
+        return 1
+    if args.students:
+        students = students[:args.students]
+
+    config = {k: v for k, v in vars(args).items() if k not in ("password", "output", "baseline")}
+    print(f"Load test {args.duration}s | {args.kiosks} kiosk | {args.dashboards} dashboard | "
+          f"{args.reporters} laporan | {len(students)} siswa")
+
+    recorder = Recorder()
+    rush = GateRush(students, args.retap_rate)
+    stop_at = time.time() + args.duration
+
+    threads = []
+    for i in range(args.kiosks):
+        threads.append(threading.Thread(target=kiosk_worker, args=(args, recorder, rush, stop_at, i)))
+    for _ in range(args.dashboards):
+        threads.append(threading.Thread(target=dashboard_worker, args=(args, recorder, headers, stop_at)))
+    for _ in range(args.reporters):
+        threads.append(threading.Thread(target=report_worker, args=(args, recorder, headers, students, stop_at)))
+
+    started = time.perf_counter()
+    for thread in threads:
+        thread.daemon = True
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    report = build_report(recorder, elapsed, config)
+    print_report(report)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Hasil disimpan ke {args.output}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare_with_baseline(report, baseline, args.threshold)
+        if regressions:
+            print("REGRESI terhadap baseline:")
+            for line in regressions:
+                print(f"  - {line}")
+            return 2
+        print("Tidak ada regresi terhadap baseline")
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,263 @@
+#!/usr/bin/env python3
+"""
+Microbenchmark untuk fungsi-fungsi per request di Absensi API
+
+Setiap case diukur dengan timeit (autorange + beberapa repeat, diambil
+nilai terbaik) dan dibandingkan dengan baseline tersimpan. Case yang
+melambat melebihi threshold dilaporkan sebagai regresi (exit code 2).
+
+    python -m bench.microbench                      # bandingkan dengan baseline
+    python -m bench.microbench --save               # simpan hasil sebagai baseline baru
+    python -m bench.microbench --db -k database     # sertakan case database lokal
+
+Baseline (bench/baselines/microbench.json) bergantung pada mesin; buat
+dengan --save di mesin referensi (server produksi/Raspberry Pi) lalu commit.
+"""
+
+import argparse
+import json
+import os
+import sys
+import timeit
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+
+API_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, API_DIR)
+
+BASELINE_FILE = os.path.join(API_DIR, "bench", "baselines", "microbench.json")
+
+CASES = {}
+
+
+def case(name, requires_db=False):
+    """Daftarkan fungsi setup yang mengembalikan callable tanpa argumen"""
+    def register(setup):
+        CASES[name] = (setup, requires_db)
+        return setup
+    return register
+
+
+def _attendance_rows(n):
+    base = datetime(2026, 1, 5, 6, 30)
+    return [
+        {
+            "id": i,
+            "siswa_id": i % 500,
+            "nis": str(10000 + i),
+            "tanggal": date(2026, 1, 5),
+            "waktu": timedelta(hours=6, minutes=30, seconds=i % 3600),
+            "status": "Hadir",
+            "metode": "scanner",
+            "scanner_lokasi": "Gerbang Utama",
+            "nama": f"Siswa {i}",
+            "gender": "L" if i % 2 else "P",
+            "persentase": Decimal("93.5"),
+            "created": base + timedelta(seconds=i),
+        }
+        for i in range(n)
+    ]
+
+
+# ===========================================
+# HELPERS
+# ===========================================
+@case("helpers.validate_nisn.valid")
+def bench_validate_nisn_valid():
+    from utils.helpers import validate_nisn
+    return lambda: validate_nisn("0075787971")
+
+
+@case("helpers.validate_nisn.invalid")
+def bench_validate_nisn_invalid():
+    from utils.helpers import validate_nisn
+    return lambda: validate_nisn(" 12345-678 ")
+
+
+@case("helpers.generate_qr_image")
+def bench_generate_qr_image():
+    from utils.helpers import generate_qr_image
+    return lambda: generate_qr_image("0075787971")
+
+
+# ===========================================
+# AUTH
+# ===========================================
+@case("auth.token_required.decode")
+def bench_token_required():
+    from flask import Flask
+    from utils.auth import token_required, create_token
+
+    app = Flask(__name__)
+    token = create_token({"id": 1, "username": "admin", "nama": "Admin", "role": "admin"})
+
+    @token_required
+    def view():
+        return "ok"
+
+    ctx = app.test_request_context(headers={"Authorization": f"Bearer {token}"})
+    ctx.push()
+    return view
+
+
+# ===========================================
+# JSON ENCODER
+# ===========================================
+@case("json_encoder.attendance_100_rows")
+def bench_json_encoder():
+    import json as json_module
+    from utils.json_encoder import CustomJSONEncoder
+
+    payload = {"success": True, "attendance": _attendance_rows(100)}
+    return lambda: json_module.dumps(payload, cls=CustomJSONEncoder)
+
+
+# ===========================================
+# STUDENTS LOOPS
+# ===========================================
+@case("students.gender_label_1000_rows")
+def bench_gender_label_loop():
+    from utils.helpers import gender_label
+    students = [{"gender": "L" if i % 3 else "P"} for i in range(1000)]
+
+    def run():
+        for student in students:
+            student["gender_label"] = gender_label(student["gender"])
+    return run
+
+
+@case("students.format_waktu_1000_rows")
+def bench_format_waktu_loop():
+    from utils.helpers import format_waktu
+    recent = _attendance_rows(1000)
+
+    def run():
+        formatted = []
+        for attendance in recent:
+            row = dict(attendance)
+            row["waktu"] = format_waktu(attendance["waktu"])
+            formatted.append(row)
+        return formatted
+    return run
+
+
+@case("search.index_3000_students")
+def bench_search_index():
+    from utils.search import SearchIndex, normalize
+    names = ["Budi", "Siti", "Ahmad", "Rizky", "Dewi", "Putri", "Agus", "Rahman", "Santoso", "Pratama"]
+    index = SearchIndex()
+    for i in range(3000):
+        nama = f"{names[i % 10]} {names[(i // 10) % 10]} {names[(i // 100) % 10]}"
+        index.add("siswa", {"id": i, "nama": nama}, (nama, str(10000 + i)))
+    queries = [normalize(q) for q in ("budi", "ahmad pra", "pratma", "100")]
+
+    def run():
+        for query in queries:
+            index.search(query, limit=20)
+    return run
+
+
+# ===========================================
+# DATABASE (butuh MySQL lokal, aktifkan dengan --db)
+# ===========================================
+@case("database.raw_connect_select_1", requires_db=True)
+def bench_raw_connection():
+    import mysql.connector
+    from config import DB_CONFIG
+
+    def run():
+        conn = mysql.connector.connect(**DB_CONFIG)
+        cursor = conn.cursor(dictionary=True)
+        cursor.execute("SELECT 1 AS one")
+        cursor.fetchone()
+        cursor.close()
+        conn.close()
+    return run
+
+
+@case("database.fetch_one_select_1", requires_db=True)
+def bench_fetch_one():
+    from utils.database import fetch_one
+    return lambda: fetch_one("SELECT 1 AS one")
+
+
+@case("database.fetch_all_siswa_by_kelas", requires_db=True)
+def bench_fetch_all():
+    from utils.database import fetch_all
+    return lambda: fetch_all(
+        "SELECT id, nis, nisn, nama, gender, card_version FROM siswa WHERE kelas_id = %s ORDER BY nama",
+        (1,),
+    )
+
+
+def measure(func, repeat=5, min_time=0.2):
+    """Return waktu terbaik per panggilan (ns)"""
+    timer = timeit.Timer(func)
+    number, elapsed = timer.autorange()
+    number = max(1, int(number * min_time / max(elapsed, 1e-9)))
+    best = min(timer.repeat(repeat=repeat, number=number))
+    return best / number * 1e9
+
+
+def load_baseline(path):
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f).get("cases", {})
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Microbenchmark fungsi hot path Absensi API")
+    parser.add_argument("-k", "--filter", default="", help="Hanya jalankan case yang mengandung teks ini")
+    parser.add_argument("--db", action="store_true", help="Sertakan case yang membutuhkan MySQL lokal")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--baseline", default=BASELINE_FILE)
+    parser.add_argument("--save", action="store_true", help="Simpan hasil sebagai baseline")
+    parser.add_argument("--threshold", type=float, default=0.25,
+                        help="Toleransi perlambatan terhadap baseline (0.25 = 25%%)")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    baseline = load_baseline(args.baseline)
+    results = {}
+    regressions = []
+
+    print(f"{'CASE':<40}{'NS/CALL':>14}{'BASELINE':>14}{'DELTA':>10}")
+    print("-" * 78)
+    for name, (setup, requires_db) in CASES.items():
+        if args.filter not in name or (requires_db and not args.db):
+            continue
+        ns = measure(setup(), repeat=args.repeat)
+        results[name] = {"ns_per_call": round(ns, 1)}
+
+        previous = baseline.get(name, {}).get("ns_per_call")
+        if previous:
+            delta = ns / previous - 1
+            marker = "  REGRESI" if delta > args.threshold else ""
+            print(f"{name:<40}{ns:>14,.0f}{previous:>14,.0f}{delta:>+10.1%}{marker}")
+            if delta > args.threshold:
+                regressions.append(name)
+        else:
+            print(f"{name:<40}{ns:>14,.0f}{'-':>14}{'-':>10}")
+
+    if args.save:
+        merged = dict(baseline, **results)
+        os.makedirs(os.path.dirname(args.baseline), exist_ok=True)
+        with open(args.baseline, "w") as f:
+            json.dump({
+                "updated": datetime.now().isoformat(timespec="seconds"),
+                "python": sys.version.split()[0],
+                "cases": merged,
+            }, f, indent=2, sort_keys=True)
+        print(f"\nBaseline disimpan ke {args.baseline}")
+
+    if regressions and not args.save:
+        print(f"\n{len(regressions)} case melambat > {args.threshold:.0%}: {', '.join(regressions)}")
+        return 2
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
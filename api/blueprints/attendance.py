@@ -2,6 +2,11 @@
 from flask import Blueprint, request, jsonify
 from utils.database import fetch_one, fetch_all, execute
 from utils.auth import token_required
+from utils.archive import absensi_source
+from utils import columnar, jobs, schedule
+from utils.absentee import find_absent, mark_alpha, mark_alpha_job
+from utils.rekap import get_rekap
+from utils.profile import invalidate_profile
 from datetime import date, datetime, timedelta
 import logging
 
@@ -93,7 +98,7 @@ def get_attendance_by_date():
                 "message": "Format tanggal tidak valid. Gunakan YYYY-MM-DD"
             }), 400
 
-        query = """
+        query = f"""
             SELECT 
                 a.*,
                 s.nama,
@@ -102,7 +107,7 @@ def get_attendance_by_date():
                 s.gender,
                 s.kelas_id,
                 k.nama_kelas as kelas
-            FROM absensi a
+            FROM {absensi_source(attendance_date, attendance_date)} a
             JOIN siswa s ON a.siswa_id = s.id
             LEFT JOIN kelas k ON s.kelas_id = k.id
             WHERE a.tanggal = %s
@@ -158,14 +163,14 @@ def get_student_attendance(nis):
         end_date = request.args.get('end_date')
         limit = request.args.get('limit', 100, type=int)
 
-        query = """
+        query = f"""
             SELECT 
                 tanggal,
                 waktu,
                 status,
                 metode,
                 scanner_lokasi
-            FROM absensi
+            FROM {absensi_source(start_date, end_date, siswa_id=student['id'])} a
             WHERE siswa_id = %s
         """
         params = [student['id']]
@@ -183,19 +188,22 @@ def get_student_attendance(nis):
 
         attendance = fetch_all(query, tuple(params))
 
-        # Get statistics
-        stats = fetch_one("""
-            SELECT 
-                COUNT(*) as total,
-                COUNT(CASE WHEN status = 'Hadir' THEN 1 END) as hadir,
-                COUNT(CASE WHEN status = 'Izin' THEN 1 END) as izin,
-                COUNT(CASE WHEN status = 'Sakit' THEN 1 END) as sakit,
-                COUNT(CASE WHEN status = 'Alpha' THEN 1 END) as alpha,
-                MIN(tanggal) as first_attendance,
-                MAX(tanggal) as last_attendance
-            FROM absensi
-            WHERE siswa_id = %s
-        """, (student['id'],))
+        # Get statistics (counter table, aggregate if not ready)
+        stats = get_rekap(student['id'])
+        if stats is None:
+            stats = fetch_one(f"""
+                SELECT 
+                    COUNT(*) as total,
+                    COUNT(CASE WHEN status = 'Hadir' THEN 1 END) as hadir,
+                    COUNT(CASE WHEN status = 'Izin' THEN 1 END) as izin,
+                    COUNT(CASE WHEN status = 'Sakit' THEN 1 END) as sakit,
+                    COUNT(CASE WHEN status = 'Alpha' THEN 1 END) as alpha,
+                    COUNT(CASE WHEN status = 'Terlambat' THEN 1 END) as terlambat,
+                    MIN(tanggal) as first_date,
+                    MAX(tanggal) as last_date
+                FROM {absensi_source(siswa_id=student['id'])} a
+                WHERE siswa_id = %s
+            """, (student['id'],))
 
         return jsonify({
             "success": True,
@@ -206,8 +214,9 @@ def get_student_attendance(nis):
                 "izin": stats['izin'] or 0,
                 "sakit": stats['sakit'] or 0,
                 "alpha": stats['alpha'] or 0,
-                "first_attendance": str(stats['first_attendance']) if stats['first_attendance'] else None,
-                "last_attendance": str(stats['last_attendance']) if stats['last_attendance'] else None
+                "terlambat": stats['terlambat'] or 0,
+                "first_attendance": str(stats['first_date']) if stats['first_date'] else None,
+                "last_attendance": str(stats['last_date']) if stats['last_date'] else None
             },
             "attendance": attendance,
             "total_records": len(attendance)
@@ -229,8 +238,10 @@ def get_attendance_statistics():
         start_date = request.args.get('start_date', (date.today() - timedelta(days=30)).isoformat())
         end_date = request.args.get('end_date', date.today().isoformat())
 
+        source = absensi_source(start_date, end_date)
+
         # Daily statistics
-        daily_stats = fetch_all("""
+        daily_stats = fetch_all(f"""
             SELECT 
                 tanggal as date,
                 COUNT(DISTINCT siswa_id) as total_siswa,
@@ -238,15 +249,16 @@ def get_attendance_statistics():
                 COUNT(CASE WHEN status = 'Hadir' THEN 1 END) as hadir,
                 COUNT(CASE WHEN status = 'Izin' THEN 1 END) as izin,
                 COUNT(CASE WHEN status = 'Sakit' THEN 1 END) as sakit,
-                COUNT(CASE WHEN status = 'Alpha' THEN 1 END) as alpha
-            FROM absensi
+                COUNT(CASE WHEN status = 'Alpha' THEN 1 END) as alpha,
+                COUNT(CASE WHEN status = 'Terlambat' THEN 1 END) as terlambat
+            FROM {source} a
             WHERE tanggal BETWEEN %s AND %s
             GROUP BY tanggal
             ORDER BY tanggal DESC
         """, (start_date, end_date))
 
         # Statistics by class
-        class_stats = fetch_all("""
+        class_stats = fetch_all(f"""
             SELECT 
                 k.id as kelas_id,
                 k.nama_kelas,
@@ -258,35 +270,36 @@ def get_attendance_statistics():
                 COUNT(CASE WHEN a.status = 'Izin' THEN 1 END) as izin,
                 COUNT(CASE WHEN a.status = 'Sakit' THEN 1 END) as sakit,
                 COUNT(CASE WHEN a.status = 'Alpha' THEN 1 END) as alpha,
+                COUNT(CASE WHEN a.status = 'Terlambat' THEN 1 END) as terlambat,
                 (SELECT COUNT(*) FROM siswa WHERE kelas_id = k.id) as total_siswa
             FROM kelas k
             LEFT JOIN jurusan j ON k.jurusan_id = j.id
             LEFT JOIN siswa s ON k.id = s.kelas_id
-            LEFT JOIN absensi a ON s.id = a.siswa_id 
+            LEFT JOIN {source} a ON s.id = a.siswa_id 
                 AND a.tanggal BETWEEN %s AND %s
             GROUP BY k.id, k.nama_kelas, k.tingkat, j.nama
             ORDER BY k.tingkat, j.nama, k.nama_kelas
         """, (start_date, end_date))
 
         # Statistics by status
-        status_stats = fetch_all("""
+        status_stats = fetch_all(f"""
             SELECT 
                 status,
                 COUNT(*) as total,
                 COUNT(DISTINCT siswa_id) as unique_students
-            FROM absensi
+            FROM {source} a
             WHERE tanggal BETWEEN %s AND %s
             GROUP BY status
             ORDER BY total DESC
         """, (start_date, end_date))
 
         # Summary
-        summary = fetch_one("""
+        summary = fetch_one(f"""
             SELECT 
                 COUNT(DISTINCT siswa_id) as total_siswa_absen,
                 COUNT(*) as total_absensi,
                 COUNT(DISTINCT tanggal) as total_hari
-            FROM absensi
+            FROM {source} a
             WHERE tanggal BETWEEN %s AND %s
         """, (start_date, end_date))
 
@@ -313,6 +326,170 @@ def get_attendance_statistics():
         return jsonify({"success": False, "message": str(e)}), 500
 
 
+# ===========================================
+# COLUMNAR ANALYTICS (multi-tahun, bulan yang sudah ditutup)
+# ===========================================
+def _analytics_period():
+    """Ambil start_date/end_date; default 12 bulan terakhir yang sudah ditutup"""
+    end_date = request.args.get('end_date')
+    start_date = request.args.get('start_date')
+    end = date.fromisoformat(end_date) if end_date else columnar.last_closed_month()
+    start = date.fromisoformat(start_date) if start_date else (end - timedelta(days=364)).replace(day=1)
+    if start > end:
+        raise ValueError("start_date harus sebelum end_date")
+    return start, end
+
+
+@attendance_bp.route('/analytics/students', methods=['GET'])
+@token_required
+def get_student_analytics():
+    """Per-student attendance rates from the columnar archive"""
+    try:
+        if not columnar.is_available():
+            return jsonify({"success": False, "message": "numpy belum terpasang"}), 503
+
+        try:
+            start, end = _analytics_period()
+        except ValueError as e:
+            return jsonify({
+                "success": False,
+                "message": f"Periode tidak valid: {e}"
+            }), 400
+
+        kelas_id = request.args.get('kelas_id')
+        if kelas_id:
+            students = fetch_all("SELECT id, nis, nama, kelas_id FROM siswa WHERE kelas_id = %s", (kelas_id,))
+        else:
+            students = fetch_all("SELECT id, nis, nama, kelas_id FROM siswa")
+        by_id = {s['id']: s for s in students}
+
+        summary = columnar.student_summary(start, end, by_id.keys() if kelas_id else None)
+        for item in summary:
+            student = by_id.get(item['siswa_id'])
+            item['nis'] = student['nis'] if student else None
+            item['nama'] = student['nama'] if student else None
+            item['kelas_id'] = student['kelas_id'] if student else None
+
+        return jsonify({
+            "success": True,
+            "period": {"start_date": str(start), "end_date": str(end)},
+            "missing_months": columnar.coverage(start, end),
+            "total": len(summary),
+            "students": summary
+        })
+
+    except Exception as e:
+        logger.error(f"Get student analytics error: {e}")
+        return jsonify({"success": False, "message": str(e)}), 500
+
+
+@attendance_bp.route('/analytics/classes', methods=['GET'])
+@token_required
+def get_class_analytics():
+    """Monthly attendance trend per class from the columnar archive"""
+    try:
+        if not columnar.is_available():
+            return jsonify({"success": False, "message": "numpy belum terpasang"}), 503
+
+        try:
+            start, end = _analytics_period()
+        except ValueError as e:
+            return jsonify({
+                "success": False,
+                "message": f"Periode tidak valid: {e}"
+            }), 400
+
+        students = fetch_all("SELECT id, kelas_id FROM siswa")
+        kelas_of = {s['id']: s['kelas_id'] for s in students}
+
+        trends = columnar.class_trends(start, end, kelas_of)
+        kelas = {k['id']: k['nama_kelas'] for k in fetch_all("SELECT id, nama_kelas FROM kelas")}
+        for item in trends:
+            item['nama_kelas'] = kelas.get(item['kelas_id'])
+
+        return jsonify({
+            "success": True,
+            "period": {"start_date": str(start), "end_date": str(end)},
+            "missing_months": columnar.coverage(start, end),
+            "trends": trends
+        })
+
+    except Exception as e:
+        logger.error(f"Get class analytics error: {e}")
+        return jsonify({"success": False, "message": str(e)}), 500
+
+
+@attendance_bp.route('/analytics/export', methods=['POST'])
+@token_required
+def export_analytics():
+    """Export closed months to the columnar archive as a background job"""
+    try:
+        if not columnar.is_available():
+            return jsonify({"success": False, "message": "numpy belum terpasang"}), 503
+
+        data = request.get_json(silent=True) or {}
+        force = bool(data.get('force'))
+
+        try:
+            job = jobs.submit('analytics-export', columnar.export_job, force=force,
+                              params={'force': force}, exclusive=True)
+        except jobs.AlreadyRunning:
+            return jsonify({
+                "success": False,
+                "message": "Export analytics masih berjalan"
+            }), 409
+        except jobs.QueueFull as e:
+            return jsonify({"success": False, "message": str(e)}), 429
+
+        return jobs.accepted(job, "Export analytics dimulai")
+
+    except Exception as e:
+        logger.error(f"Export analytics error: {e}")
+        return jsonify({"success": False, "message": str(e)}), 500
+
+
+# ===========================================
+# MONTHLY ATTENDANCE MATRIX (REKAP)
+# ===========================================
+@attendance_bp.route('/matrix', methods=['GET'])
+@token_required
+def get_attendance_matrix():
+    """Students x days status matrix for one class and month"""
+    try:
+        if not columnar.is_available():
+            return jsonify({"success": False, "message": "numpy belum terpasang"}), 503
+
+        kelas_id = request.args.get('kelas_id', type=int)
+        month_param = request.args.get('month', date.today().strftime('%Y-%m'))
+
+        if kelas_id is None:
+            return jsonify({
+                "success": False,
+                "message": "kelas_id diperlukan"
+            }), 400
+
+        try:
+            month_start = datetime.strptime(month_param, '%Y-%m').date()
+        except ValueError:
+            return jsonify({
+                "success": False,
+                "message": "Format bulan tidak valid. Gunakan YYYY-MM"
+            }), 400
+
+        matrix = columnar.class_month_matrix(kelas_id, month_start.year, month_start.month)
+        if matrix is None:
+            return jsonify({
+                "success": False,
+                "message": f"Kelas dengan ID {kelas_id} tidak ditemukan"
+            }), 404
+
+        return jsonify({"success": True, **matrix})
+
+    except Exception as e:
+        logger.error(f"Get attendance matrix error: {e}")
+        return jsonify({"success": False, "message": str(e)}), 500
+
+
 # ===========================================
 # GET ATTENDANCE SUMMARY BY CLASS
 # ===========================================
@@ -331,30 +508,33 @@ def get_summary_by_class():
                 "message": "Format tanggal tidak valid. Gunakan YYYY-MM-DD"
             }), 400
 
-        summary = fetch_all("""
+        summary = fetch_all(f"""
             SELECT 
                 k.id as kelas_id,
                 k.nama_kelas,
                 k.tingkat,
                 j.nama as jurusan,
                 COUNT(DISTINCT s.id) as total_siswa,
-                COUNT(DISTINCT a.siswa_id) as hadir,
+                COUNT(DISTINCT CASE WHEN a.status = 'Hadir' THEN a.siswa_id END) as hadir,
                 COUNT(CASE WHEN a.status = 'Izin' THEN 1 END) as izin,
                 COUNT(CASE WHEN a.status = 'Sakit' THEN 1 END) as sakit,
                 COUNT(CASE WHEN a.status = 'Alpha' THEN 1 END) as alpha,
-                (COUNT(DISTINCT s.id) - COUNT(DISTINCT a.siswa_id)) as tidak_hadir
+                COUNT(CASE WHEN a.status = 'Terlambat' THEN 1 END) as terlambat,
+                (COUNT(DISTINCT s.id) - COUNT(DISTINCT a.siswa_id)) as tidak_hadir,
+                (COUNT(DISTINCT s.id)
+                    - COUNT(DISTINCT CASE WHEN a.status IN ('Hadir', 'Terlambat') THEN a.siswa_id END)) as tidak_hadir_total
             FROM kelas k
             LEFT JOIN jurusan j ON k.jurusan_id = j.id
             LEFT JOIN siswa s ON k.id = s.kelas_id
-            LEFT JOIN absensi a ON s.id = a.siswa_id AND a.tanggal = %s
+            LEFT JOIN {absensi_source(attendance_date, attendance_date)} a ON s.id = a.siswa_id AND a.tanggal = %s
             GROUP BY k.id, k.nama_kelas, k.tingkat, j.nama
             ORDER BY k.tingkat, j.nama, k.nama_kelas
         """, (attendance_date,))
 
-        # Add percentage
+        # Add percentage (hadir = status Hadir saja seperti /statistics; yang datang = Hadir + Terlambat)
         for item in summary:
             if item['total_siswa'] > 0:
-                item['persentase_hadir'] = round((item['hadir'] / item['total_siswa']) * 100, 1)
+                item['persentase_hadir'] = round(((item['hadir'] + item['terlambat']) / item['total_siswa']) * 100, 1)
             else:
                 item['persentase_hadir'] = 0
 
@@ -370,6 +550,91 @@ def get_summary_by_class():
         return jsonify({"success": False, "message": str(e)}), 500
 
 
+# ===========================================
+# ABSENT STUDENTS (NO ATTENDANCE RECORD)
+# ===========================================
+@attendance_bp.route('/absent', methods=['GET'])
+@token_required
+def get_absent_students():
+    """Get students without attendance (or marked Alpha) for a date, per class"""
+    try:
+        date_param = request.args.get('date', date.today().isoformat())
+        kelas_id = request.args.get('kelas_id', type=int)
+
+        try:
+            attendance_date = date.fromisoformat(date_param)
+        except ValueError:
+            return jsonify({
+                "success": False,
+                "message": "Format tanggal tidak valid. Gunakan YYYY-MM-DD"
+            }), 400
+
+        result = find_absent(attendance_date, kelas_id=kelas_id)
+        if kelas_id is not None and not result['classes']:
+            return jsonify({
+                "success": False,
+                "message": f"Kelas dengan ID {kelas_id} tidak ditemukan"
+            }), 404
+
+        return jsonify({"success": True, **result})
+
+    except Exception as e:
+        logger.error(f"Get absent students error: {e}")
+        return jsonify({"success": False, "message": str(e)}), 500
+
+
+# ===========================================
+# MARK ABSENT STUDENTS AS ALPHA
+# ===========================================
+@attendance_bp.route('/absent/mark', methods=['POST'])
+@token_required
+def mark_absent_students():
+    """Insert Alpha records for every student without attendance on a date"""
+    try:
+        data = request.get_json(silent=True) or {}
+        dry_run = bool(data.get('dry_run'))
+        force = bool(data.get('force'))
+
+        try:
+            attendance_date = date.fromisoformat(data.get('date', date.today().isoformat()))
+        except ValueError:
+            return jsonify({
+                "success": False,
+                "message": "Format tanggal tidak valid. Gunakan YYYY-MM-DD"
+            }), 400
+
+        if attendance_date > date.today():
+            return jsonify({
+                "success": False,
+                "message": "Tidak bisa menandai Alpha untuk tanggal yang belum terjadi"
+            }), 400
+
+        # Dry-run hanya menghitung siswa yang akan ditandai
+        if dry_run:
+            result = mark_alpha(attendance_date, dry_run=True, force=force)
+            return jsonify({"success": True, **result})
+
+        try:
+            job = jobs.submit('mark-alpha', mark_alpha_job, attendance_date, force=force,
+                              params={'date': attendance_date.isoformat(), 'force': force},
+                              exclusive=True)
+        except jobs.AlreadyRunning:
+            return jsonify({
+                "success": False,
+                "message": "Penandaan Alpha masih berjalan"
+            }), 409
+        except jobs.QueueFull as e:
+            return jsonify({"success": False, "message": str(e)}), 429
+
+        return jobs.accepted(job, f"Penandaan Alpha {attendance_date} dimulai")
+
+    except ValueError as e:
+        return jsonify({"success": False, "message": str(e)}), 400
+    except Exception as e:
+        logger.error(f"Mark absent students error: {e}")
+        return jsonify({"success": False, "message": str(e)}), 500
+
+
 # ===========================================
 # MANUAL ATTENDANCE ENTRY
 # ===========================================
@@ -410,8 +675,8 @@ def manual_attendance():
             }), 404
 
         # Check if already exists
-        existing = fetch_one("""
-            SELECT id FROM absensi 
+        existing = fetch_one(f"""
+            SELECT id FROM {absensi_source(tanggal, tanggal)} a
             WHERE siswa_id = %s AND tanggal = %s
         """, (student['id'], tanggal))
 
@@ -443,6 +708,8 @@ def manual_attendance():
                 "message": "Gagal menyimpan absensi"
             }), 500
 
+        invalidate_profile(student['nis'])
+
         return jsonify({
             "success": True,
             "message": "Absensi berhasil ditambahkan",
@@ -489,7 +756,7 @@ def update_attendance(id):
             }), 400
 
         # Check if attendance exists
-        existing = fetch_one("SELECT id FROM absensi WHERE id = %s", (id,))
+        existing = fetch_one("SELECT id, nis FROM absensi WHERE id = %s", (id,))
         if not existing:
             return jsonify({
                 "success": False,
@@ -509,6 +776,8 @@ def update_attendance(id):
                 "message": "Gagal mengupdate absensi"
             }), 500
 
+        invalidate_profile(existing['nis'])
+
         return jsonify({
             "success": True,
             "message": "Absensi berhasil diupdate",
@@ -533,7 +802,7 @@ def delete_attendance(id):
     """Delete attendance record"""
     try:
         # Check if exists
-        existing = fetch_one("SELECT id FROM absensi WHERE id = %s", (id,))
+        existing = fetch_one("SELECT id, nis FROM absensi WHERE id = %s", (id,))
         if not existing:
             return jsonify({
                 "success": False,
@@ -549,6 +818,8 @@ def delete_attendance(id):
                 "message": "Gagal menghapus absensi"
             }), 500
 
+        invalidate_profile(existing['nis'])
+
         return jsonify({
             "success": True,
             "message": "Absensi berhasil dihapus"
@@ -557,3 +828,73 @@ def delete_attendance(id):
     except Exception as e:
         logger.error(f"Delete attendance error: {e}")
         return jsonify({"success": False, "message": str(e)}), 500
+
+
+# ===========================================
+# BELL SCHEDULES (JAM MASUK)
+# ===========================================
+@attendance_bp.route('/schedules', methods=['GET'])
+@token_required
+def get_schedules():
+    """Get bell schedules used to classify scans as Hadir/Terlambat"""
+    try:
+        return jsonify({"success": True, **schedule.list_schedules()})
+
+    except Exception as e:
+        logger.error(f"Get schedules error: {e}")
+        return jsonify({"success": False, "message": str(e)}), 500
+
+
+@attendance_bp.route('/schedules', methods=['PUT'])
+@token_required
+def update_schedules():
+    """Upsert bell schedules per tingkat/day (replace=true drops the others)"""
+    try:
+        data = request.get_json(silent=True) or {}
+        entries = data.get('schedules')
+
+        if not isinstance(entries, list):
+            return jsonify({
+                "success": False,
+                "message": "schedules harus berupa array"
+            }), 400
+
+        try:
+            result = schedule.set_schedules(entries, replace=bool(data.get('replace')))
+        except ValueError as e:
+            return jsonify({"success": False, "message": str(e)}), 400
+
+        return jsonify({
+            "success": True,
+            "message": "Jadwal masuk berhasil disimpan",
+            **result
+        })
+
+    except Exception as e:
+        logger.error(f"Update schedules error: {e}")
+        return jsonify({"success": False, "message": str(e)}), 500
+
+
+@attendance_bp.route('/schedules', methods=['DELETE'])
+@token_required
+def delete_schedule():
+    """Delete one bell schedule entry (tingkat/hari empty = all)"""
+    try:
+        tingkat = request.args.get('tingkat')
+        hari = request.args.get('hari', type=int)
+
+        if not schedule.delete_schedule(tingkat, hari):
+            return jsonify({
+                "success": False,
+                "message": "Jadwal tidak ditemukan"
+            }), 404
+
+        return jsonify({
+            "success": True,
+            "message": "Jadwal berhasil dihapus",
+            **schedule.list_schedules()
+        })
+
+    except Exception as e:
+        logger.error(f"Delete schedule error: {e}")
+        return jsonify({"success": False, "message": str(e)}), 500
@@ -2,6 +2,9 @@
 from flask import Blueprint, request, jsonify
 from utils.database import fetch_one, fetch_all, execute
 from utils.auth import token_required
+from utils.search import invalidate_search_index
+from utils.roster import invalidate_roster
+from utils.profile import invalidate_profile
 import logging
 
 classes_bp = Blueprint('classes', __name__, url_prefix='/api/kelas')
@@ -313,6 +316,8 @@ def add_class():
                 "message": "Gagal menambahkan kelas"
             }), 500
 
+        invalidate_roster()
+
         return jsonify({
             "success": True,
             "message": "Kelas berhasil ditambahkan",
@@ -449,6 +454,11 @@ def update_class(id):
         if not result['success']:
             return jsonify({"success": False, "message": "Gagal mengupdate kelas"}), 500
 
+        # Nama kelas ikut disimpan di hasil pencarian siswa, roster dan profil siswa
+        invalidate_search_index()
+        invalidate_roster()
+        invalidate_profile()
+
         # Get updated data
         updated = fetch_one("""
             SELECT 
@@ -512,6 +522,9 @@ def delete_class(id):
                 "message": "Gagal menghapus kelas"
             }), 500
 
+        invalidate_roster()
+        invalidate_profile()
+
         return jsonify({
             "success": True,
             "message": f"Kelas {kelas['nama_kelas']} berhasil dihapus"
@@ -1,12 +1,17 @@
 # blueprints/debug.py
 from flask import Blueprint, request, jsonify, send_file
-from utils.database import fetch_one, fetch_all, execute, get_db
+from utils.database import fetch_one, fetch_all, execute, get_db, get_query_stats, get_slow_queries, reset_query_stats
 from utils.auth import token_required
+from utils import log_reader
+from utils.metrics import summarize_latency
+from utils.schema import check_schema, get_schema_report
+from utils.archive import archive_closed_years, archive_job, get_archive_boundary
+from utils import backup, jobs, maintenance, rekap
+from config import LOG_CONFIG, BACKUP_CONFIG
 from datetime import datetime
 import os
 import logging
 import json
-import subprocess
 
 debug_bp = Blueprint('debug', __name__, url_prefix='/api/debug')
 logger = logging.getLogger(__name__)
@@ -83,58 +88,57 @@ def table_structure():
 @debug_bp.route('/backup', methods=['POST'])
 @token_required
 def create_backup():
-    """Create database backup"""
+    """Start a database backup as a background job"""
     try:
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        backup_dir = "/var/www/html/api/backups"
-        backup_file = f"{backup_dir}/backup_{timestamp}.sql"
+        data = request.get_json(silent=True) or {}
+        backup_type = data.get('type', 'full')
 
-        # Ensure backup directory exists
-        os.makedirs(backup_dir, exist_ok=True)
-
-        # Get database config
-        from config import DB_CONFIG
+        if backup_type not in ('full', 'incremental'):
+            return jsonify({
+                "success": False,
+                "message": "Jenis backup harus 'full' atau 'incremental'"
+            }), 400
 
-        # Create backup using mysqldump
-        cmd = [
-            'mysqldump',
-            '-h', DB_CONFIG['host'],
-            '-u', DB_CONFIG['user'],
-            f'-p{DB_CONFIG["password"]}',
-            DB_CONFIG['database']
-        ]
+        if backup.is_busy():
+            return jsonify({
+                "success": False,
+                "message": "Backup/restore lain masih berjalan"
+            }), 409
 
         try:
-            with open(backup_file, 'w') as f:
-                result = subprocess.run(cmd, stdout=f, stderr=subprocess.PIPE, text=True)
+            job = jobs.submit('backup', backup.backup_job, backup_type, params={'type': backup_type},
+                              exclusive=('backup', 'restore'))
+        except jobs.AlreadyRunning:
+            return jsonify({
+                "success": False,
+                "message": "Backup/restore lain masih berjalan"
+            }), 409
+        except jobs.QueueFull as e:
+            return jsonify({"success": False, "message": str(e)}), 429
 
-            if result.returncode != 0:
-                logger.error(f"Backup failed: {result.stderr}")
-                return jsonify({
-                    "success": False,
-                    "message": "Gagal membuat backup"
-                }), 500
+        return jobs.accepted(job, f"Backup {backup_type} dimulai")
 
-            file_size = os.path.getsize(backup_file)
+    except Exception as e:
+        logger.error(f"Backup error: {e}")
+        return jsonify({"success": False, "message": str(e)}), 500
 
-            return jsonify({
-                "success": True,
-                "message": "Backup berhasil dibuat",
-                "backup_file": f"backup_{timestamp}.sql",
-                "size": file_size,
-                "size_formatted": f"{file_size / 1024:.2f} KB",
-                "timestamp": timestamp
-            })
 
-        except Exception as e:
-            logger.error(f"Backup execution error: {e}")
+@debug_bp.route('/backup/<backup_id>', methods=['GET'])
+@token_required
+def backup_status(backup_id):
+    """Get status and progress of a backup"""
+    try:
+        entry = backup.get_backup(backup_id)
+        if not entry:
             return jsonify({
                 "success": False,
-                "message": f"Gagal menjalankan backup: {str(e)}"
-            }), 500
+                "message": "Backup tidak ditemukan"
+            }), 404
+
+        return jsonify({"success": True, "backup": entry})
 
     except Exception as e:
-        logger.error(f"Backup error: {e}")
+        logger.error(f"Backup status error: {e}")
         return jsonify({"success": False, "message": str(e)}), 500
 
 
@@ -144,26 +148,12 @@ def create_backup():
 @debug_bp.route('/backups', methods=['GET'])
 @token_required
 def list_backups():
-    """List all available backups"""
+    """List all available backups from the manifest"""
     try:
-        backup_dir = "/var/www/html/api/backups"
-        backups = []
-
-        if os.path.exists(backup_dir):
-            for file in os.listdir(backup_dir):
-                if file.endswith('.sql'):
-                    file_path = os.path.join(backup_dir, file)
-                    stat = os.stat(file_path)
-                    backups.append({
-                        "filename": file,
-                        "size": stat.st_size,
-                        "size_formatted": f"{stat.st_size / 1024:.2f} KB",
-                        "created": datetime.fromtimestamp(stat.st_ctime).isoformat(),
-                        "modified": datetime.fromtimestamp(stat.st_mtime).isoformat()
-                    })
-
-        # Sort by modified date descending
-        backups.sort(key=lambda x: x['modified'], reverse=True)
+        backups = backup.list_backups()
+        for entry in backups:
+            size = entry.get('size') or 0
+            entry['size_formatted'] = f"{size / 1024:.2f} KB"
 
         return jsonify({
             "success": True,
@@ -184,11 +174,11 @@ def list_backups():
 def download_backup(filename):
     """Download a backup file"""
     try:
-        backup_dir = "/var/www/html/api/backups"
+        backup_dir = BACKUP_CONFIG['directory']
         file_path = os.path.join(backup_dir, filename)
 
         # Security: prevent directory traversal
-        if '..' in filename or not os.path.exists(file_path):
+        if '..' in filename or filename == backup.MANIFEST_FILE or not os.path.exists(file_path):
             return jsonify({
                 "success": False,
                 "message": "File tidak ditemukan"
@@ -198,7 +188,7 @@ def download_backup(filename):
             file_path,
             as_attachment=True,
             download_name=filename,
-            mimetype='application/sql'
+            mimetype=backup.MIMETYPES[backup.compression_of(filename)]
         )
 
     except Exception as e:
@@ -212,7 +202,7 @@ def download_backup(filename):
 @debug_bp.route('/restore', methods=['POST'])
 @token_required
 def restore_backup():
-    """Restore database from backup"""
+    """Start restoring a backup (and its incremental chain) as a background job"""
     try:
         data = request.get_json()
 
@@ -223,49 +213,36 @@ def restore_backup():
             }), 400
 
         filename = data['filename']
-        backup_dir = "/var/www/html/api/backups"
-        file_path = os.path.join(backup_dir, filename)
-
-        if '..' in filename or not os.path.exists(file_path):
+        if '..' in filename or '/' in filename:
             return jsonify({
                 "success": False,
                 "message": "File backup tidak ditemukan"
             }), 404
 
-        # Get database config
-        from config import DB_CONFIG
-
-        # Restore using mysql
-        cmd = [
-            'mysql',
-            '-h', DB_CONFIG['host'],
-            '-u', DB_CONFIG['user'],
-            f'-p{DB_CONFIG["password"]}',
-            DB_CONFIG['database']
-        ]
-
         try:
-            with open(file_path, 'r') as f:
-                result = subprocess.run(cmd, stdin=f, stderr=subprocess.PIPE, text=True)
-
-            if result.returncode != 0:
-                logger.error(f"Restore failed: {result.stderr}")
-                return jsonify({
-                    "success": False,
-                    "message": f"Gagal restore: {result.stderr}"
-                }), 500
+            chain = backup.restore_chain(filename)
+        except FileNotFoundError as e:
+            return jsonify({"success": False, "message": str(e)}), 404
 
+        if backup.is_busy():
             return jsonify({
-                "success": True,
-                "message": f"Database berhasil direstore dari {filename}"
-            })
+                "success": False,
+                "message": "Backup/restore lain masih berjalan"
+            }), 409
 
-        except Exception as e:
-            logger.error(f"Restore execution error: {e}")
+        try:
+            job = jobs.submit('restore', backup.restore_job, filename,
+                              params={'filename': filename, 'files': [e['filename'] for e in chain]},
+                              exclusive=('backup', 'restore'))
+        except jobs.AlreadyRunning:
             return jsonify({
                 "success": False,
-                "message": f"Gagal menjalankan restore: {str(e)}"
-            }), 500
+                "message": "Backup/restore lain masih berjalan"
+            }), 409
+        except jobs.QueueFull as e:
+            return jsonify({"success": False, "message": str(e)}), 429
+
+        return jobs.accepted(job, f"Restore dari {chain[-1]['id']} dimulai")
 
     except Exception as e:
         logger.error(f"Restore error: {e}")
@@ -278,10 +255,11 @@ def restore_backup():
 @debug_bp.route('/logs', methods=['GET'])
 @token_required
 def get_logs():
-    """Get application logs"""
+    """Get application logs (tail from EOF, optional filters and follow cursor)"""
     try:
         lines = request.args.get('lines', 100, type=int)
-        log_file = "/var/www/html/api/logs/api.log"
+        cursor = request.args.get('cursor')
+        log_file = LOG_CONFIG['file']
 
         if not os.path.exists(log_file):
             return jsonify({
@@ -289,15 +267,28 @@ def get_logs():
                 "message": "Log file tidak ditemukan"
             }), 404
 
-        with open(log_file, 'r') as f:
-            all_lines = f.readlines()
-            last_lines = all_lines[-lines:] if len(all_lines) > lines else all_lines
+        try:
+            filters = {
+                "level": request.args.get('level'),
+                "logger_name": request.args.get('logger'),
+                "since": _parse_datetime_arg('since'),
+                "until": _parse_datetime_arg('until'),
+                "contains": request.args.get('q'),
+            }
+            lines = max(1, min(lines, 5000))
+
+            if cursor:
+                entries, next_cursor = log_reader.follow(log_file, cursor, lines, **filters)
+            else:
+                entries, next_cursor = log_reader.tail(log_file, lines, **filters)
+        except ValueError as e:
+            return jsonify({"success": False, "message": str(e)}), 400
 
         return jsonify({
             "success": True,
-            "total_lines": len(all_lines),
-            "displayed_lines": len(last_lines),
-            "logs": last_lines
+            "displayed_lines": len(entries),
+            "cursor": next_cursor,
+            "logs": [entry['raw'] for entry in entries]
         })
 
     except Exception as e:
@@ -305,6 +296,17 @@ def get_logs():
         return jsonify({"success": False, "message": str(e)}), 500
 
 
+def _parse_datetime_arg(name):
+    """Parse query parameter ISO datetime, None jika tidak ada"""
+    value = request.args.get(name)
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(value)
+    except ValueError:
+        raise ValueError(f"Format {name} tidak valid. Gunakan ISO 8601 (YYYY-MM-DDTHH:MM:SS)")
+
+
 # ===========================================
 # DATABASE PERFORMANCE
 # ===========================================
@@ -313,8 +315,8 @@ def get_logs():
 def check_performance():
     """Check database performance"""
     try:
-        from config import DB_CONFIG
-        
+        from config import DB_CONFIG, DB_STATS_CONFIG
+
         conn = get_db()
         if not conn:
             return jsonify({"success": False, "message": "Database error"}), 500
@@ -358,6 +360,13 @@ def check_performance():
                 "questions": questions['Value'] if questions else 'N/A',
                 "slow_queries": slow_queries['Value'] if slow_queries else 'N/A',
                 "long_query_time": long_query_time['Value'] if long_query_time else 'N/A'
+            },
+            "api_latency": summarize_latency(),
+            "indexes": get_schema_report() or check_schema(),
+            "query_stats": {
+                "slow_query_ms": DB_STATS_CONFIG['slow_query_ms'],
+                "top_queries": get_query_stats(request.args.get('top', 20, type=int)),
+                "slow_queries": get_slow_queries()
             }
         })
 
@@ -367,58 +376,143 @@ def check_performance():
 
 
 # ===========================================
-# FIX NISN (Utility)
+# RESET QUERY STATISTICS
 # ===========================================
-@debug_bp.route('/fix-nisn', methods=['POST'])
+@debug_bp.route('/performance/queries/reset', methods=['POST'])
 @token_required
-def fix_nisn():
-    """Fix NISN format (remove spaces, ensure 10 digits)"""
+def reset_performance_queries():
+    """Reset in-process query statistics and slow-query log"""
+    reset_query_stats()
+    return jsonify({
+        "success": True,
+        "message": "Statistik query berhasil direset"
+    })
+
+
+# ===========================================
+# INDEX MANAGER
+# ===========================================
+@debug_bp.route('/indexes', methods=['GET'])
+@token_required
+def check_indexes():
+    """Check required indexes and EXPLAIN plans of the hot queries"""
     try:
-        # Get all students with invalid NISN
-        students = fetch_all("""
-            SELECT id, nis, nisn, nama
-            FROM siswa
-            WHERE LENGTH(TRIM(nisn)) != 10 OR TRIM(nisn) NOT REGEXP '^[0-9]+$'
-        """)
+        report = get_schema_report()
+        if report is None or request.args.get('refresh', type=int):
+            report = check_schema()
+        return jsonify({"success": True, "report": report})
 
-        fixed_count = 0
-        fixes = []
-
-        for student in students:
-            original_nisn = student['nisn']
-            if original_nisn:
-                # Remove non-digits
-                import re
-                cleaned = re.sub(r'\D', '', str(original_nisn))
-
-                # Take last 10 digits if longer
-                if len(cleaned) > 10:
-                    cleaned = cleaned[-10:]
-
-                if len(cleaned) == 10 and cleaned != original_nisn:
-                    # Update
-                    result = execute(
-                        "UPDATE siswa SET nisn = %s WHERE id = %s",
-                        (cleaned, student['id']),
-                        commit=True
-                    )
-                    if result['success']:
-                        fixed_count += 1
-                        fixes.append({
-                            "nis": student['nis'],
-                            "nama": student['nama'],
-                            "old_nisn": original_nisn,
-                            "new_nisn": cleaned
-                        })
+    except Exception as e:
+        logger.error(f"Check indexes error: {e}")
+        return jsonify({"success": False, "message": str(e)}), 500
 
+
+@debug_bp.route('/indexes', methods=['POST'])
+@token_required
+def apply_indexes():
+    """Create missing indexes, then re-verify query plans"""
+    try:
+        report = check_schema(apply=True)
+        return jsonify({
+            "success": report['healthy'],
+            "message": "Semua index tersedia" if report['healthy'] else "Masih ada masalah index",
+            "report": report
+        })
+
+    except Exception as e:
+        logger.error(f"Apply indexes error: {e}")
+        return jsonify({"success": False, "message": str(e)}), 500
+
+
+# ===========================================
+# ARCHIVE CLOSED ACADEMIC YEARS
+# ===========================================
+@debug_bp.route('/archive', methods=['GET'])
+@token_required
+def archive_status():
+    """Show archive boundary and rows waiting to be archived"""
+    try:
+        result = archive_closed_years(dry_run=True)
+        boundary = get_archive_boundary(refresh=True)
         return jsonify({
             "success": True,
-            "message": f"Berhasil memperbaiki {fixed_count} NISN",
-            "total_checked": len(students),
-            "fixed": fixed_count,
-            "details": fixes
+            "archive_boundary": str(boundary) if boundary else None,
+            "cutoff": result['cutoff'],
+            "pending_rows": result['pending_rows']
         })
 
+    except Exception as e:
+        logger.error(f"Archive status error: {e}")
+        return jsonify({"success": False, "message": str(e)}), 500
+
+
+@debug_bp.route('/archive', methods=['POST'])
+@token_required
+def archive_absensi():
+    """Move absensi rows of closed academic years into the archive table"""
+    try:
+        data = request.get_json(silent=True) or {}
+        keep_years = data.get('keep_years')
+
+        if keep_years is not None and (not isinstance(keep_years, int) or keep_years < 1):
+            return jsonify({
+                "success": False,
+                "message": "keep_years harus bilangan bulat >= 1"
+            }), 400
+
+        if data.get('dry_run'):
+            result = archive_closed_years(keep_years, dry_run=True)
+            return jsonify({
+                "success": True,
+                "message": f"{result['pending_rows']} baris absensi akan dipindah ke arsip (sebelum {result['cutoff']})",
+                "result": result
+            })
+
+        try:
+            job = jobs.submit('archive', archive_job, keep_years, params={'keep_years': keep_years},
+                              exclusive=True)
+        except jobs.AlreadyRunning:
+            return jsonify({
+                "success": False,
+                "message": "Arsip absensi masih berjalan"
+            }), 409
+        except jobs.QueueFull as e:
+            return jsonify({"success": False, "message": str(e)}), 429
+
+        return jobs.accepted(job, "Pemindahan absensi ke arsip dimulai")
+
+    except Exception as e:
+        logger.error(f"Archive error: {e}")
+        return jsonify({"success": False, "message": str(e)}), 500
+
+
+# ===========================================
+# FIX NISN (Utility)
+# ===========================================
+@debug_bp.route('/fix-nisn', methods=['POST'])
+@token_required
+def fix_nisn():
+    """Fix NISN format (remove spaces, ensure 10 digits) as a background job"""
+    try:
+        data = request.get_json(silent=True) or {}
+
+        # Dry-run hanya membaca: diff langsung dikembalikan
+        if data.get('dry_run'):
+            result = maintenance.fix_nisn(dry_run=True)
+            return jsonify({"success": True, **result})
+
+        try:
+            job = jobs.submit('fix-nisn', maintenance.fix_nisn, exclusive=True)
+        except jobs.AlreadyRunning:
+            return jsonify({
+                "success": False,
+                "message": "Fix NISN masih berjalan"
+            }), 409
+        except jobs.QueueFull as e:
+            return jsonify({"success": False, "message": str(e)}), 429
+
+        return jobs.accepted(job, "Fix NISN dimulai")
+
     except Exception as e:
         logger.error(f"Fix NISN error: {e}")
         return jsonify({"success": False, "message": str(e)}), 500
@@ -430,32 +524,52 @@ def fix_nisn():
 @debug_bp.route('/cleanup', methods=['POST'])
 @token_required
 def cleanup_database():
-    """Clean up orphaned records"""
+    """Clean up orphaned records as a background job"""
     try:
-        results = {}
-
-        # Remove absensi without valid siswa
-        result = execute("""
-            DELETE a FROM absensi a
-            LEFT JOIN siswa s ON a.siswa_id = s.id
-            WHERE s.id IS NULL
-        """, commit=True)
-        results['orphaned_attendance'] = result.get('rowcount', 0)
-
-        # Remove siswa with invalid kelas_id
-        result = execute("""
-            DELETE s FROM siswa s
-            LEFT JOIN kelas k ON s.kelas_id = k.id
-            WHERE k.id IS NULL AND s.kelas_id IS NOT NULL
-        """, commit=True)
-        results['invalid_kelas_siswa'] = result.get('rowcount', 0)
+        data = request.get_json(silent=True) or {}
 
-        return jsonify({
-            "success": True,
-            "message": "Database cleanup completed",
-            "deleted": results
-        })
+        # Dry-run hanya menghitung record yatim
+        if data.get('dry_run'):
+            result = maintenance.cleanup_orphans(dry_run=True)
+            return jsonify({"success": True, **result})
+
+        try:
+            job = jobs.submit('cleanup', maintenance.cleanup_orphans, exclusive=True)
+        except jobs.AlreadyRunning:
+            return jsonify({
+                "success": False,
+                "message": "Cleanup masih berjalan"
+            }), 409
+        except jobs.QueueFull as e:
+            return jsonify({"success": False, "message": str(e)}), 429
+
+        return jobs.accepted(job, "Database cleanup dimulai")
 
     except Exception as e:
         logger.error(f"Cleanup error: {e}")
         return jsonify({"success": False, "message": str(e)}), 500
+
+
+# ===========================================
+# ATTENDANCE COUNTERS (absensi_rekap)
+# ===========================================
+@debug_bp.route('/rekap/rebuild', methods=['POST'])
+@token_required
+def rebuild_rekap():
+    """Install counter triggers if missing and recompute per-student counters"""
+    try:
+        try:
+            job = jobs.submit('rekap-rebuild', rekap.rebuild_job, exclusive=True)
+        except jobs.AlreadyRunning:
+            return jsonify({
+                "success": False,
+                "message": "Rebuild rekap absensi masih berjalan"
+            }), 409
+        except jobs.QueueFull as e:
+            return jsonify({"success": False, "message": str(e)}), 429
+
+        return jobs.accepted(job, "Rebuild rekap absensi dimulai")
+
+    except Exception as e:
+        logger.error(f"Rekap rebuild error: {e}")
+        return jsonify({"success": False, "message": str(e)}), 500
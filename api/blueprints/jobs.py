@@ -0,0 +1,84 @@
+# blueprints/jobs.py
+from flask import Blueprint, request, jsonify
+from utils.auth import token_required
+from utils import jobs
+import logging
+
+jobs_bp = Blueprint('jobs', __name__, url_prefix='/api/jobs')
+logger = logging.getLogger(__name__)
+
+
+# ===========================================
+# LIST JOBS
+# ===========================================
+@jobs_bp.route('', methods=['GET'])
+@token_required
+def list_jobs():
+    """List recent background jobs"""
+    try:
+        limit = min(request.args.get('limit', 50, type=int), 500)
+        name = request.args.get('name')
+
+        job_list = jobs.list_jobs(limit=limit, name=name)
+        for job in job_list:
+            job.pop('result', None)  # hasil lengkap lewat GET /api/jobs/<id>
+
+        return jsonify({
+            "success": True,
+            "total": len(job_list),
+            "stats": jobs.get_stats(),
+            "jobs": job_list
+        })
+
+    except Exception as e:
+        logger.error(f"List jobs error: {e}")
+        return jsonify({"success": False, "message": str(e)}), 500
+
+
+# ===========================================
+# GET JOB STATUS
+# ===========================================
+@jobs_bp.route('/<job_id>', methods=['GET'])
+@token_required
+def get_job(job_id):
+    """Get status, progress and result of a job"""
+    try:
+        job = jobs.get_job(job_id)
+        if not job:
+            return jsonify({
+                "success": False,
+                "message": "Job tidak ditemukan"
+            }), 404
+
+        return jsonify({"success": True, "job": job})
+
+    except Exception as e:
+        logger.error(f"Get job error: {e}")
+        return jsonify({"success": False, "message": str(e)}), 500
+
+
+# ===========================================
+# CANCEL JOB
+# ===========================================
+@jobs_bp.route('/<job_id>/cancel', methods=['POST'])
+@token_required
+def cancel_job(job_id):
+    """Cancel a queued or running job"""
+    try:
+        job = jobs.cancel(job_id)
+        if not job:
+            return jsonify({
+                "success": False,
+                "message": "Job tidak ditemukan atau sudah tidak aktif"
+            }), 404
+
+        return jsonify({
+            "success": True,
+            "message": "Permintaan pembatalan dikirim" if job['status'] not in jobs.FINISHED
+                       else f"Job sudah {job['status']}",
+            "job": job
+        })
+
+    except Exception as e:
+        logger.error(f"Cancel job error: {e}")
+        return jsonify({"success": False, "message": str(e)}), 500
@@ -0,0 +1,16 @@
+# blueprints/metrics.py
+from flask import Blueprint, Response
+from utils.metrics import render_prometheus
+import logging
+
+metrics_bp = Blueprint('metrics', __name__)
+logger = logging.getLogger(__name__)
+
+
+# ===========================================
+# PROMETHEUS METRICS
+# ===========================================
+@metrics_bp.route('/metrics', methods=['GET'])
+def prometheus_metrics():
+    """Expose request metrics in Prometheus text format"""
+    return Response(render_prometheus(), mimetype='text/plain; version=0.0.4; charset=utf-8')
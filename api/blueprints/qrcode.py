@@ -3,6 +3,12 @@ from flask import Blueprint, request, jsonify
 from utils.database import fetch_one, fetch_all, execute
 from utils.auth import token_required
 from utils.helpers import generate_qr_image, validate_nisn
+from utils.schedule import classify_arrival
+from utils.profile import invalidate_profile
+from utils.roster import invalidate_roster
+from utils import qr_sign
+from config import QR_SIGN_CONFIG
+from utils import jobs
 from datetime import date, datetime
 import logging
 
@@ -39,8 +45,8 @@ def generate_qr_code(nis):
                 "message": f"NISN harus 10 digit angka. Saat ini: {nisn_value} ({(len(nisn_value))} digit)"
             }), 400
 
-        # Generate QR code (hanya berisi NISN)
-        qr_data = nisn_value
+        # Generate QR code (payload bertanda tangan: id, NISN, versi kartu)
+        qr_data = qr_sign.card_payload(student['id'], nisn_value, student['card_version'])
         qr_base64 = generate_qr_image(qr_data)
 
         if not qr_base64:
@@ -80,13 +86,86 @@ def generate_qr_code(nis):
         return jsonify({"success": False, "message": str(e)}), 500
 
 
+def _generate_bulk_qr_job(job, nis_list):
+    """Job: generate QR codes for a list of NIS"""
+    job.update(current=0, total=len(nis_list), message='generate qr')
+    qr_results = []
+    success_count = 0
+    error_count = 0
+
+    for index, nis in enumerate(nis_list, 1):
+        job.check_cancelled()
+        job.update(current=index - 1)
+        # Get student data
+        student = fetch_one("""
+            SELECT id, nis, nisn, nama, gender, kelas_id, card_version
+            FROM siswa 
+            WHERE nis = %s
+        """, (nis,))
+
+        if not student:
+            qr_results.append({
+                "nis": nis,
+                "error": "Siswa tidak ditemukan",
+                "qr_data": None,
+                "qr_image": None
+            })
+            error_count += 1
+            continue
+
+        # Validate NISN
+        nisn_value = str(student['nisn']).strip()
+        if not validate_nisn(nisn_value):
+            qr_results.append({
+                "nis": student['nis'],
+                "nama": student['nama'],
+                "error": f"NISN tidak valid: {nisn_value}",
+                "qr_data": None,
+                "qr_image": None
+            })
+            error_count += 1
+            continue
+
+        # Generate QR code
+        qr_data = qr_sign.card_payload(student['id'], nisn_value, student['card_version'])
+        qr_base64 = generate_qr_image(qr_data)
+
+        if qr_base64:
+            qr_results.append({
+                "nis": student['nis'],
+                "nisn": student['nisn'],
+                "nama": student['nama'],
+                "gender": student['gender'],
+                "qr_data": qr_data,
+                "qr_image": f"data:image/png;base64,{qr_base64}"
+            })
+            success_count += 1
+        else:
+            qr_results.append({
+                "nis": student['nis'],
+                "nama": student['nama'],
+                "error": "Gagal generate QR",
+                "qr_data": None,
+                "qr_image": None
+            })
+            error_count += 1
+
+    job.update(current=len(nis_list))
+    return {
+        "count": len(qr_results),
+        "success_count": success_count,
+        "error_count": error_count,
+        "qr_codes": qr_results
+    }
+
+
 # ===========================================
 # BULK GENERATE QR CODES
 # ===========================================
 @qrcode_bp.route('/bulk/generate', methods=['POST'])
 @token_required
 def generate_bulk_qr():
-    """Generate QR codes for multiple students"""
+    """Generate QR codes for multiple students as a background job"""
     try:
         data = request.get_json()
 
@@ -109,72 +188,12 @@ def generate_bulk_qr():
                 "message": "Maksimal 50 siswa per batch"
             }), 400
 
-        qr_results = []
-        success_count = 0
-        error_count = 0
+        try:
+            job = jobs.submit('qr-bulk', _generate_bulk_qr_job, nis_list, params={'count': len(nis_list)})
+        except jobs.QueueFull as e:
+            return jsonify({"success": False, "message": str(e)}), 429
 
-        for nis in nis_list:
-            # Get student data
-            student = fetch_one("""
-                SELECT id, nis, nisn, nama, gender, kelas_id
-                FROM siswa 
-                WHERE nis = %s
-            """, (nis,))
-
-            if not student:
-                qr_results.append({
-                    "nis": nis,
-                    "error": "Siswa tidak ditemukan",
-                    "qr_data": None,
-                    "qr_image": None
-                })
-                error_count += 1
-                continue
-
-            # Validate NISN
-            nisn_value = str(student['nisn']).strip()
-            if not validate_nisn(nisn_value):
-                qr_results.append({
-                    "nis": student['nis'],
-                    "nama": student['nama'],
-                    "error": f"NISN tidak valid: {nisn_value}",
-                    "qr_data": None,
-                    "qr_image": None
-                })
-                error_count += 1
-                continue
-
-            # Generate QR code
-            qr_data = nisn_value
-            qr_base64 = generate_qr_image(qr_data)
-
-            if qr_base64:
-                qr_results.append({
-                    "nis": student['nis'],
-                    "nisn": student['nisn'],
-                    "nama": student['nama'],
-                    "gender": student['gender'],
-                    "qr_data": qr_data,
-                    "qr_image": f"data:image/png;base64,{qr_base64}"
-                })
-                success_count += 1
-            else:
-                qr_results.append({
-                    "nis": student['nis'],
-                    "nama": student['nama'],
-                    "error": "Gagal generate QR",
-                    "qr_data": None,
-                    "qr_image": None
-                })
-                error_count += 1
-
-        return jsonify({
-            "success": True,
-            "count": len(qr_results),
-            "success_count": success_count,
-            "error_count": error_count,
-            "qr_codes": qr_results
-        })
+        return jobs.accepted(job, f"Generate QR untuk {len(nis_list)} siswa dimulai")
 
     except Exception as e:
         logger.error(f"Bulk QR generation error: {e}")
@@ -196,32 +215,62 @@ def verify_qr_code():
                 "message": "QR data diperlukan"
             }), 400
 
-        qr_data = data['qr_data'].strip()
+        qr_data = str(data['qr_data']).strip()
         location = data.get('location', 'QR Scanner')
 
-        logger.info(f"QR scan received | NISN={qr_data} | IP={request.remote_addr}")
-
-        # Validate NISN format
-        if not validate_nisn(qr_data):
-            logger.warning(f"Invalid NISN format: {qr_data}")
-            return jsonify({
-                "success": False,
-                "message": "Format NISN tidak valid. Harus 10 digit angka"
-            }), 400
-
-        # Find student by NISN
-        student = fetch_one("""
-            SELECT id, nis, nisn, nama, gender, kelas_id
-            FROM siswa 
-            WHERE nisn = %s
-        """, (qr_data,))
+        logger.info(f"QR scan received | QR={qr_data} | IP={request.remote_addr}")
+
+        if qr_sign.is_signed(qr_data):
+            # Payload bertanda tangan: autentikasi + versi kartu (lookup siswa di-cache)
+            try:
+                student = qr_sign.verify_payload(qr_data)
+            except qr_sign.InvalidQR as e:
+                logger.warning(f"QR rejected: {e} | QR={qr_data}")
+                return jsonify({
+                    "success": False,
+                    "message": str(e)
+                }), e.status
+
+        else:
+            # Kartu lama berisi NISN polos
+            if not QR_SIGN_CONFIG['accept_plain_nisn']:
+                return jsonify({
+                    "success": False,
+                    "message": "Kartu lama tidak diterima, cetak ulang kartu"
+                }), 400
+
+            # Validate NISN format
+            if not validate_nisn(qr_data):
+                logger.warning(f"Invalid NISN format: {qr_data}")
+                return jsonify({
+                    "success": False,
+                    "message": "Format NISN tidak valid. Harus 10 digit angka"
+                }), 400
+
+            # Find student by NISN
+            student = fetch_one("""
+                SELECT s.id, s.nis, s.nisn, s.nama, s.gender, s.kelas_id, s.card_version, k.tingkat
+                FROM siswa s
+                LEFT JOIN kelas k ON s.kelas_id = k.id
+                WHERE s.nisn = %s
+            """, (qr_data,))
 
-        if not student:
-            logger.warning(f"QR scan with unknown NISN: {qr_data}")
-            return jsonify({
-                "success": False,
-                "message": "Siswa tidak valid"
-            }), 404
+            if not student:
+                logger.warning(f"QR scan with unknown NISN: {qr_data}")
+                return jsonify({
+                    "success": False,
+                    "message": "Siswa tidak valid"
+                }), 404
+
+            # Kartu NISN polos tidak berlaku lagi setelah kartu dicetak ulang
+            try:
+                qr_sign.check_plain_card(student)
+            except qr_sign.InvalidQR as e:
+                logger.warning(f"QR rejected: {e} | QR={qr_data}")
+                return jsonify({
+                    "success": False,
+                    "message": str(e)
+                }), e.status
 
         # Check if already attended today
         today = date.today()
@@ -241,8 +290,9 @@ def verify_qr_code():
                 }
             }), 409
 
-        # Save attendance
+        # Save attendance (Hadir/Terlambat menurut jadwal masuk tingkat kelas)
         now = datetime.now()
+        status, _ = classify_arrival(student['tingkat'], now)
         result = execute("""
             INSERT INTO absensi
             (siswa_id, nis, tanggal, waktu, status, metode, scanner_lokasi)
@@ -252,7 +302,7 @@ def verify_qr_code():
             student['nis'],
             today,
             now.time(),
-            'Hadir',
+            status,
             'QR Scanner',
             location
         ), commit=True)
@@ -263,6 +313,8 @@ def verify_qr_code():
                 "message": "Gagal menyimpan absensi"
             }), 500
 
+        invalidate_profile(student['nis'])
+
         return jsonify({
             "success": True,
             "message": "Absensi QR berhasil",
@@ -276,6 +328,7 @@ def verify_qr_code():
                 "id": result.get('last_id'),
                 "date": str(today),
                 "time": now.strftime("%H:%M:%S"),
+                "status": status,
                 "method": "QR Scanner",
                 "location": location
             }
@@ -286,6 +339,61 @@ def verify_qr_code():
         return jsonify({"success": False, "message": str(e)}), 500
 
 
+# ===========================================
+# REVOKE STUDENT CARD
+# ===========================================
+@qrcode_bp.route('/revoke/<nis>', methods=['POST'])
+@token_required
+def revoke_card(nis):
+    """Revoke the current QR card of a student and issue a new card version"""
+    try:
+        student = fetch_one("""
+            SELECT id, nis, nisn, nama, card_version
+            FROM siswa 
+            WHERE nis = %s
+        """, (nis,))
+
+        if not student:
+            return jsonify({
+                "success": False,
+                "message": f"Siswa dengan NIS {nis} tidak ditemukan"
+            }), 404
+
+        old_version = student['card_version'] or 1
+        result = execute(
+            "UPDATE siswa SET card_version = %s WHERE id = %s",
+            (old_version + 1, student['id']),
+            commit=True
+        )
+
+        if not result['success']:
+            return jsonify({
+                "success": False,
+                "message": "Gagal mencabut kartu"
+            }), 500
+
+        # Worker ini langsung menolak versi lama; worker lain setelah student_ttl_seconds
+        qr_sign.revoke(student['id'], old_version)
+        invalidate_roster()
+        invalidate_profile(student['nis'])
+
+        return jsonify({
+            "success": True,
+            "message": f"Kartu {student['nama']} versi {old_version} dicabut",
+            "student": {
+                "nis": student['nis'],
+                "nama": student['nama'],
+                "revoked_version": old_version,
+                "card_version": old_version + 1
+            },
+            "qr_data": qr_sign.card_payload(student['id'], student['nisn'], old_version + 1)
+        })
+
+    except Exception as e:
+        logger.error(f"Revoke card error: {e}")
+        return jsonify({"success": False, "message": str(e)}), 500
+
+
 # ===========================================
 # GET STUDENT QR HISTORY
 # ===========================================
@@ -305,7 +413,7 @@ def get_qr_history(nis):
         # Get QR generation history (from logs or a separate table)
         # For now, return the current QR code
         current_qr = fetch_one("""
-            SELECT nisn, card_version 
+            SELECT id, nisn, card_version 
             FROM siswa 
             WHERE nis = %s
         """, (nis,))
@@ -317,7 +425,7 @@ def get_qr_history(nis):
                 "nama": student['nama']
             },
             "current_qr": {
-                "data": current_qr['nisn'],
+                "data": qr_sign.card_payload(current_qr['id'], current_qr['nisn'], current_qr['card_version']),
                 "card_version": current_qr['card_version'],
                 "generated_at": datetime.now().isoformat()
             },
@@ -366,7 +474,7 @@ def print_qr_code(nis):
             }), 400
 
         # Generate QR code
-        qr_base64 = generate_qr_image(nisn_value)
+        qr_base64 = generate_qr_image(qr_sign.card_payload(student['id'], nisn_value, student['card_version']))
 
         if not qr_base64:
             return jsonify({
@@ -0,0 +1,87 @@
+# blueprints/roster.py
+from flask import Blueprint, request, jsonify, current_app
+from utils.auth import token_required
+from utils import roster_sync
+import logging
+
+roster_bp = Blueprint('roster', __name__, url_prefix='/api/roster')
+logger = logging.getLogger(__name__)
+
+
+# ===========================================
+# ROSTER SNAPSHOT (KIOSK)
+# ===========================================
+@roster_bp.route('/snapshot', methods=['GET'])
+@token_required
+def roster_snapshot():
+    """Get the precomputed compact roster snapshot (gzip, ETag)"""
+    try:
+        snapshot = roster_sync.sync()
+
+        if request.if_none_match.contains_weak(snapshot.etag):
+            response = current_app.response_class(status=304)
+        elif 'gzip' in request.accept_encodings:
+            response = current_app.response_class(snapshot.gzipped, mimetype='application/json')
+            response.headers['Content-Encoding'] = 'gzip'
+        else:
+            response = current_app.response_class(snapshot.body, mimetype='application/json')
+
+        response.set_etag(snapshot.etag, weak=True)
+        response.headers['Vary'] = 'Accept-Encoding'
+        response.headers['Cache-Control'] = 'no-cache'
+        response.headers['X-Roster-Version'] = snapshot.version
+        return response
+
+    except Exception as e:
+        logger.error(f"Roster snapshot error: {e}")
+        return jsonify({"success": False, "message": str(e)}), 500
+
+
+# ===========================================
+# ROSTER DELTA (KIOSK)
+# ===========================================
+@roster_bp.route('/delta', methods=['GET'])
+@token_required
+def roster_delta():
+    """Get roster changes since a snapshot/delta version"""
+    try:
+        since = request.args.get('since', '').strip()
+
+        try:
+            result = roster_sync.delta(since)
+        except ValueError:
+            return jsonify({
+                "success": False,
+                "message": "since harus berupa versi roster, mis. 3f2a9c41e7.12"
+            }), 400
+
+        if result['reset']:
+            return jsonify({
+                "success": False,
+                "message": "Versi roster tidak dikenal, unduh ulang snapshot",
+                "reset": True,
+                "version": result['version'],
+                "etag": result['etag'],
+                "snapshot_url": "/api/roster/snapshot"
+            }), 409
+
+        return jsonify({"success": True, **result})
+
+    except Exception as e:
+        logger.error(f"Roster delta error: {e}")
+        return jsonify({"success": False, "message": str(e)}), 500
+
+
+# ===========================================
+# ROSTER SYNC STATUS
+# ===========================================
+@roster_bp.route('/status', methods=['GET'])
+@token_required
+def roster_status():
+    """Get kiosk roster version and snapshot size"""
+    try:
+        return jsonify({"success": True, "roster": roster_sync.get_sync_stats()})
+
+    except Exception as e:
+        logger.error(f"Roster status error: {e}")
+        return jsonify({"success": False, "message": str(e)}), 500
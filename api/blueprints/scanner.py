@@ -3,6 +3,9 @@ from flask import Blueprint, request, jsonify
 from utils.database import fetch_one, fetch_all, execute
 from utils.auth import token_required
 from utils.helpers import validate_nisn
+from utils.schedule import classify_arrival
+from utils.profile import invalidate_profile
+from utils import qr_sign
 from datetime import date, datetime
 import logging
 
@@ -32,9 +35,10 @@ def process_scan():
 
         # Find student by NIS
         student = fetch_one("""
-            SELECT id, nis, nisn, nama, gender, kelas_id
-            FROM siswa 
-            WHERE nis = %s
+            SELECT s.id, s.nis, s.nisn, s.nama, s.gender, s.kelas_id, k.tingkat
+            FROM siswa s
+            LEFT JOIN kelas k ON s.kelas_id = k.id
+            WHERE s.nis = %s
         """, (nis,))
 
         if not student:
@@ -62,8 +66,9 @@ def process_scan():
                 }
             }), 409
 
-        # Save attendance
+        # Save attendance (Hadir/Terlambat menurut jadwal masuk tingkat kelas)
         now = datetime.now()
+        status, _ = classify_arrival(student['tingkat'], now)
         result = execute("""
             INSERT INTO absensi
             (siswa_id, nis, tanggal, waktu, status, metode, scanner_lokasi)
@@ -73,7 +78,7 @@ def process_scan():
             student['nis'],
             today,
             now.time(),
-            'Hadir',
+            status,
             'Scanner (Legacy)',
             location
         ), commit=True)
@@ -84,6 +89,8 @@ def process_scan():
                 "message": "Gagal menyimpan absensi"
             }), 500
 
+        invalidate_profile(student['nis'])
+
         # Get kelas info
         kelas = fetch_one("""
             SELECT nama_kelas FROM kelas WHERE id = %s
@@ -100,6 +107,7 @@ def process_scan():
             "attendance": {
                 "date": str(today),
                 "time": now.strftime("%H:%M:%S"),
+                "status": status,
                 "method": "Scanner (Legacy)"
             }
         })
@@ -129,27 +137,50 @@ def process_scan_nisn():
 
         logger.info(f"NISN scan received | NISN={nisn} | IP={request.remote_addr}")
 
-        # Validate NISN format
-        if not validate_nisn(nisn):
-            logger.warning(f"Invalid NISN format: {nisn}")
-            return jsonify({
-                "success": False,
-                "message": f"NISN harus 10 digit angka. Diterima: {nisn}"
-            }), 400
-
-        # Find student by NISN
-        student = fetch_one("""
-            SELECT id, nis, nisn, nama, gender, kelas_id
-            FROM siswa 
-            WHERE nisn = %s
-        """, (nisn,))
-
-        if not student:
-            logger.warning(f"NISN scan with unknown NISN: {nisn}")
-            return jsonify({
-                "success": False,
-                "message": f"Siswa dengan NISN {nisn} tidak ditemukan"
-            }), 404
+        if qr_sign.is_signed(nisn):
+            # Scanner USB membaca kartu baru berisi payload bertanda tangan
+            try:
+                student = qr_sign.verify_payload(nisn)
+            except qr_sign.InvalidQR as e:
+                logger.warning(f"NISN scan rejected: {e} | QR={nisn}")
+                return jsonify({
+                    "success": False,
+                    "message": str(e)
+                }), e.status
+
+        else:
+            # Validate NISN format
+            if not validate_nisn(nisn):
+                logger.warning(f"Invalid NISN format: {nisn}")
+                return jsonify({
+                    "success": False,
+                    "message": f"NISN harus 10 digit angka. Diterima: {nisn}"
+                }), 400
+
+            # Find student by NISN
+            student = fetch_one("""
+                SELECT s.id, s.nis, s.nisn, s.nama, s.gender, s.kelas_id, s.card_version, k.tingkat
+                FROM siswa s
+                LEFT JOIN kelas k ON s.kelas_id = k.id
+                WHERE s.nisn = %s
+            """, (nisn,))
+
+            if not student:
+                logger.warning(f"NISN scan with unknown NISN: {nisn}")
+                return jsonify({
+                    "success": False,
+                    "message": f"Siswa dengan NISN {nisn} tidak ditemukan"
+                }), 404
+
+            # Kartu NISN polos tidak berlaku lagi setelah kartu dicetak ulang
+            try:
+                qr_sign.check_plain_card(student)
+            except qr_sign.InvalidQR as e:
+                logger.warning(f"NISN scan rejected: {e} | NISN={nisn}")
+                return jsonify({
+                    "success": False,
+                    "message": str(e)
+                }), e.status
 
         # Check if already attended today
         today = date.today()
@@ -169,8 +200,9 @@ def process_scan_nisn():
                 }
             }), 409
 
-        # Save attendance
+        # Save attendance (Hadir/Terlambat menurut jadwal masuk tingkat kelas)
         now = datetime.now()
+        status, _ = classify_arrival(student['tingkat'], now)
         result = execute("""
             INSERT INTO absensi
             (siswa_id, nis, tanggal, waktu, status, metode, scanner_lokasi)
@@ -180,7 +212,7 @@ def process_scan_nisn():
             student['nis'],
             today,
             now.time(),
-            'Hadir',
+            status,
             'scanner',
             location
         ), commit=True)
@@ -191,6 +223,8 @@ def process_scan_nisn():
                 "message": "Gagal menyimpan absensi"
             }), 500
 
+        invalidate_profile(student['nis'])
+
         return jsonify({
             "success": True,
             "message": "Absensi NISN berhasil",
@@ -204,6 +238,7 @@ def process_scan_nisn():
                 "id": result.get('last_id'),
                 "date": str(today),
                 "time": now.strftime("%H:%M:%S"),
+                "status": status,
                 "method": "Scanner"
             }
         })
@@ -0,0 +1,67 @@
+# blueprints/search.py
+from flask import Blueprint, request, jsonify
+from utils.auth import token_required
+from utils import search
+from config import SEARCH_CONFIG
+import logging
+import time
+
+search_bp = Blueprint('search', __name__, url_prefix='/api/search')
+logger = logging.getLogger(__name__)
+
+
+# ===========================================
+# SEARCH STUDENTS AND TEACHERS
+# ===========================================
+@search_bp.route('', methods=['GET'])
+@token_required
+def search_all():
+    """Search-as-you-type over student and teacher names, NIS, NISN and NIP"""
+    try:
+        keyword = request.args.get('q', '').strip()
+        doc_type = request.args.get('type') or None
+        limit = min(request.args.get('limit', SEARCH_CONFIG['default_limit'], type=int),
+                    SEARCH_CONFIG['max_limit'])
+
+        if not keyword:
+            return jsonify({
+                "success": False,
+                "message": "Parameter q harus diisi"
+            }), 400
+
+        if doc_type and doc_type not in search.TYPES:
+            return jsonify({
+                "success": False,
+                "message": f"type harus salah satu dari: {', '.join(search.TYPES)}"
+            }), 400
+
+        start = time.perf_counter()
+        total, results = search.search(keyword, doc_type=doc_type, limit=limit)
+        took_ms = round((time.perf_counter() - start) * 1000, 3)
+
+        return jsonify({
+            "success": True,
+            "keyword": keyword,
+            "total": total,
+            "took_ms": took_ms,
+            "data": results
+        })
+
+    except Exception as e:
+        logger.error(f"Search error: {e}")
+        return jsonify({"success": False, "message": str(e)}), 500
+
+
+# ===========================================
+# SEARCH INDEX STATUS
+# ===========================================
+@search_bp.route('/status', methods=['GET'])
+@token_required
+def search_status():
+    """Get search index status"""
+    try:
+        return jsonify({"success": True, "index": search.get_index_stats()})
+
+    except Exception as e:
+        logger.error(f"Search status error: {e}")
+        return jsonify({"success": False, "message": str(e)}), 500
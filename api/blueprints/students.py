@@ -2,6 +2,11 @@
 from flask import Blueprint, request, jsonify
 from utils.database import fetch_one, fetch_all, execute
 from utils.auth import token_required
+from utils.helpers import gender_label
+from utils.search import refresh_student, remove_student
+from utils.roster import invalidate_roster
+from utils.profile import get_profile, invalidate_profile
+from utils.qr_sign import forget_student
 import logging
 
 students_bp = Blueprint("students", __name__, url_prefix="/api/students")
@@ -48,11 +53,7 @@ def get_students():
 
         # Add gender labels
         for student in students:
-            student["gender_label"] = (
-                "Laki-laki"
-                if student["gender"] == "L"
-                else "Perempuan" if student["gender"] == "P" else "-"
-            )
+            student["gender_label"] = gender_label(student["gender"])
 
         return jsonify({"success": True, "count": len(students), "students": students})
 
@@ -69,27 +70,10 @@ def get_students():
 def get_student_detail(nis):
     """Get detailed student information by NIS"""
     try:
-        # Get student data with kelas information
-        student = fetch_one(
-            """
-            SELECT 
-                s.id, s.nis, s.nisn, s.nama, s.gender,
-                s.kelas_id, s.card_version,
-                k.nama_kelas as kelas,
-                k.tingkat,
-                j.nama as jurusan,
-                j.kode as jurusan_kode,
-                g.nama as wali_kelas_nama
-            FROM siswa s
-            LEFT JOIN kelas k ON s.kelas_id = k.id
-            LEFT JOIN jurusan j ON k.jurusan_id = j.id
-            LEFT JOIN guru g ON k.wali_kelas_id = g.id
-            WHERE s.nis = %s
-        """,
-            (nis,),
-        )
+        # Profile, statistics and recent attendance in one query (cached per NIS)
+        profile = get_profile(nis)
 
-        if not student:
+        if not profile:
             return (
                 jsonify(
                     {
@@ -100,104 +84,7 @@ def get_student_detail(nis):
                 404,
             )
 
-        # Get attendance statistics
-        stats = fetch_one(
-            """
-            SELECT 
-                COUNT(*) as total_attendance,
-                COUNT(CASE WHEN status = 'Hadir' THEN 1 END) as hadir,
-                COUNT(CASE WHEN status = 'Izin' THEN 1 END) as izin,
-                COUNT(CASE WHEN status = 'Sakit' THEN 1 END) as sakit,
-                COUNT(CASE WHEN status = 'Alpha' THEN 1 END) as alpha,
-                MAX(tanggal) as last_attendance_date
-            FROM absensi 
-            WHERE siswa_id = %s
-        """,
-            (student["id"],),
-        )
-
-        # Get recent attendance
-        recent = fetch_all(
-            """
-            SELECT tanggal, waktu, status, metode, scanner_lokasi
-            FROM absensi 
-            WHERE siswa_id = %s 
-            ORDER BY tanggal DESC, waktu DESC 
-            LIMIT 10
-        """,
-            (student["id"],),
-        )
-        
-        # Convert waktu from timedelta/time to string for JSON serialization
-        formatted_recent = []
-        for attendance in recent:
-            formatted_attendance = dict(attendance)
-            # Convert waktu to string if it's a timedelta or time object
-            if attendance["waktu"] is not None:
-                # Jika berupa timedelta, konversi ke string HH:MM:SS
-                if hasattr(attendance["waktu"], "seconds"):
-                    total_seconds = attendance["waktu"].seconds
-                    hours = total_seconds // 3600
-                    minutes = (total_seconds % 3600) // 60
-                    seconds = total_seconds % 60
-                    formatted_attendance["waktu"] = (
-                        f"{hours:02d}:{minutes:02d}:{seconds:02d}"
-                    )
-                else:
-                    # Jika sudah berupa string atau tipe lain, konversi ke string
-                    formatted_attendance["waktu"] = str(attendance["waktu"])
-            formatted_recent.append(formatted_attendance)
-            
-        # Check today's attendance
-        today_attendance = fetch_one(
-            """
-            SELECT id FROM absensi 
-            WHERE siswa_id = %s AND tanggal = CURDATE()
-        """,
-            (student["id"],),
-        )
-
-        # Format response
-        student_data = {
-            "id": student["id"],
-            "nis": student["nis"] or "",
-            "nisn": student["nisn"] or "",
-            "nama": student["nama"] or "",
-            "gender": student["gender"],
-            "gender_label": (
-                "Laki-laki"
-                if student["gender"] == "L"
-                else "Perempuan" if student["gender"] == "P" else "-"
-            ),
-            "kelas_id": student["kelas_id"],
-            "kelas": student["kelas"] or "",
-            "tingkat": student["tingkat"] or "",
-            "jurusan": student["jurusan"] or "",
-            "jurusan_kode": student["jurusan_kode"] or "",
-            "wali_kelas_nama": student["wali_kelas_nama"] or "",
-            "card_version": student["card_version"] or 1,
-        }
-
-        return jsonify(
-            {
-                "success": True,
-                "student": student_data,
-                "statistics": {
-                    "total_attendance": stats["total_attendance"] or 0,
-                    "hadir": stats["hadir"] or 0,
-                    "izin": stats["izin"] or 0,
-                    "sakit": stats["sakit"] or 0,
-                    "alpha": stats["alpha"] or 0,
-                    "last_attendance_date": (
-                        str(stats["last_attendance_date"])
-                        if stats["last_attendance_date"]
-                        else None
-                    ),
-                },
-                "attended_today": today_attendance is not None,
-                "recent_attendance": formatted_recent,  # <-- PERBAIKAN: gunakan formatted_recent, bukan recent
-            }
-        )
+        return jsonify({"success": True, **profile})
 
     except Exception as e:
         logger.error(f"Get student detail error: {e}")
@@ -282,6 +169,9 @@ def add_student():
                 500,
             )
 
+        refresh_student(result.get("last_id"))
+        invalidate_roster()
+
         return (
             jsonify(
                 {
@@ -395,6 +285,11 @@ def update_student(nis):
         if not result["success"]:
             return jsonify({"success": False, "message": "Gagal mengupdate data"}), 500
 
+        refresh_student(existing["id"])
+        invalidate_roster()
+        invalidate_profile(nis)
+        forget_student(existing["id"])
+
         # Get updated data
         updated = fetch_one(
             """
@@ -469,6 +364,11 @@ def delete_student(nis):
         if not result["success"] or result.get("rowcount", 0) == 0:
             return jsonify({"success": False, "message": "Gagal menghapus siswa"}), 500
 
+        remove_student(student["id"])
+        invalidate_roster()
+        invalidate_profile(nis)
+        forget_student(student["id"])
+
         return jsonify(
             {"success": True, "message": f"Siswa {student['nama']} berhasil dihapus"}
         )
@@ -526,11 +426,7 @@ def get_students_by_kelas(kelas_id):
 
         # Add gender labels
         for student in students:
-            student["gender_label"] = (
-                "Laki-laki"
-                if student["gender"] == "L"
-                else "Perempuan" if student["gender"] == "P" else "-"
-            )
+            student["gender_label"] = gender_label(student["gender"])
 
         return jsonify(
             {
@@ -1,7 +1,10 @@
 # blueprints/system.py
-from flask import Blueprint, jsonify
+from flask import Blueprint, request, jsonify
 from datetime import datetime
-from utils.database import get_db
+from utils.health import get_database_status, get_diagnostics, is_ready
+from utils.sampler import get_system_info
+from utils.auth import token_required
+from config import SAMPLER_CONFIG
 import logging
 
 system_bp = Blueprint('system', __name__, url_prefix='/api/system')
@@ -9,14 +12,55 @@ logger = logging.getLogger(__name__)
 
 @system_bp.route('/health', methods=['GET'])
 def health_check():
-    db = get_db()
+    """Cached health status + pool/cache/queue diagnostics (no DB connection per probe)"""
+    database = get_database_status()
+    diagnostics = get_diagnostics()
+    healthy = database['ok'] and not database.get('stale', True)
     return jsonify({
-        "status": "healthy",
+        "status": "healthy" if healthy else "degraded",
         "timestamp": datetime.now().isoformat(),
-        "database": "connected" if db else "disconnected",
+        "database": database['status'],
+        "database_probe": database,
+        "diagnostics": diagnostics,
         "version": "2.0.0"
     })
 
+@system_bp.route('/live', methods=['GET'])
+def liveness():
+    """Liveness: process is up and serving requests"""
+    return jsonify({
+        "status": "alive",
+        "timestamp": datetime.now().isoformat()
+    })
+
+@system_bp.route('/ready', methods=['GET'])
+def readiness():
+    """Readiness: last background database probe succeeded and is fresh"""
+    database = get_database_status()
+    ready = is_ready()
+    return jsonify({
+        "status": "ready" if ready else "not_ready",
+        "timestamp": datetime.now().isoformat(),
+        "database": database
+    }), 200 if ready else 503
+
+@system_bp.route('/info', methods=['GET'])
+@token_required
+def system_info():
+    """System info from the background sampler (never blocks on psutil or COUNT(*))"""
+    try:
+        history = request.args.get('history', 60, type=int)
+        history = max(0, min(history, SAMPLER_CONFIG['history_size']))
+        return jsonify({
+            "success": True,
+            **get_system_info(history),
+            "timestamp": datetime.now().isoformat()
+        })
+
+    except Exception as e:
+        logger.error(f"System info error: {e}")
+        return jsonify({"success": False, "message": str(e)}), 500
+
 @system_bp.route('/test', methods=['GET'])
 def test():
     return jsonify({
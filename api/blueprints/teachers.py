@@ -2,6 +2,8 @@
 from flask import Blueprint, request, jsonify
 from utils.database import fetch_one, fetch_all, execute
 from utils.auth import token_required
+from utils.search import search as search_index, refresh_teacher, remove_teacher
+from utils.profile import invalidate_profile
 import logging
 
 teachers_bp = Blueprint('teachers', __name__, url_prefix='/api/guru')
@@ -143,6 +145,8 @@ def add_teacher():
                 "message": "Gagal menambahkan guru"
             }), 500
 
+        refresh_teacher(result.get('last_id'))
+
         return jsonify({
             "success": True,
             "message": "Guru berhasil ditambahkan",
@@ -241,6 +245,9 @@ def update_teacher(id):
         if not result['success']:
             return jsonify({"success": False, "message": "Gagal mengupdate guru"}), 500
 
+        refresh_teacher(id)
+        invalidate_profile()  # nama wali kelas ada di profil siswa
+
         # Get updated data
         updated = fetch_one("""
             SELECT id, nip, nama, telp, email 
@@ -297,6 +304,9 @@ def delete_teacher(id):
                 "message": "Gagal menghapus guru"
             }), 500
 
+        remove_teacher(id)
+        invalidate_profile()
+
         return jsonify({
             "success": True,
             "message": f"Guru {teacher['nama']} berhasil dihapus"
@@ -323,14 +333,21 @@ def search_teachers():
                 "message": "Kata kunci minimal 2 karakter"
             }), 400
 
-        search_term = f"%{keyword}%"
-        teachers = fetch_all("""
-            SELECT id, nip, nama, telp, email 
-            FROM guru 
-            WHERE nama LIKE %s OR nip LIKE %s
-            ORDER BY nama
-            LIMIT 50
-        """, (search_term, search_term))
+        if len(keyword) < 3:
+            # Index hanya mencocokkan awal kata untuk kueri pendek; LIKE juga di tengah kata
+            search_term = f"%{keyword}%"
+            teachers = fetch_all("""
+                SELECT id, nip, nama, telp, email 
+                FROM guru 
+                WHERE nama LIKE %s OR nip LIKE %s
+                ORDER BY nama
+                LIMIT 50
+            """, (search_term, search_term))
+        else:
+            # Index in-memory (utils/search.py), diurutkan berdasarkan relevansi
+            _, teachers = search_index(keyword, doc_type='guru', limit=50)
+            for teacher in teachers:
+                teacher.pop('type')
 
         return jsonify({
             "success": True,
@@ -529,6 +546,7 @@ def bulk_import_teachers():
             """, (nip, nama, telp, email), commit=True)
 
             if result['success']:
+                refresh_teacher(result.get('last_id'))
                 results.append({
                     "data": {
                         "id": result.get('last_id'),
@@ -35,6 +35,16 @@ QR_CONFIG = {
 	'error_correction': 'H' #H : High error corection
 }
 
+# Signed QR Payload Configuration (utils/qr_sign.py)
+QR_SIGN_CONFIG = {
+	'prefix': 'S1',
+	'tag_bytes': 10, # panjang HMAC yang disimpan di QR (80 bit)
+	'sign_cards': True, # QR baru berisi payload bertanda tangan, bukan NISN polos
+	'accept_plain_nisn': True, # kartu lama (NISN polos) tetap diterima /api/qr/verify selama card_version siswa masih 1
+	'student_ttl_seconds': 30, # batas waktu kartu yang dicabut di worker lain masih diterima
+	'student_cache_size': 5000
+}
+
 # API Configuration
 API_CONFIG = {
 	'host': '0.0.0.0',
@@ -42,3 +52,150 @@ API_CONFIG = {
 	'debug': False,
 	'threaded': True
 }
+
+# Logging Configuration
+LOG_CONFIG = {
+	'file': '/var/www/html/api/logs/api.log',
+	'level': 'INFO',
+	'format': '%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+	'rotation': 'size', # 'size' (max_bytes) atau 'time' (when/interval)
+	'max_bytes': 10 * 1024 * 1024,
+	'when': 'midnight',
+	'interval': 1,
+	'backup_count': 14,
+	'json': False, # True : tulis log sebagai JSON lines
+	'console': True,
+	'queue_size': 10000 # record di-drop jika antrian penuh
+}
+
+# Query Instrumentation Configuration
+DB_STATS_CONFIG = {
+	'slow_query_ms': 200, # query di atas threshold masuk slow-query log
+	'slow_log_size': 50,
+	'explain': True, # capture EXPLAIN untuk slow query (SELECT/UPDATE/DELETE)
+	'explain_cooldown_seconds': 60, # EXPLAIN per fingerprint maksimal sekali per periode
+	'max_fingerprints': 500
+}
+
+# Schema / Index Manager Configuration
+SCHEMA_CONFIG = {
+	'check_on_startup': True, # cek index + EXPLAIN query utama saat API start (background)
+	'apply_indexes_on_startup': False # DDL di tabel live dari setiap worker; buat index lewat POST /api/debug/indexes
+}
+
+# Archive Configuration (tabel absensi hot + absensi_arsip)
+ARCHIVE_CONFIG = {
+	'table': 'absensi_arsip',
+	'keep_years': 1, # jumlah tahun ajaran (termasuk yang berjalan) yang tetap di tabel absensi
+	'batch_size': 5000,
+	'batch_sleep_seconds': 0.05, # jeda antar batch agar scan tetap lancar
+	'boundary_ttl_seconds': 60 # batas arsip dibaca ulang (worker lain ikut melihat hasil arsip)
+}
+
+# Columnar Analytics Configuration (file .npy per bulan yang sudah ditutup)
+COLUMNAR_CONFIG = {
+	'directory': '/var/www/html/api/data/columnar',
+	'fetch_size': 10000 # baris per fetchmany saat export
+}
+
+# Backup Configuration
+BACKUP_CONFIG = {
+	'directory': '/var/www/html/api/backups',
+	'compression': 'gzip', # 'gzip' atau 'zstd' (butuh paket zstandard, fallback ke gzip)
+	'level': 6,
+	'chunk_size': 1024 * 1024,
+	'schedule': True, # backup terjadwal di background thread
+	'full_interval_hours': 24,
+	'incremental_interval_minutes': 60, # 0 : nonaktifkan backup incremental
+	'binlog_incremental': False, # incremental dari binlog; butuh log_bin aktif + hak RELOAD, REPLICATION CLIENT, REPLICATION SLAVE (tanpa ini semua backup full)
+	'keep_full': 7 # jumlah backup full (beserta incremental-nya) yang disimpan
+}
+
+# Background Job Configuration
+JOBS_CONFIG = {
+	'directory': '/var/www/html/api/jobs', # record job (JSON) agar status tetap ada setelah restart
+	'workers': 2,
+	'max_pending': 20, # job queued + running; lebih dari ini ditolak (429)
+	'keep_days': 7,
+	'keep_finished_in_memory': 50, # record selesai yang lebih lama dibaca dari disk
+	'progress_flush_seconds': 1.0
+}
+
+# Orphan Cleanup Configuration
+CLEANUP_CONFIG = {
+	'batch_size': 1000, # baris per DELETE (berdasarkan primary key)
+	'batch_sleep_seconds': 0.1 # jeda antar batch agar scan tetap lancar
+}
+
+# Connection Pool Configuration
+DB_POOL_CONFIG = {
+	'enabled': True,
+	'pool_size': 10, # maksimal 32 (batas mysql.connector)
+	'fallback_direct': True # buka koneksi langsung jika pool habis
+}
+
+# Health Probe Configuration
+HEALTH_CONFIG = {
+	'interval_seconds': 5, # probe database di background thread
+	'stale_after_seconds': 30, # hasil probe lebih tua dari ini dianggap tidak siap
+	'pool_saturation_warning': 0.9
+}
+
+# System Sampler Configuration (/api/system/info)
+SAMPLER_CONFIG = {
+	'interval_seconds': 5,
+	'history_size': 120, # jumlah sample yang disimpan (120 x 5 detik = 10 menit)
+	'table_counts_ttl_seconds': 300, # COUNT(*) tabel di-refresh di background
+	'disk_path': '/'
+}
+
+# Cache Invalidation Broadcast Configuration (tabel cache_generation)
+CACHE_CONFIG = {
+	'sync_interval_seconds': 5 # selang worker memeriksa invalidasi dari worker lain
+}
+
+# Search Index Configuration (/api/search)
+SEARCH_CONFIG = {
+	'default_limit': 20,
+	'max_limit': 100,
+	'typo_min_length': 4, # token kueri lebih pendek tidak dicocokkan dengan toleransi typo
+	'ttl_seconds': 300, # index dibangun ulang di background setelah ini (perubahan dari worker lain / luar API)
+	'build_on_startup': True # bangun index di background saat API start
+}
+
+# Roster Cache Configuration
+ROSTER_CONFIG = {
+	'ttl_seconds': 600, # batas umur snapshot roster walaupun tidak ada invalidasi
+	'delta_history': 50, # jumlah versi roster kiosk yang bisa dijawab dengan delta
+	'gzip_level': 6
+}
+
+# Absentee / Alpha Marking Configuration
+ABSENTEE_CONFIG = {
+	'schedule': True,
+	'mark_time': '16:00', # setelah jam ini siswa tanpa absensi ditandai Alpha
+	'school_days': [0, 1, 2, 3, 4, 5], # 0 = Senin ... 5 = Sabtu
+	'skip_without_scans': True, # lewati jika belum ada absensi sama sekali (hari libur)
+	'keterangan': 'Tidak absen (otomatis)'
+}
+
+# Bell Schedule Configuration (Hadir/Terlambat saat scan)
+SCHEDULE_CONFIG = {
+	'default_start': '07:00', # dipakai jika tidak ada jadwal di tabel jadwal_masuk
+	'default_grace_minutes': 0,
+	'ttl_seconds': 300 # jadwal dimuat ulang walaupun tidak ada perubahan lewat API
+}
+
+# Attendance Counter Configuration (tabel absensi_rekap + trigger)
+REKAP_CONFIG = {
+	'table': 'absensi_rekap',
+	'ensure_on_startup': True, # buat tabel/trigger di background saat API start
+	'rebuild_chunk_size': 500, # siswa_id per transaksi saat rebuild
+	'lock_timeout_seconds': 600 # tunggu worker lain yang sedang membuat trigger / rebuild
+}
+
+# Student Profile Cache Configuration (GET /api/students/<nis>)
+PROFILE_CONFIG = {
+	'ttl_seconds': 30, # juga membatasi umur data yang ditulis langsung ke database (manual.php, scanner-api.py)
+	'max_entries': 2000
+}
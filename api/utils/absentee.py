@@ -0,0 +1,261 @@
+# utils/absentee.py
+"""
+Daftar siswa yang belum absen dan penandaan Alpha akhir hari
+
+find_absent() menghitung selisih roster (utils.roster) dengan siswa yang
+sudah punya record absensi pada tanggal tersebut, per kelas, di memori.
+Satu-satunya query adalah daftar siswa_id absensi pada tanggal itu.
+
+mark_alpha() menyisipkan record 'Alpha' untuk semua siswa yang belum
+punya record dengan satu INSERT ... SELECT (anti-join ke absensi).
+INSERT IGNORE + unique index (siswa_id, tanggal) membuatnya aman
+dijalankan ulang dan aman terhadap scan yang masuk bersamaan; karena
+itu mark_alpha() menolak menyisipkan jika utils.schema tidak menemukan
+unique index tersebut. Scheduler menjalankannya sebagai job setiap hari
+sekolah setelah ABSENTEE_CONFIG['mark_time'], hanya di satu worker
+gunicorn (pemegang lock file scheduler).
+
+    python -m utils.absentee mark 2026-01-05 --dry-run
+"""
+
+import logging
+import threading
+import time
+from datetime import date, datetime
+from utils.database import fetch_one, fetch_all, execute
+from utils.archive import absensi_source, get_archive_boundary, HOT_TABLE
+from utils.roster import get_roster
+from utils.profile import invalidate_profile
+from utils.schema import has_unique_index
+from utils.backup import FileLock
+from utils import jobs
+from config import ABSENTEE_CONFIG
+
+logger = logging.getLogger(__name__)
+
+ALPHA = 'Alpha'
+
+_scheduler = None
+_scheduler_lock = FileLock('.alpha-scheduler.lock')  # dipegang worker yang menjalankan scheduler
+_last_scheduled = None  # tanggal terakhir yang dijadwalkan scheduler proses ini
+
+
+def _student_item(student, status):
+    return {
+        'id': student['id'],
+        'nis': student['nis'],
+        'nisn': student['nisn'],
+        'nama': student['nama'],
+        'gender': student['gender'],
+        'status': status,  # None = belum ada record, 'Alpha' = sudah ditandai
+    }
+
+
+def attendance_statuses(tanggal):
+    """siswa_id -> status untuk semua record absensi pada tanggal"""
+    rows = fetch_all(
+        f"SELECT a.siswa_id, a.status FROM {absensi_source(tanggal, tanggal)} a WHERE a.tanggal = %s",
+        (tanggal,),
+        strict=True,
+    )
+    if rows is None:
+        raise RuntimeError("Gagal membaca absensi dari database")
+    return {row['siswa_id']: row['status'] for row in rows}
+
+
+def find_absent(tanggal=None, kelas_id=None):
+    """
+    Siswa tanpa record absensi (atau berstatus Alpha) pada tanggal, per kelas.
+    Izin/Sakit tidak dihitung absen karena sudah punya keterangan.
+    """
+    tanggal = tanggal or date.today()
+    roster = get_roster()
+    statuses = attendance_statuses(tanggal)
+
+    if kelas_id is not None:
+        groups = [(kelas_id, roster.by_kelas.get(kelas_id))]
+    else:
+        groups = list(roster.by_kelas.items())
+        if roster.without_kelas:
+            groups.append((None, roster.without_kelas))  # tetap ikut ditandai Alpha
+
+    classes = []
+    total_students = absent_count = 0
+    for kid, member_ids in groups:
+        if member_ids is None:
+            continue
+        kelas = roster.kelas.get(kid, {'nama_kelas': None, 'tingkat': None, 'jurusan': None})
+        absent = [
+            _student_item(roster.students[sid], statuses.get(sid))
+            for sid in member_ids
+            if statuses.get(sid, ALPHA) == ALPHA
+        ]
+        total_students += len(member_ids)
+        absent_count += len(absent)
+        classes.append({
+            'kelas_id': kid,
+            'nama_kelas': kelas['nama_kelas'],
+            'tingkat': kelas['tingkat'],
+            'jurusan': kelas['jurusan'],
+            'total_siswa': len(member_ids),
+            'absent_count': len(absent),
+            'absent': absent,
+        })
+
+    return {
+        'date': tanggal.isoformat(),
+        'total_students': total_students,
+        'absent_count': absent_count,
+        'unmarked_count': sum(1 for c in classes for s in c['absent'] if s['status'] is None),
+        'roster_version': roster.version,
+        'classes': classes,
+    }
+
+
+def mark_alpha(tanggal=None, dry_run=False, force=False, job=None):
+    """
+    Tandai Alpha semua siswa yang belum punya record absensi pada tanggal.
+
+    Tanpa force, penandaan dilewati jika hari itu bukan hari sekolah atau
+    belum ada satu pun record absensi (kemungkinan hari libur).
+    """
+    tanggal = tanggal or date.today()
+    boundary = get_archive_boundary()
+    if boundary is not None and tanggal < boundary:
+        raise ValueError(f"Tanggal {tanggal} sudah masuk arsip")
+    if tanggal > date.today():
+        raise ValueError(f"Tanggal {tanggal} belum terjadi")
+
+    if job:
+        job.update(message='Menghitung siswa yang belum absen')
+
+    counts = fetch_one(f"""
+        SELECT
+            COUNT(*) as total_siswa,
+            COUNT(a.id) as recorded
+        FROM siswa s
+        LEFT JOIN `{HOT_TABLE}` a ON a.siswa_id = s.id AND a.tanggal = %s
+    """, (tanggal,))
+    if not counts:
+        raise RuntimeError("Gagal membaca jumlah siswa/absensi")
+
+    result = {
+        'date': tanggal.isoformat(),
+        'total_students': counts['total_siswa'],
+        'already_recorded': counts['recorded'],
+        'to_mark': counts['total_siswa'] - counts['recorded'],
+        'dry_run': dry_run,
+        'marked': 0,
+    }
+
+    if not force:
+        if tanggal.weekday() not in ABSENTEE_CONFIG['school_days']:
+            result['skipped'] = 'Bukan hari sekolah'
+            return result
+        if ABSENTEE_CONFIG['skip_without_scans'] and not counts['recorded']:
+            result['skipped'] = 'Belum ada absensi sama sekali (hari libur?)'
+            return result
+
+    if dry_run or not result['to_mark']:
+        return result
+
+    unique = has_unique_index(HOT_TABLE, ('siswa_id', 'tanggal'))
+    if unique is None:
+        raise RuntimeError("Gagal memeriksa unique index absensi")
+    if not unique:
+        raise RuntimeError("Unique index absensi (siswa_id, tanggal) tidak ditemukan; "
+                           "jalankan python -m utils.schema --apply sebelum menandai Alpha")
+
+    if job:
+        job.check_cancelled()
+        job.update(0, result['to_mark'], 'Menyisipkan record Alpha')
+
+    start = time.perf_counter()
+    insert = execute(f"""
+        INSERT IGNORE INTO `{HOT_TABLE}`
+        (siswa_id, nis, tanggal, waktu, status, metode, keterangan)
+        SELECT s.id, s.nis, %s, %s, %s, 'manual', %s
+        FROM siswa s
+        LEFT JOIN `{HOT_TABLE}` a ON a.siswa_id = s.id AND a.tanggal = %s
+        WHERE a.id IS NULL
+    """, (tanggal, datetime.now().time(), ALPHA, ABSENTEE_CONFIG['keterangan'], tanggal), commit=True)
+    if not insert['success']:
+        raise RuntimeError(f"Gagal menandai Alpha: {insert.get('error')}")
+
+    result['marked'] = insert['rowcount']
+    if result['marked']:
+        invalidate_profile()
+    result['duration_ms'] = round((time.perf_counter() - start) * 1000, 1)
+    if job:
+        job.update(result['marked'], result['to_mark'], 'Selesai')
+    logger.info(f"Alpha {tanggal}: {result['marked']} siswa ditandai ({result['duration_ms']} ms)")
+    return result
+
+
+def mark_alpha_job(job, tanggal=None, dry_run=False, force=False):
+    """Wrapper mark_alpha untuk utils.jobs.submit"""
+    return mark_alpha(tanggal, dry_run=dry_run, force=force, job=job)
+
+
+def _due_date(now=None):
+    """Tanggal yang perlu ditandai sekarang, None jika belum waktunya"""
+    now = now or datetime.now()
+    mark_time = datetime.strptime(ABSENTEE_CONFIG['mark_time'], '%H:%M').time()
+    if now.time() < mark_time or now.weekday() not in ABSENTEE_CONFIG['school_days']:
+        return None
+    if _last_scheduled == now.date():
+        return None
+    return now.date()
+
+
+def start_scheduler(check_interval=60):
+    """
+    Jalankan penandaan Alpha terjadwal di background thread (sekali per
+    proses). Hanya worker yang memegang _scheduler_lock yang menjadwalkan;
+    worker lain mencoba mengambil alih jika pemegangnya berhenti. Setelah
+    restart penandaan bisa terjadwal lagi pada hari yang sama; INSERT
+    IGNORE + unique index membuatnya tidak menambah record ganda.
+    """
+    global _scheduler
+    if _scheduler and _scheduler.is_alive():
+        return _scheduler
+
+    def loop():
+        global _last_scheduled
+        leader = False
+        while True:
+            try:
+                leader = leader or _scheduler_lock.acquire(blocking=False)
+                tanggal = _due_date() if leader else None
+                if tanggal:
+                    jobs.submit('mark-alpha', mark_alpha_job, tanggal,
+                                params={'date': tanggal.isoformat(), 'scheduled': True},
+                                exclusive=True)
+                    _last_scheduled = tanggal
+            except jobs.AlreadyRunning:
+                pass
+            except Exception as e:
+                logger.error(f"Alpha scheduler error: {e}")
+            time.sleep(check_interval)
+
+    _scheduler = threading.Thread(target=loop, name='alpha-scheduler', daemon=True)
+    _scheduler.start()
+    return _scheduler
+
+
+if __name__ == '__main__':
+    import argparse
+    import json
+
+    parser = argparse.ArgumentParser(description='Siswa belum absen / penandaan Alpha')
+    parser.add_argument('command', choices=['absent', 'mark'])
+    parser.add_argument('date', nargs='?', type=date.fromisoformat, help='YYYY-MM-DD (default hari ini)')
+    parser.add_argument('--dry-run', action='store_true')
+    parser.add_argument('--force', action='store_true', help='Abaikan cek hari sekolah/hari libur')
+    args = parser.parse_args()
+
+    if args.command == 'absent':
+        output = find_absent(args.date)
+    else:
+        output = mark_alpha(args.date, dry_run=args.dry_run, force=args.force)
+    print(json.dumps(output, indent=2, default=str))
@@ -0,0 +1,248 @@
+# utils/archive.py
+"""
+Pemisahan data absensi hot / arsip per tahun ajaran
+
+Tabel `absensi` hanya menyimpan tahun ajaran yang masih berjalan
+(ARCHIVE_CONFIG['keep_years']); tahun ajaran yang sudah ditutup dipindah
+ke `absensi_arsip` (struktur identik, dibuat dengan CREATE TABLE LIKE).
+
+Query dengan filter tanggal memakai absensi_source() untuk memilih sumber:
+rentang yang seluruhnya setelah batas arsip cukup membaca tabel hot,
+selain itu tabel hot dan arsip digabung dengan UNION ALL. Filter tanggal
+dan siswa dipasang di setiap cabang UNION karena MySQL 5.7 tidak
+meneruskan WHERE luar ke dalam derived table (kedua tabel akan
+di-materialize utuh).
+
+Batas arsip di-cache per proses dan dibaca ulang setelah
+ARCHIVE_CONFIG['boundary_ttl_seconds'], sehingga worker lain ikut
+melihat hasil pemindahan arsip.
+
+Jalankan maintenance:
+
+    python -m utils.archive --dry-run
+    python -m utils.archive --keep-years 1
+"""
+
+import logging
+import threading
+import time
+from datetime import date, timedelta
+from mysql.connector import Error
+from utils.database import get_db, fetch_one
+from utils.cache import register_invalidator
+from config import ARCHIVE_CONFIG
+
+logger = logging.getLogger(__name__)
+
+HOT_TABLE = 'absensi'
+ARCHIVE_TABLE = ARCHIVE_CONFIG['table']
+
+_boundary_lock = threading.Lock()
+_boundary_loaded = 0.0  # time.monotonic() saat dibaca; 0 = belum/diinvalidasi
+_boundary = None  # semua baris arsip memiliki tanggal < _boundary
+
+
+def academic_year_start(day):
+    """Tanggal mulai tahun ajaran (1 Juli) untuk tanggal tertentu"""
+    year = day.year if day.month >= 7 else day.year - 1
+    return date(year, 7, 1)
+
+
+def archive_cutoff(keep_years=None, today=None):
+    """Batas tanggal arsip: data sebelum tanggal ini boleh dipindah ke arsip"""
+    keep_years = keep_years or ARCHIVE_CONFIG['keep_years']
+    start = academic_year_start(today or date.today())
+    return start.replace(year=start.year - (keep_years - 1))
+
+
+def ensure_archive_table():
+    """Buat tabel arsip (struktur sama dengan absensi) jika belum ada"""
+    conn = get_db()
+    if not conn:
+        return False
+    cursor = conn.cursor()
+    try:
+        cursor.execute(f"CREATE TABLE IF NOT EXISTS `{ARCHIVE_TABLE}` LIKE `{HOT_TABLE}`")
+        return True
+    except Error as e:
+        logger.error(f"Create archive table error: {e}")
+        return False
+    finally:
+        cursor.close()
+        conn.close()
+
+
+def _load_boundary():
+    """Baca batas arsip dari MAX(tanggal) tabel arsip"""
+    table = fetch_one(
+        "SELECT COUNT(*) as total FROM information_schema.TABLES "
+        "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s",
+        (ARCHIVE_TABLE,),
+    )
+    if not table or not table['total']:
+        return None
+    row = fetch_one(f"SELECT MAX(tanggal) as last_date FROM `{ARCHIVE_TABLE}`")
+    if not row or not row['last_date']:
+        return None
+    return row['last_date'] + timedelta(days=1)
+
+
+def get_archive_boundary(refresh=False):
+    """Tanggal batas arsip (cached dengan TTL); None jika arsip kosong"""
+    global _boundary, _boundary_loaded
+    with _boundary_lock:
+        expired = time.monotonic() - _boundary_loaded >= ARCHIVE_CONFIG['boundary_ttl_seconds']
+        if refresh or not _boundary_loaded or expired:
+            _boundary = _load_boundary()
+            _boundary_loaded = time.monotonic()
+        return _boundary
+
+
+def invalidate_archive_boundary():
+    """Paksa batas arsip dibaca ulang pada pemakaian berikutnya"""
+    global _boundary_loaded
+    with _boundary_lock:
+        _boundary_loaded = 0.0
+
+
+def _boundary_stats():
+    with _boundary_lock:
+        return {'warm': bool(_boundary_loaded), 'boundary': str(_boundary) if _boundary else None}
+
+
+register_invalidator('archive_boundary', invalidate_archive_boundary, stats=_boundary_stats)
+
+
+def _as_date(value):
+    if value is None or isinstance(value, date):
+        return value
+    try:
+        return date.fromisoformat(str(value))
+    except ValueError:
+        return None
+
+
+def absensi_source(start_date=None, end_date=None, siswa_id=None):
+    """
+    Ekspresi tabel absensi untuk rentang tanggal (dipakai setelah FROM/JOIN).
+
+    Return 'absensi' jika rentang seluruhnya di tabel hot, selain itu
+    subquery UNION ALL hot + arsip dengan filter rentang tanggal dan
+    siswa_id (jika diberikan) di setiap cabang. Filter luar tetap ditulis
+    pemanggil. Selalu beri alias, mis. f"FROM {src} a".
+    """
+    boundary = get_archive_boundary()
+    start_date = _as_date(start_date)
+    end_date = _as_date(end_date)
+    if boundary is None or (start_date is not None and start_date >= boundary):
+        return HOT_TABLE
+
+    # Nilai literal hanya dari date/int yang sudah divalidasi
+    conditions = []
+    if start_date is not None:
+        conditions.append(f"tanggal >= '{start_date.isoformat()}'")
+    if end_date is not None:
+        conditions.append(f"tanggal <= '{end_date.isoformat()}'")
+    if siswa_id is not None:
+        conditions.append(f"siswa_id = {int(siswa_id)}")
+    where = f" WHERE {' AND '.join(conditions)}" if conditions else ''
+    return f"(SELECT * FROM `{HOT_TABLE}`{where} UNION ALL SELECT * FROM `{ARCHIVE_TABLE}`{where})"
+
+
+def first_attendance_date():
+    """Tanggal absensi paling awal (hot + arsip) tanpa menggabungkan kedua tabel"""
+    tables = [HOT_TABLE] + ([ARCHIVE_TABLE] if get_archive_boundary() is not None else [])
+    dates = []
+    for table in tables:
+        row = fetch_one(f"SELECT MIN(tanggal) as first_date FROM `{table}`")
+        if row and row['first_date']:
+            dates.append(row['first_date'])
+    return min(dates) if dates else None
+
+
+def archive_closed_years(keep_years=None, dry_run=False, batch_size=None, batch_sleep=None, job=None):
+    """
+    Pindahkan absensi sebelum archive_cutoff() ke tabel arsip per batch id.
+
+    Setiap batch (INSERT ... SELECT lalu DELETE) berjalan dalam satu
+    transaksi sehingga lock singkat dan scan tetap berjalan. Jika job
+    (utils.jobs.JobContext) diberikan, progress dilaporkan per batch dan
+    pembatalan berlaku setelah batch yang sedang berjalan di-commit.
+    """
+    cutoff = archive_cutoff(keep_years)
+    batch_size = batch_size or ARCHIVE_CONFIG['batch_size']
+    batch_sleep = ARCHIVE_CONFIG['batch_sleep_seconds'] if batch_sleep is None else batch_sleep
+
+    pending = fetch_one(
+        f"SELECT COUNT(*) as total FROM `{HOT_TABLE}` WHERE tanggal < %s", (cutoff,)
+    )
+    result = {
+        'cutoff': str(cutoff),
+        'pending_rows': pending['total'] if pending else 0,
+        'archived_rows': 0,
+        'dry_run': dry_run,
+    }
+    if dry_run or not result['pending_rows']:
+        return result
+
+    if not ensure_archive_table():
+        raise RuntimeError("Gagal membuat tabel arsip")
+
+    conn = get_db()
+    if not conn:
+        raise RuntimeError("Database connection failed")
+
+    started = time.perf_counter()
+    cursor = conn.cursor()
+    try:
+        while True:
+            cursor.execute(
+                f"SELECT id FROM `{HOT_TABLE}` WHERE tanggal < %s ORDER BY id LIMIT %s",
+                (cutoff, batch_size),
+            )
+            ids = [row[0] for row in cursor.fetchall()]
+            if not ids:
+                break
+
+            placeholders = ', '.join(['%s'] * len(ids))
+            cursor.execute(
+                f"INSERT INTO `{ARCHIVE_TABLE}` SELECT * FROM `{HOT_TABLE}` WHERE id IN ({placeholders})",
+                ids,
+            )
+            cursor.execute(f"DELETE FROM `{HOT_TABLE}` WHERE id IN ({placeholders})", ids)
+            conn.commit()
+
+            result['archived_rows'] += len(ids)
+            if job:
+                job.update(current=result['archived_rows'], total=result['pending_rows'])
+                job.check_cancelled()
+            if batch_sleep:
+                time.sleep(batch_sleep)
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+        conn.close()
+        invalidate_archive_boundary()
+
+    result['duration_seconds'] = round(time.perf_counter() - started, 2)
+    logger.info(f"Archived {result['archived_rows']} absensi rows before {cutoff}")
+    return result
+
+
+def archive_job(job, keep_years=None):
+    """Fungsi job untuk utils.jobs.submit"""
+    return archive_closed_years(keep_years, job=job)
+
+
+if __name__ == '__main__':
+    import argparse
+    import json
+
+    parser = argparse.ArgumentParser(description='Pindahkan absensi tahun ajaran lama ke arsip')
+    parser.add_argument('--keep-years', type=int, default=ARCHIVE_CONFIG['keep_years'])
+    parser.add_argument('--dry-run', action='store_true')
+    args = parser.parse_args()
+
+    print(json.dumps(archive_closed_years(args.keep_years, dry_run=args.dry_run), indent=2))
@@ -0,0 +1,706 @@
+# utils/backup.py
+"""
+Backup database di background dengan kompresi streaming
+
+Backup dan restore dijalankan sebagai job (utils.jobs); output
+mysqldump dialirkan per chunk ke gzip/zstd langsung ke disk. Kredensial dikirim lewat
+--defaults-extra-file sementara (bukan argumen command line).
+
+Jenis backup:
+  - full        : seluruh database (--single-transaction). Jika
+                  BACKUP_CONFIG['binlog_incremental'] aktif, posisi binlog
+                  yang konsisten dengan snapshot diambil lewat
+                  --master-data=2 dan dicatat di manifest.
+  - incremental : event binlog database ini sejak posisi backup
+                  sebelumnya (mysqlbinlog --read-from-remote-server),
+                  sehingga INSERT, UPDATE dan DELETE ikut terekam. Butuh
+                  binlog aktif dan hak RELOAD, REPLICATION CLIENT dan
+                  REPLICATION SLAVE; tanpa itu (atau jika binlog dasar
+                  sudah di-purge) backup otomatis menjadi full.
+
+Semua backup tercatat di manifest.json (status, ukuran, durasi, marker)
+sehingga daftar backup tidak perlu stat setiap file.
+
+Restore: file didekompresi on the fly dan
+dialirkan ke client mysql (full dasar lalu incremental berurutan), lalu
+cache di semua worker dikosongkan lewat utils.cache.invalidate_all().
+
+Lock backup/restore, manifest dan scheduler memakai fcntl.flock pada file
+di direktori backup sehingga berlaku lintas worker gunicorn; scheduler
+hanya berjalan di worker yang memegang lock scheduler.
+"""
+
+import fcntl
+import gzip
+import json
+import logging
+import os
+import re
+import subprocess
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+from mysql.connector import Error
+from utils.database import get_db, fetch_one
+from utils.cache import invalidate_all
+from utils import jobs
+from config import DB_CONFIG, BACKUP_CONFIG
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_FILE = 'manifest.json'
+RETRY_AFTER_FAILURE_MINUTES = 15
+EXTENSIONS = {'gzip': '.sql.gz', 'zstd': '.sql.zst', 'none': '.sql'}
+MIMETYPES = {'gzip': 'application/gzip', 'zstd': 'application/zstd', 'none': 'application/sql'}
+
+# Posisi binlog yang ditulis mysqldump --master-data=2 (MySQL 8.0.26+: SOURCE_*)
+BINLOG_COMMENT = re.compile(
+    rb"(?:MASTER|SOURCE)_LOG_FILE='([^']+)',\s*(?:MASTER|SOURCE)_LOG_POS=(\d+)")
+DUMP_HEAD_BYTES = 64 * 1024
+
+
+class FileLock:
+    """
+    Lock eksklusif lintas proses (fcntl.flock) pada file di direktori backup.
+    Setiap acquire membuka file sendiri sehingga juga berlaku antar thread.
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self._file = None
+        self._guard = threading.Lock()
+
+    def _path(self):
+        os.makedirs(BACKUP_CONFIG['directory'], exist_ok=True)
+        return os.path.join(BACKUP_CONFIG['directory'], self.name)
+
+    def acquire(self, blocking=True):
+        f = open(self._path(), 'a')
+        try:
+            fcntl.flock(f, fcntl.LOCK_EX | (0 if blocking else fcntl.LOCK_NB))
+        except BlockingIOError:
+            f.close()
+            return False
+        with self._guard:
+            self._file = f
+        return True
+
+    def release(self):
+        with self._guard:
+            f, self._file = self._file, None
+        if f:
+            fcntl.flock(f, fcntl.LOCK_UN)
+            f.close()
+
+    def locked(self):
+        """True jika lock sedang dipegang proses/thread mana pun"""
+        if not self.acquire(blocking=False):
+            return True
+        self.release()
+        return False
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
+
+
+_manifest_lock = FileLock('.manifest.lock')
+_run_lock = FileLock('.run.lock')  # satu backup/restore pada satu waktu (semua worker)
+_scheduler_lock = FileLock('.scheduler.lock')  # dipegang worker yang menjalankan scheduler
+_progress = {}  # id backup -> progress backup yang sedang berjalan
+_scheduler = None
+
+
+# ===========================================
+# MANIFEST
+# ===========================================
+def _manifest_path():
+    return os.path.join(BACKUP_CONFIG['directory'], MANIFEST_FILE)
+
+
+def compression_of(filename):
+    for compression, extension in EXTENSIONS.items():
+        if filename.endswith(extension) and compression != 'none':
+            return compression
+    return 'none'
+
+
+def _scan_legacy(directory):
+    """Bangun manifest dari file backup lama (dipakai sekali saat manifest belum ada)"""
+    entries = []
+    for filename in os.listdir(directory):
+        if not any(filename.endswith(ext) for ext in EXTENSIONS.values()):
+            continue
+        stat = os.stat(os.path.join(directory, filename))
+        entries.append({
+            'id': filename.split('.')[0],
+            'filename': filename,
+            'type': 'full',
+            'status': 'completed',
+            'compression': compression_of(filename),
+            'started_at': datetime.fromtimestamp(stat.st_mtime).isoformat(),
+            'finished_at': datetime.fromtimestamp(stat.st_mtime).isoformat(),
+            'size': stat.st_size,
+        })
+    return entries
+
+
+def _read_manifest():
+    directory = BACKUP_CONFIG['directory']
+    try:
+        with open(_manifest_path()) as f:
+            return json.load(f)['backups']
+    except FileNotFoundError:
+        return _scan_legacy(directory) if os.path.isdir(directory) else []
+
+
+def _write_manifest(entries):
+    os.makedirs(BACKUP_CONFIG['directory'], exist_ok=True)
+    tmp_path = f"{_manifest_path()}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump({'updated': datetime.now().isoformat(), 'backups': entries}, f, indent=2)
+    os.replace(tmp_path, _manifest_path())
+
+
+def _update_entry(entry):
+    """Tambah/ganti entry di manifest berdasarkan id"""
+    with _manifest_lock:
+        entries = [e for e in _read_manifest() if e['id'] != entry['id']]
+        entries.append(entry)
+        entries.sort(key=lambda e: e['started_at'])
+        _write_manifest(entries)
+
+
+def list_backups():
+    """Semua backup dari manifest (terbaru dulu) beserta progress yang berjalan"""
+    with _manifest_lock:
+        entries = _read_manifest()
+    for entry in entries:
+        if entry['id'] in _progress:
+            entry['progress'] = dict(_progress[entry['id']])
+    return sorted(entries, key=lambda e: e['started_at'], reverse=True)
+
+
+def get_backup(backup_id):
+    """Satu entry manifest berdasarkan id atau nama file"""
+    for entry in list_backups():
+        if backup_id in (entry['id'], entry['filename']):
+            return entry
+    return None
+
+
+def _latest(entries, type_=None):
+    completed = [
+        e for e in entries
+        if e['status'] == 'completed' and (type_ is None or e['type'] == type_)
+    ]
+    return max(completed, key=lambda e: e['started_at']) if completed else None
+
+
+# ===========================================
+# MYSQLDUMP
+# ===========================================
+def _defaults_file():
+    """Tulis kredensial ke file sementara (mode 0600) untuk --defaults-extra-file"""
+    fd, path = tempfile.mkstemp(prefix='mysql-', suffix='.cnf')
+    with os.fdopen(fd, 'w') as f:
+        f.write("[client]\n")
+        f.write(f"host={DB_CONFIG['host']}\n")
+        f.write(f"user={DB_CONFIG['user']}\n")
+        password = DB_CONFIG['password'].replace('\\', '\\\\').replace('"', '\\"')
+        f.write(f"password=\"{password}\"\n")
+        if DB_CONFIG.get('port'):
+            f.write(f"port={DB_CONFIG['port']}\n")
+    return path
+
+
+def _open_compressed(path, compression):
+    """File writer untuk kompresi yang dipilih"""
+    if compression == 'zstd':
+        raw = open(path, 'wb')
+        return raw, zstandard.ZstdCompressor(level=BACKUP_CONFIG['level']).stream_writer(raw)
+    if compression == 'gzip':
+        raw = open(path, 'wb')
+        return raw, gzip.GzipFile(fileobj=raw, mode='wb', compresslevel=BACKUP_CONFIG['level'])
+    raw = open(path, 'wb')
+    return raw, raw
+
+
+def _binlog_position():
+    """Posisi binlog saat ini, None jika binlog nonaktif / tidak ada hak akses"""
+    conn = get_db()
+    if not conn:
+        return None
+    cursor = conn.cursor(dictionary=True)
+    try:
+        cursor.execute("SHOW MASTER STATUS")
+        row = cursor.fetchone()
+        return {'file': row['File'], 'position': row['Position']} if row else None
+    except Error:
+        return None
+    finally:
+        cursor.close()
+        conn.close()
+
+
+def _database_size():
+    row = fetch_one(
+        "SELECT COALESCE(SUM(data_length), 0) as size FROM information_schema.TABLES "
+        "WHERE table_schema = DATABASE()"
+    )
+    return int(row['size']) if row else 0
+
+
+def _binlog_files():
+    """Nama file binlog di server (urut), None jika tidak bisa dibaca"""
+    conn = get_db()
+    if not conn:
+        return None
+    cursor = conn.cursor()
+    try:
+        cursor.execute("SHOW BINARY LOGS")
+        return [row[0] for row in cursor.fetchall()]
+    except Error:
+        return None
+    finally:
+        cursor.close()
+        conn.close()
+
+
+def _stream_dump(command, out, raw, progress, job=None):
+    """
+    Jalankan command (mysqldump/mysqlbinlog) dan alirkan stdout ke writer
+    terkompresi. Return awal output (untuk membaca posisi binlog).
+    """
+    program, args = command[0], command[1:]
+    defaults = _defaults_file()
+    head = b''
+    try:
+        with tempfile.TemporaryFile() as stderr:
+            proc = subprocess.Popen(
+                [program, f'--defaults-extra-file={defaults}'] + args,
+                stdout=subprocess.PIPE, stderr=stderr,
+            )
+            while True:
+                chunk = proc.stdout.read(BACKUP_CONFIG['chunk_size'])
+                if not chunk:
+                    break
+                if len(head) < DUMP_HEAD_BYTES:
+                    head += chunk[:DUMP_HEAD_BYTES - len(head)]
+                out.write(chunk)
+                progress['dump_bytes'] += len(chunk)
+                progress['written_bytes'] = raw.tell()
+                if job:
+                    job.update(current=progress['dump_bytes'], total=progress['estimated_bytes'],
+                               message='dump', written_bytes=progress['written_bytes'])
+                    if job.cancelled:
+                        proc.kill()
+                        proc.wait()
+                        raise jobs.JobCancelled()
+            proc.stdout.close()
+            if proc.wait() != 0:
+                stderr.seek(0)
+                raise RuntimeError(f"{program} gagal: {stderr.read().decode(errors='replace').strip()}")
+    finally:
+        os.unlink(defaults)
+    return head
+
+
+# ===========================================
+# BACKUP
+# ===========================================
+def _run(entry, dumps, job=None):
+    """Eksekusi backup: dumps = list command (mysqldump/mysqlbinlog) yang ditulis berurutan"""
+    path = os.path.join(BACKUP_CONFIG['directory'], entry['filename'])
+    progress = {'dump_bytes': 0, 'written_bytes': 0, 'estimated_bytes': entry.get('estimated_bytes', 0)}
+    _progress[entry['id']] = progress
+    started = time.perf_counter()
+
+    try:
+        raw, out = _open_compressed(path, entry['compression'])
+        try:
+            for command in dumps:
+                head = _stream_dump(command, out, raw, progress, job)
+                if '--master-data=2' in command:
+                    match = BINLOG_COMMENT.search(head)
+                    if not match:
+                        raise RuntimeError("Posisi binlog tidak ditemukan di output mysqldump")
+                    entry['marker']['binlog'] = {
+                        'file': match.group(1).decode(), 'position': int(match.group(2))}
+        finally:
+            out.close()
+            if out is not raw:
+                raw.close()
+
+        entry.update({
+            'status': 'completed',
+            'size': os.path.getsize(path),
+            'dump_bytes': progress['dump_bytes'],
+        })
+        logger.info(f"Backup {entry['filename']} selesai ({entry['size']} bytes)")
+    except Exception as e:
+        cancelled = isinstance(e, jobs.JobCancelled)
+        entry.update({'status': 'cancelled' if cancelled else 'failed', 'error': str(e) or 'Dibatalkan'})
+        if not cancelled:
+            logger.error(f"Backup {entry['filename']} gagal: {entry['error']}")
+        if os.path.exists(path):
+            os.unlink(path)
+        raise
+    finally:
+        entry['finished_at'] = datetime.now().isoformat()
+        entry['duration_seconds'] = round(time.perf_counter() - started, 2)
+        _update_entry(entry)
+        _progress.pop(entry['id'], None)
+        _run_lock.release()
+
+    if entry['status'] == 'completed' and entry['type'] == 'full':
+        prune_backups()
+    return entry
+
+
+def _incremental_base(entries, current):
+    """
+    Backup dasar untuk incremental binlog: backup terakhir yang berhasil
+    dan punya posisi binlog yang masih ada di server. None = harus full.
+    """
+    if not BACKUP_CONFIG['binlog_incremental'] or not current or not _latest(entries, 'full'):
+        return None
+    base = _latest(entries)
+    binlog = (base or {}).get('marker', {}).get('binlog')
+    if not binlog:
+        return None
+    files = _binlog_files() or []
+    if binlog['file'] not in files or current['file'] not in files:
+        return None  # binlog dasar sudah di-purge
+    return base
+
+
+def _prepare(backup_type):
+    """Buat entry manifest + daftar dump untuk jenis backup (dipanggil dengan _run_lock)"""
+    compression = BACKUP_CONFIG['compression']
+    if compression == 'zstd' and zstandard is None:
+        logger.warning("Paket zstandard tidak terpasang, backup memakai gzip")
+        compression = 'gzip'
+
+    with _manifest_lock:
+        entries = _read_manifest()
+    current = _binlog_position() if BACKUP_CONFIG['binlog_incremental'] else None
+    base = None
+    if backup_type == 'incremental':
+        base = _incremental_base(entries, current)
+        if base is None:
+            backup_type = 'full'
+
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    backup_id = f"backup_{timestamp}_{backup_type}"
+    existing = {e['id'] for e in entries}
+    suffix = 1
+    while backup_id in existing:
+        suffix += 1
+        backup_id = f"backup_{timestamp}_{backup_type}_{suffix}"
+    entry = {
+        'id': backup_id,
+        'filename': backup_id + EXTENSIONS[compression],
+        'type': backup_type,
+        'status': 'running',
+        'compression': compression,
+        'started_at': datetime.now().isoformat(),
+        'marker': {'binlog': None},
+    }
+
+    if backup_type == 'full':
+        entry['estimated_bytes'] = _database_size()
+        args = ['--single-transaction', '--quick', '--routines', '--triggers']
+        if current:
+            # Posisi binlog konsisten dengan snapshot, diisi _run dari output dump
+            args.append('--master-data=2')
+        dumps = [['mysqldump'] + args + [DB_CONFIG['database']]]
+    else:
+        since = base['marker']['binlog']
+        files = _binlog_files()
+        files = files[files.index(since['file']):files.index(current['file']) + 1]
+        entry['base'] = base['id']
+        entry['marker'].update({'binlog': current, 'since_binlog': since})
+        dumps = [[
+            'mysqlbinlog', '--read-from-remote-server',
+            f"--database={DB_CONFIG['database']}",
+            f"--start-position={int(since['position'])}",
+            f"--stop-position={int(current['position'])}",
+        ] + files]
+    return entry, dumps
+
+
+def is_busy():
+    """True jika backup/restore sedang berjalan (di worker mana pun)"""
+    return _run_lock.locked()
+
+
+def start_backup(backup_type='full', job=None):
+    """
+    Jalankan backup (sinkron, dipanggil dari job/CLI); return entry manifest.
+    Raise RuntimeError jika masih ada backup/restore yang berjalan.
+    """
+    if backup_type not in ('full', 'incremental'):
+        raise ValueError("Jenis backup harus 'full' atau 'incremental'")
+    if not _run_lock.acquire(blocking=False):
+        raise RuntimeError("Backup/restore lain masih berjalan")
+
+    try:
+        os.makedirs(BACKUP_CONFIG['directory'], exist_ok=True)
+        entry, dumps = _prepare(backup_type)
+        if job:
+            entry['job_id'] = job.job_id
+        _update_entry(entry)
+    except Exception:
+        _run_lock.release()
+        raise
+
+    return _run(entry, dumps, job)
+
+
+def backup_job(job, backup_type='full'):
+    """Fungsi job untuk utils.jobs.submit"""
+    return start_backup(backup_type, job=job)
+
+
+def prune_backups(keep_full=None):
+    """Hapus backup full lama (beserta incremental-nya) melebihi keep_full"""
+    keep_full = keep_full or BACKUP_CONFIG['keep_full']
+    with _manifest_lock:
+        entries = _read_manifest()
+        fulls = sorted(
+            (e for e in entries if e['type'] == 'full' and e['status'] == 'completed'),
+            key=lambda e: e['started_at'], reverse=True,
+        )
+        if len(fulls) <= keep_full:
+            return []
+        oldest_kept = fulls[keep_full - 1]['started_at']
+        removed = [
+            e for e in entries
+            if e['started_at'] < oldest_kept and e['status'] != 'running'
+        ]
+        for entry in removed:
+            path = os.path.join(BACKUP_CONFIG['directory'], entry['filename'])
+            if os.path.exists(path):
+                os.unlink(path)
+        _write_manifest([e for e in entries if e not in removed])
+
+    logger.info(f"Pruned {len(removed)} backup lama")
+    return [e['filename'] for e in removed]
+
+
+# ===========================================
+# RESTORE
+# ===========================================
+def _open_decompressed(path):
+    """Return (file mentah, reader hasil dekompresi) sesuai ekstensi file"""
+    raw = open(path, 'rb')
+    compression = compression_of(path)
+    if compression == 'zstd':
+        if zstandard is None:
+            raw.close()
+            raise RuntimeError("Paket zstandard dibutuhkan untuk restore file .zst")
+        return raw, zstandard.ZstdDecompressor().stream_reader(raw)
+    if compression == 'gzip':
+        return raw, gzip.GzipFile(fileobj=raw, mode='rb')
+    return raw, raw
+
+
+def restore_chain(backup_id):
+    """Urutan file untuk restore: full dasar lalu incremental sampai backup_id"""
+    with _manifest_lock:
+        entries = {e['id']: e for e in _read_manifest()}
+
+    target = entries.get(backup_id) or next(
+        (e for e in entries.values() if e['filename'] == backup_id), None)
+    if not target:
+        raise FileNotFoundError(f"Backup {backup_id} tidak ditemukan")
+
+    chain = [target]
+    while chain[0]['type'] == 'incremental':
+        base = entries.get(chain[0].get('base'))
+        if not base or base['status'] != 'completed':
+            raise FileNotFoundError(f"Backup dasar untuk {chain[0]['id']} tidak ditemukan")
+        chain.insert(0, base)
+
+    for entry in chain:
+        if not os.path.exists(os.path.join(BACKUP_CONFIG['directory'], entry['filename'])):
+            raise FileNotFoundError(f"File {entry['filename']} tidak ditemukan")
+    return chain
+
+
+def _stream_restore(path, state, job=None):
+    """Dekompresi file dan alirkan ke client mysql"""
+    defaults = _defaults_file()
+    raw, reader = _open_decompressed(path)
+    try:
+        with tempfile.TemporaryFile() as stderr:
+            proc = subprocess.Popen(
+                ['mysql', f'--defaults-extra-file={defaults}', DB_CONFIG['database']],
+                stdin=subprocess.PIPE, stderr=stderr,
+            )
+            last_byte = b''
+            try:
+                while True:
+                    chunk = reader.read(BACKUP_CONFIG['chunk_size'])
+                    if not chunk:
+                        break
+                    proc.stdin.write(chunk)
+                    state['bytes_restored'] += len(chunk)
+                    # mysqldump menutup setiap statement dengan ";\n"
+                    state['statements'] += (last_byte + chunk).count(b';\n')
+                    last_byte = chunk[-1:]
+                    state['bytes_read'] = state['bytes_read_done'] + raw.tell()
+                    if job:
+                        job.update(current=state['bytes_read'], total=state['bytes_total'],
+                                   message=state['current'], statements=state['statements'],
+                                   bytes_restored=state['bytes_restored'])
+                        if job.cancelled:
+                            proc.kill()
+                            proc.wait()
+                            raise jobs.JobCancelled()
+                proc.stdin.close()
+            except BrokenPipeError:
+                pass  # mysql berhenti karena error, pesan ada di stderr
+            if proc.wait() != 0:
+                stderr.seek(0)
+                raise RuntimeError(f"mysql gagal: {stderr.read().decode(errors='replace').strip()}")
+    finally:
+        reader.close()
+        if reader is not raw:
+            raw.close()
+        os.unlink(defaults)
+
+
+def start_restore(backup_id, job=None):
+    """
+    Restore backup beserta rantai incremental-nya (sinkron, dipanggil dari job/CLI).
+    Raise FileNotFoundError jika backup tidak ada, RuntimeError jika sibuk.
+    """
+    chain = restore_chain(backup_id)
+    if not _run_lock.acquire(blocking=False):
+        raise RuntimeError("Backup/restore lain masih berjalan")
+
+    state = {
+        'backup': chain[-1]['id'],
+        'files': [e['filename'] for e in chain],
+        'files_done': 0,
+        'current': None,
+        'bytes_total': sum(
+            os.path.getsize(os.path.join(BACKUP_CONFIG['directory'], e['filename'])) for e in chain),
+        'bytes_read': 0,
+        'bytes_read_done': 0,
+        'bytes_restored': 0,
+        'statements': 0,
+    }
+    started = time.perf_counter()
+    try:
+        for entry in chain:
+            state['current'] = entry['filename']
+            path = os.path.join(BACKUP_CONFIG['directory'], entry['filename'])
+            _stream_restore(path, state, job)
+            state['bytes_read_done'] += os.path.getsize(path)
+            state['bytes_read'] = state['bytes_read_done']
+            state['files_done'] += 1
+        logger.info(f"Restore {state['backup']} selesai ({state['statements']} statement)")
+    finally:
+        state['current'] = None
+        state['duration_seconds'] = round(time.perf_counter() - started, 2)
+        # Isi database berubah (juga saat gagal/dibatalkan di tengah jalan)
+        state['invalidated_caches'] = invalidate_all(f"restore {state['backup']}")
+        _run_lock.release()
+    return state
+
+
+def restore_job(job, backup_id):
+    """Fungsi job untuk utils.jobs.submit"""
+    return start_restore(backup_id, job=job)
+
+
+# ===========================================
+# SCHEDULER
+# ===========================================
+def _due_backup(now=None):
+    """Jenis backup yang jatuh tempo sekarang, None jika belum"""
+    now = now or datetime.now()
+    with _manifest_lock:
+        entries = _read_manifest()
+
+    # Beri jeda setelah backup gagal agar tidak diulang setiap menit
+    failed = [e for e in entries if e['status'] == 'failed']
+    if failed and now - datetime.fromisoformat(max(e['started_at'] for e in failed)) < timedelta(
+            minutes=RETRY_AFTER_FAILURE_MINUTES):
+        return None
+
+    last_full = _latest(entries, 'full')
+    if not last_full or now - datetime.fromisoformat(last_full['started_at']) >= timedelta(
+            hours=BACKUP_CONFIG['full_interval_hours']):
+        return 'full'
+
+    interval = BACKUP_CONFIG['incremental_interval_minutes'] if BACKUP_CONFIG['binlog_incremental'] else 0
+    last = _latest(entries)
+    if interval and now - datetime.fromisoformat(last['started_at']) >= timedelta(minutes=interval):
+        return 'incremental'
+    return None
+
+
+def start_scheduler(check_interval=60):
+    """
+    Jalankan backup terjadwal di background thread (sekali per proses).
+    Hanya worker yang memegang lock scheduler yang menjadwalkan backup;
+    worker lain mencoba mengambil alih jika pemegangnya berhenti.
+    """
+    global _scheduler
+    if _scheduler and _scheduler.is_alive():
+        return _scheduler
+
+    def loop():
+        leader = False
+        while True:
+            try:
+                leader = leader or _scheduler_lock.acquire(blocking=False)
+                backup_type = _due_backup() if leader else None
+                if backup_type and not is_busy():
+                    jobs.submit('backup', backup_job, backup_type,
+                                params={'type': backup_type, 'scheduled': True},
+                                exclusive=('backup', 'restore'))
+            except jobs.AlreadyRunning:
+                pass
+            except Exception as e:
+                logger.error(f"Backup scheduler error: {e}")
+            time.sleep(check_interval)
+
+    _scheduler = threading.Thread(target=loop, name='backup-scheduler', daemon=True)
+    _scheduler.start()
+    return _scheduler
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Backup database Absensi API')
+    parser.add_argument('type', nargs='?', default='full',
+                        choices=['full', 'incremental', 'list', 'prune', 'restore'])
+    parser.add_argument('backup_id', nargs='?', help='Id/nama file backup untuk restore')
+    args = parser.parse_args()
+
+    if args.type == 'restore':
+        if not args.backup_id:
+            parser.error('restore membutuhkan backup_id')
+        output = start_restore(args.backup_id)
+    elif args.type == 'list':
+        output = list_backups()
+    elif args.type == 'prune':
+        output = prune_backups()
+    else:
+        output = start_backup(args.type)
+    print(json.dumps(output, indent=2))
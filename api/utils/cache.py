@@ -0,0 +1,168 @@
+# utils/cache.py
+"""
+Registry invalidasi cache in-process
+
+Modul yang menyimpan cache turunan database (batas arsip, roster,
+counter, ETag, ...) mendaftarkan fungsi invalidasinya di sini. Operasi
+yang mengganti isi database secara massal (restore backup) cukup
+memanggil invalidate_all().
+
+Setiap worker gunicorn punya cache sendiri, jadi invalidate_all() juga
+menulis token generasi baru ke tabel cache_generation. Worker lain
+membaca token itu paling lama setiap CACHE_CONFIG['sync_interval_seconds']
+(sebelum request) dan memanggil invalidatornya sendiri jika berubah.
+Token acak (bukan counter) dipakai karena restore ikut menimpa tabel ini
+dengan isi lama.
+"""
+
+import logging
+import secrets
+import threading
+import time
+from mysql.connector import Error
+from utils.database import get_db
+from config import CACHE_CONFIG
+
+logger = logging.getLogger(__name__)
+
+GENERATION_TABLE = 'cache_generation'
+
+_lock = threading.Lock()
+_invalidators = {}
+_stats = {}
+_generation = None  # token generasi terakhir yang sudah diterapkan worker ini
+_checked_at = 0.0  # time.monotonic() pengecekan token terakhir
+
+
+def register_invalidator(name, func, stats=None):
+    """
+    Daftarkan fungsi tanpa argumen yang mengosongkan cache `name`.
+    stats (opsional): fungsi tanpa argumen yang mengembalikan dict status
+    cache, minimal {'warm': bool}, untuk diagnostik health.
+    """
+    with _lock:
+        _invalidators[name] = func
+        if stats:
+            _stats[name] = stats
+    return func
+
+
+def _generation_query(query, params=()):
+    """Jalankan query tabel generasi; None jika tabel belum ada / database error"""
+    conn = get_db()
+    if not conn:
+        return None
+    cursor = conn.cursor()
+    try:
+        cursor.execute(query, params)
+        row = cursor.fetchone() if cursor.with_rows else ()
+        conn.commit()
+        return row
+    except Error:
+        return None
+    finally:
+        cursor.close()
+        conn.close()
+
+
+def _publish_generation():
+    """Tulis token generasi baru agar worker lain ikut invalidasi"""
+    global _generation
+    token = secrets.token_hex(8)
+    _generation_query(f"""
+        CREATE TABLE IF NOT EXISTS `{GENERATION_TABLE}` (
+            id TINYINT UNSIGNED NOT NULL PRIMARY KEY,
+            token CHAR(16) NOT NULL,
+            updated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+        )
+    """)
+    written = _generation_query(
+        f"INSERT INTO `{GENERATION_TABLE}` (id, token) VALUES (1, %s) "
+        f"ON DUPLICATE KEY UPDATE token = VALUES(token)", (token,))
+    if written is None:
+        logger.warning("Gagal menulis generasi cache, worker lain menunggu TTL cache masing-masing")
+        return
+    with _lock:
+        _generation = token
+
+
+def check_generation(force=False):
+    """
+    Bandingkan token generasi di database dengan yang terakhir diterapkan
+    (paling sering setiap sync_interval_seconds). Return True jika cache
+    lokal dikosongkan karena invalidasi dari worker lain.
+    """
+    global _generation, _checked_at
+    now = time.monotonic()
+    with _lock:
+        if not force and now - _checked_at < CACHE_CONFIG['sync_interval_seconds']:
+            return False
+        _checked_at = now
+
+    row = _generation_query(f"SELECT token FROM `{GENERATION_TABLE}` WHERE id = 1")
+    if not row:
+        return False
+
+    with _lock:
+        previous, _generation = _generation, row[0]
+    if previous is None or previous == row[0]:
+        return False  # pengecekan pertama worker ini, atau tidak berubah
+    _invalidate_local('generasi cache berubah di worker lain')
+    return True
+
+
+def init_cache_sync(app):
+    """Periksa generasi cache sebelum request (dibatasi sync_interval_seconds)"""
+    @app.before_request
+    def _sync_cache_generation():
+        try:
+            check_generation()
+        except Exception as e:
+            logger.error(f"Cache generation check error: {e}")
+
+
+def invalidate_all(reason=''):
+    """
+    Panggil semua invalidator di worker ini dan umumkan ke worker lain;
+    return daftar nama cache yang dikosongkan
+    """
+    cleared = _invalidate_local(reason)
+    _publish_generation()
+    return cleared
+
+
+def _invalidate_local(reason):
+    with _lock:
+        items = list(_invalidators.items())
+
+    cleared = []
+    for name, func in items:
+        try:
+            func()
+            cleared.append(name)
+        except Exception as e:
+            logger.error(f"Invalidate cache {name} error: {e}")
+
+    logger.info(f"Cache invalidated ({reason or 'manual'}): {', '.join(cleared) or '-'}")
+    return cleared
+
+
+def registered():
+    """Nama cache yang terdaftar"""
+    with _lock:
+        return sorted(_invalidators)
+
+
+def get_cache_stats():
+    """Status setiap cache terdaftar (warm/cold dan info tambahan)"""
+    with _lock:
+        names = sorted(_invalidators)
+        stats = dict(_stats)
+
+    result = {}
+    for name in names:
+        try:
+            result[name] = stats[name]() if name in stats else {}
+        except Exception as e:
+            result[name] = {'error': str(e)}
+    return result
@@ -0,0 +1,522 @@
+# utils/columnar.py
+"""
+Arsip kolumnar absensi untuk laporan multi-tahun
+
+Bulan yang sudah ditutup di-export ke satu direktori per bulan berisi
+file kolom NumPy (.npy):
+
+    <directory>/2025-08/tanggal.npy   int32  hari sejak 1970-01-01
+                        siswa_id.npy  int32
+                        status.npy    uint8  indeks STATUS_NAMES
+                        menit.npy     int16  menit sejak 00:00 (-1 jika kosong)
+                        meta.json
+
+File dibuka dengan mmap sehingga agregasi (persentase per siswa, tren
+per kelas) dihitung vectorized tanpa membaca tabel absensi. Bulan yang
+datanya dikoreksi setelah di-export perlu di-export ulang dengan force.
+
+class_month_matrix() (rekap siswa x hari per kelas) tidak memakai file
+kolom: data bulan berjalan diambil dengan satu query rentang lalu
+dipivot dengan NumPy.
+
+    python -m utils.columnar export [--force]
+    python -m utils.columnar students --start 2024-07-01 --end 2026-06-30
+"""
+
+import json
+import logging
+import os
+import shutil
+import threading
+from datetime import date, datetime, timedelta
+from utils.database import get_db, fetch_all
+from utils.archive import absensi_source, first_attendance_date
+from utils.roster import get_roster
+from config import COLUMNAR_CONFIG
+
+try:
+    import numpy as np
+except ImportError:  # analytics kolumnar nonaktif tanpa numpy
+    np = None
+
+logger = logging.getLogger(__name__)
+
+STATUS_NAMES = ('Lainnya', 'Hadir', 'Izin', 'Sakit', 'Alpha', 'Terlambat')
+STATUS_CODES = {name: code for code, name in enumerate(STATUS_NAMES)}
+COLUMNS = {
+    'tanggal': 'int32',
+    'siswa_id': 'int32',
+    'status': 'uint8',
+    'menit': 'int16',
+}
+EPOCH = date(1970, 1, 1)
+
+_cache_lock = threading.Lock()
+_month_cache = {}  # key bulan -> (mtime meta.json, {kolom: memmap})
+
+
+def is_available():
+    """True jika numpy terpasang"""
+    return np is not None
+
+
+def _require_numpy():
+    if np is None:
+        raise RuntimeError("numpy belum terpasang (pip install numpy)")
+
+
+def day_number(day):
+    """Tanggal -> jumlah hari sejak EPOCH"""
+    return (day - EPOCH).days
+
+
+def month_key(year, month):
+    return f"{year:04d}-{month:02d}"
+
+
+def _month_range(year, month):
+    start = date(year, month, 1)
+    next_month = date(year + month // 12, month % 12 + 1, 1)
+    return start, next_month - timedelta(days=1)
+
+
+def _iter_months(start, end):
+    """(year, month) dari bulan start sampai bulan end (inklusif)"""
+    year, month = start.year, start.month
+    while (year, month) <= (end.year, end.month):
+        yield year, month
+        year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+
+
+def _month_dir(key):
+    return os.path.join(COLUMNAR_CONFIG['directory'], key)
+
+
+def last_closed_month(today=None):
+    """Hari terakhir bulan yang sudah ditutup (bulan lalu)"""
+    return (today or date.today()).replace(day=1) - timedelta(days=1)
+
+
+def _minute_of_day(waktu):
+    if waktu is None:
+        return -1
+    if isinstance(waktu, timedelta):
+        return int(waktu.total_seconds()) // 60
+    return waktu.hour * 60 + waktu.minute
+
+
+# ===========================================
+# EXPORT
+# ===========================================
+def export_month(year, month, force=False):
+    """Export satu bulan yang sudah ditutup ke file kolom; return meta"""
+    _require_numpy()
+
+    start, end = _month_range(year, month)
+    if end > last_closed_month():
+        raise ValueError(f"Bulan {month_key(year, month)} belum ditutup")
+
+    key = month_key(year, month)
+    target = _month_dir(key)
+    if os.path.exists(os.path.join(target, 'meta.json')) and not force:
+        return None
+
+    conn = get_db()
+    if not conn:
+        raise RuntimeError("Database connection failed")
+
+    chunks = {name: [] for name in COLUMNS}
+    cursor = conn.cursor()
+    try:
+        cursor.execute(f"""
+            SELECT tanggal, siswa_id, status, waktu
+            FROM {absensi_source(start, end)} a
+            WHERE tanggal BETWEEN %s AND %s
+                AND siswa_id IS NOT NULL
+        """, (start, end))
+        while True:
+            rows = cursor.fetchmany(COLUMNAR_CONFIG['fetch_size'])
+            if not rows:
+                break
+            chunks['tanggal'].append(np.fromiter(
+                (day_number(r[0]) for r in rows), dtype=COLUMNS['tanggal'], count=len(rows)))
+            chunks['siswa_id'].append(np.fromiter(
+                (r[1] for r in rows), dtype=COLUMNS['siswa_id'], count=len(rows)))
+            chunks['status'].append(np.fromiter(
+                (STATUS_CODES.get(r[2], 0) for r in rows), dtype=COLUMNS['status'], count=len(rows)))
+            chunks['menit'].append(np.fromiter(
+                (_minute_of_day(r[3]) for r in rows), dtype=COLUMNS['menit'], count=len(rows)))
+    finally:
+        cursor.close()
+        conn.close()
+
+    columns = {
+        name: np.concatenate(parts) if parts else np.empty(0, dtype=COLUMNS[name])
+        for name, parts in chunks.items()
+    }
+
+    # Tulis ke direktori sementara lalu rename agar pembaca tidak melihat file setengah jadi
+    tmp_dir = f"{target}.tmp"
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+    for name, values in columns.items():
+        np.save(os.path.join(tmp_dir, f"{name}.npy"), values)
+
+    meta = {
+        'month': key,
+        'rows': int(len(columns['tanggal'])),
+        'max_siswa_id': int(columns['siswa_id'].max()) if len(columns['siswa_id']) else 0,
+        'exported_at': datetime.now().isoformat(),
+    }
+    with open(os.path.join(tmp_dir, 'meta.json'), 'w') as f:
+        json.dump(meta, f, indent=2)
+
+    shutil.rmtree(target, ignore_errors=True)
+    os.replace(tmp_dir, target)
+    with _cache_lock:
+        _month_cache.pop(key, None)
+
+    logger.info(f"Columnar export {key}: {meta['rows']} rows")
+    return meta
+
+
+def export_closed_months(force=False, job=None):
+    """
+    Export semua bulan yang sudah ditutup dan belum punya file kolom.
+    Jika job (utils.jobs.JobContext) diberikan, progress dilaporkan per
+    bulan dan pembatalan berlaku di antara bulan.
+    """
+    _require_numpy()
+
+    first_date = first_attendance_date()
+    result = {'exported': [], 'skipped': 0, 'rows': 0}
+    if not first_date:
+        return result
+
+    last = last_closed_month()
+    months = list(_iter_months(first_date, last))
+    for index, (year, month) in enumerate(months):
+        if job:
+            job.check_cancelled()
+            job.update(index, len(months), f"{year}-{month:02d}")
+        meta = export_month(year, month, force=force)
+        if meta is None:
+            result['skipped'] += 1
+        else:
+            result['exported'].append(meta['month'])
+            result['rows'] += meta['rows']
+    if job:
+        job.update(len(months), len(months))
+    return result
+
+
+def export_job(job, force=False):
+    """Fungsi job untuk utils.jobs.submit: export bulan tertutup"""
+    result = export_closed_months(force=force, job=job)
+    result['message'] = f"{len(result['exported'])} bulan di-export ({result['rows']} baris)"
+    return result
+
+
+# ===========================================
+# LOAD (mmap)
+# ===========================================
+def list_months():
+    """Daftar meta bulan yang sudah di-export, urut bulan"""
+    directory = COLUMNAR_CONFIG['directory']
+    if not os.path.isdir(directory):
+        return []
+    months = []
+    for name in sorted(os.listdir(directory)):
+        meta_path = os.path.join(directory, name, 'meta.json')
+        if os.path.exists(meta_path):
+            with open(meta_path) as f:
+                months.append(json.load(f))
+    return months
+
+
+def load_month(key):
+    """Return {kolom: array mmap} untuk satu bulan, None jika belum di-export"""
+    _require_numpy()
+
+    target = _month_dir(key)
+    meta_path = os.path.join(target, 'meta.json')
+    try:
+        mtime = os.path.getmtime(meta_path)
+    except OSError:
+        return None
+
+    with _cache_lock:
+        cached = _month_cache.get(key)
+        if cached and cached[0] == mtime:
+            return cached[1]
+
+    columns = {
+        name: np.load(os.path.join(target, f"{name}.npy"), mmap_mode='r')
+        for name in COLUMNS
+    }
+    with _cache_lock:
+        _month_cache[key] = (mtime, columns)
+    return columns
+
+
+def _iter_range(start, end):
+    """Yield (key, kolom) per bulan dalam rentang, sudah difilter tanggal"""
+    first, last = day_number(start), day_number(end)
+    for year, month in _iter_months(start, end):
+        key = month_key(year, month)
+        columns = load_month(key)
+        if columns is None or not len(columns['tanggal']):
+            continue
+        month_start, month_end = _month_range(year, month)
+        if month_start < start or month_end > end:
+            tanggal = columns['tanggal']
+            mask = (tanggal >= first) & (tanggal <= last)
+            columns = {name: values[mask] for name, values in columns.items()}
+        yield key, columns
+
+
+def coverage(start, end):
+    """Bulan dalam rentang yang belum tersedia di arsip kolumnar"""
+    exported = {m['month'] for m in list_months()}
+    return [
+        month_key(y, m) for y, m in _iter_months(start, end)
+        if month_key(y, m) not in exported
+    ]
+
+
+# ===========================================
+# AGGREGATES
+# ===========================================
+def _rates(counts):
+    """Tambahkan persentase_hadir (Hadir + Terlambat dibanding total)"""
+    total = counts.sum(axis=-1)
+    present = counts[..., STATUS_CODES['Hadir']] + counts[..., STATUS_CODES['Terlambat']]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        rate = np.where(total > 0, present * 100.0 / total, 0.0)
+    return total, rate
+
+
+def student_summary(start, end, siswa_ids=None):
+    """
+    Rekap per siswa dalam rentang: jumlah per status, persentase hadir dan
+    rata-rata menit kedatangan (status Hadir/Terlambat).
+    """
+    _require_numpy()
+    n_status = len(STATUS_NAMES)
+    counts = np.zeros((1, n_status), dtype=np.int64)
+    minute_sum = np.zeros(1, dtype=np.int64)
+    minute_count = np.zeros(1, dtype=np.int64)
+
+    for _, columns in _iter_range(start, end):
+        siswa = columns['siswa_id'].astype(np.int64)
+        if not len(siswa):
+            continue
+        size = int(siswa.max()) + 1
+        if size > len(counts):
+            counts = np.vstack([counts, np.zeros((size - len(counts), n_status), dtype=np.int64)])
+            minute_sum = np.concatenate([minute_sum, np.zeros(size - len(minute_sum), dtype=np.int64)])
+            minute_count = np.concatenate([minute_count, np.zeros(size - len(minute_count), dtype=np.int64)])
+
+        flat = siswa * n_status + columns['status']
+        counts += np.bincount(flat, minlength=len(counts) * n_status).reshape(-1, n_status)
+
+        menit = columns['menit']
+        arrived = (menit >= 0) & (
+            (columns['status'] == STATUS_CODES['Hadir']) | (columns['status'] == STATUS_CODES['Terlambat'])
+        )
+        minute_sum += np.bincount(siswa[arrived], weights=menit[arrived], minlength=len(counts)).astype(np.int64)
+        minute_count += np.bincount(siswa[arrived], minlength=len(counts))
+
+    total, rate = _rates(counts)
+    ids = np.nonzero(total)[0]
+    if siswa_ids is not None:
+        ids = ids[np.isin(ids, np.asarray(list(siswa_ids), dtype=np.int64))]
+
+    results = []
+    for siswa_id in ids.tolist():
+        item = {'siswa_id': siswa_id, 'total': int(total[siswa_id])}
+        for code, name in enumerate(STATUS_NAMES):
+            item[name.lower()] = int(counts[siswa_id, code])
+        item['persentase_hadir'] = round(float(rate[siswa_id]), 1)
+        if minute_count[siswa_id]:
+            avg = minute_sum[siswa_id] / minute_count[siswa_id]
+            item['rata_rata_datang'] = f"{int(avg) // 60:02d}:{int(avg) % 60:02d}"
+        else:
+            item['rata_rata_datang'] = None
+        results.append(item)
+    return results
+
+
+def class_trends(start, end, kelas_of):
+    """
+    Tren bulanan per kelas. kelas_of: {siswa_id: kelas_id} (kelas saat ini).
+    Return list {bulan, kelas_id, total, <status>, persentase_hadir}.
+    """
+    _require_numpy()
+    n_status = len(STATUS_NAMES)
+
+    lookup_size = max(kelas_of, default=0) + 1
+    lookup = np.full(lookup_size, -1, dtype=np.int64)
+    if kelas_of:
+        lookup[np.fromiter(kelas_of.keys(), dtype=np.int64)] = np.fromiter(
+            (k if k is not None else -1 for k in kelas_of.values()), dtype=np.int64)
+    kelas_ids = np.unique(lookup[lookup >= 0])
+    kelas_index = np.full(int(kelas_ids.max()) + 1 if len(kelas_ids) else 1, -1, dtype=np.int64)
+    kelas_index[kelas_ids] = np.arange(len(kelas_ids))
+
+    results = []
+    for key, columns in _iter_range(start, end):
+        siswa = columns['siswa_id'].astype(np.int64)
+        known = siswa < lookup_size
+        kelas = np.full(len(siswa), -1, dtype=np.int64)
+        kelas[known] = lookup[siswa[known]]
+        valid = kelas >= 0
+        if not valid.any():
+            continue
+
+        flat = kelas_index[kelas[valid]] * n_status + columns['status'][valid]
+        counts = np.bincount(flat, minlength=len(kelas_ids) * n_status).reshape(-1, n_status)
+        total, rate = _rates(counts)
+
+        for row in np.nonzero(total)[0].tolist():
+            item = {'bulan': key, 'kelas_id': int(kelas_ids[row]), 'total': int(total[row])}
+            for code, name in enumerate(STATUS_NAMES):
+                item[name.lower()] = int(counts[row, code])
+            item['persentase_hadir'] = round(float(rate[row]), 1)
+            results.append(item)
+    return results
+
+
+# ===========================================
+# MATRIX (rekap bulanan siswa x hari)
+# ===========================================
+MATRIX_CHARS = '?HISAT'  # satu karakter per STATUS_NAMES
+MATRIX_EMPTY = '.'  # tidak ada record absensi
+_MATRIX_LOOKUP = (MATRIX_CHARS + MATRIX_EMPTY).encode()
+
+
+def pivot_matrix(member_ids, rows, n_days):
+    """
+    Pivot (siswa_id, hari, status) menjadi matriks kode status uint8
+    berukuran len(member_ids) x n_days. Sel tanpa record berisi kode
+    len(STATUS_NAMES) (MATRIX_EMPTY); record siswa di luar member_ids
+    diabaikan.
+    """
+    _require_numpy()
+    empty = len(STATUS_NAMES)
+    matrix = np.full((len(member_ids), n_days), empty, dtype=np.uint8)
+    if not member_ids or not rows:
+        return matrix
+
+    ids = np.asarray(member_ids, dtype=np.int64)
+    lookup = np.full(int(ids.max()) + 1, -1, dtype=np.int64)
+    lookup[ids] = np.arange(len(ids))
+
+    siswa = np.fromiter((r[0] for r in rows), dtype=np.int64, count=len(rows))
+    hari = np.fromiter((r[1] for r in rows), dtype=np.int64, count=len(rows)) - 1
+    status = np.fromiter((STATUS_CODES.get(r[2], 0) for r in rows), dtype=np.uint8, count=len(rows))
+
+    known = (siswa < len(lookup)) & (hari >= 0) & (hari < n_days)
+    row_index = np.full(len(siswa), -1, dtype=np.int64)
+    row_index[known] = lookup[siswa[known]]
+    valid = row_index >= 0
+    matrix[row_index[valid], hari[valid]] = status[valid]
+    return matrix
+
+
+def _matrix_totals(matrix, axis):
+    """Jumlah per kode status sepanjang axis (1 = per siswa, 0 = per hari)"""
+    n_codes = len(STATUS_NAMES) + 1
+    cells = matrix if axis == 1 else matrix.T
+    index = np.repeat(np.arange(cells.shape[0]), cells.shape[1])
+    counts = np.bincount(index * n_codes + cells.ravel(), minlength=cells.shape[0] * n_codes)
+    counts = counts.reshape(-1, n_codes)
+
+    totals = {char: counts[:, code].tolist() for code, char in enumerate(MATRIX_CHARS) if code}
+    recorded = counts[:, :len(STATUS_NAMES)].sum(axis=1)
+    present = counts[:, STATUS_CODES['Hadir']] + counts[:, STATUS_CODES['Terlambat']]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        rate = np.where(recorded > 0, present * 100.0 / recorded, 0.0)
+    totals['recorded'] = recorded.tolist()
+    totals['persentase_hadir'] = np.round(rate, 1).tolist()
+    return totals
+
+
+def encode_matrix(matrix):
+    """Satu string kode status per baris, mis. 'HHT.AHH...'"""
+    _require_numpy()
+    chars = np.frombuffer(_MATRIX_LOOKUP, dtype=np.uint8)[matrix]
+    width = matrix.shape[1]
+    data = chars.tobytes().decode('ascii')
+    return [data[i * width:(i + 1) * width] for i in range(matrix.shape[0])]
+
+
+def class_month_matrix(kelas_id, year, month):
+    """
+    Rekap bulanan satu kelas: siswa x hari dari satu query rentang,
+    dipivot dengan NumPy. Kolom dikirim sebagai array paralel (bukan
+    list of dict) dan status sebagai string per siswa.
+    """
+    _require_numpy()
+    roster = get_roster()
+    kelas = roster.kelas.get(kelas_id)
+    if not kelas:
+        return None
+
+    start, end = _month_range(year, month)
+    member_ids = roster.by_kelas[kelas_id]
+    rows = fetch_all(f"""
+        SELECT a.siswa_id, DAY(a.tanggal) as hari, a.status
+        FROM {absensi_source(start, end)} a
+        JOIN siswa s ON a.siswa_id = s.id
+        WHERE s.kelas_id = %s AND a.tanggal BETWEEN %s AND %s
+    """, (kelas_id, start, end), strict=True)
+    if rows is None:
+        raise RuntimeError("Gagal membaca absensi dari database")
+
+    n_days = end.day
+    matrix = pivot_matrix(member_ids, [(r['siswa_id'], r['hari'], r['status']) for r in rows], n_days)
+    students = [roster.students[sid] for sid in member_ids]
+
+    return {
+        'kelas': {'id': kelas_id, 'nama_kelas': kelas['nama_kelas'], 'tingkat': kelas['tingkat'],
+                  'jurusan': kelas['jurusan']},
+        'month': month_key(year, month),
+        'days': n_days,
+        'weekdays': [(start + timedelta(days=d)).isoweekday() for d in range(n_days)],
+        'legend': {
+            **{char: STATUS_NAMES[code] for code, char in enumerate(MATRIX_CHARS)},
+            MATRIX_EMPTY: 'Tidak ada record',
+        },
+        'students': {
+            'id': member_ids,
+            'nis': [s['nis'] for s in students],
+            'nama': [s['nama'] for s in students],
+            'codes': encode_matrix(matrix),
+        },
+        'row_totals': _matrix_totals(matrix, axis=1),
+        'column_totals': _matrix_totals(matrix, axis=0),
+    }
+
+
+if __name__ == '__main__':
+    import argparse
+    import time
+
+    parser = argparse.ArgumentParser(description='Arsip kolumnar absensi untuk laporan multi-tahun')
+    sub = parser.add_subparsers(dest='command', required=True)
+    export_parser = sub.add_parser('export', help='Export bulan yang sudah ditutup')
+    export_parser.add_argument('--force', action='store_true', help='Export ulang bulan yang sudah ada')
+    students_parser = sub.add_parser('students', help='Rekap per siswa dari arsip kolumnar')
+    students_parser.add_argument('--start', required=True, type=date.fromisoformat)
+    students_parser.add_argument('--end', required=True, type=date.fromisoformat)
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    if args.command == 'export':
+        output = export_closed_months(force=args.force)
+    else:
+        rows = student_summary(args.start, args.end)
+        output = {'students': len(rows), 'missing_months': coverage(args.start, args.end), 'sample': rows[:5]}
+    output['duration_ms'] = round((time.perf_counter() - started) * 1000, 1)
+    print(json.dumps(output, indent=2))
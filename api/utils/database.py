@@ -1,15 +1,217 @@
 # utils/database.py
 import mysql.connector
-from mysql.connector import Error
+from mysql.connector import Error, pooling
+from mysql.connector.errors import PoolError
 import logging
-from config import DB_CONFIG
+import re
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from datetime import datetime
+from functools import lru_cache
+from flask import g, has_app_context
+from config import DB_CONFIG, DB_STATS_CONFIG, DB_POOL_CONFIG
 
 logger = logging.getLogger(__name__)
 
+# ===========================================
+# QUERY INSTRUMENTATION
+# ===========================================
+_stats_lock = threading.Lock()
+_query_stats = {}  # fingerprint -> {calls, total_ms, max_ms, rows, errors}
+_slow_queries = deque(maxlen=DB_STATS_CONFIG['slow_log_size'])
+_last_explain = {}  # fingerprint -> time.monotonic() EXPLAIN terakhir
+
+_STRING_LITERAL = re.compile(r"'(?:[^'\\]|\\.)*'|\"(?:[^\"\\]|\\.)*\"")
+_NUMBER_LITERAL = re.compile(r"\b\d+(?:\.\d+)?\b")
+_PLACEHOLDER_LIST = re.compile(r"\(\s*(?:%s|\?)(?:\s*,\s*(?:%s|\?))+\s*\)")
+_WHITESPACE = re.compile(r"\s+")
+_EXPLAINABLE = ('SELECT', 'UPDATE', 'DELETE')
+
+
+@lru_cache(maxsize=1024)
+def normalize_query(query):
+    """Normalize SQL menjadi fingerprint (literal -> ?, whitespace diringkas)"""
+    fingerprint = _STRING_LITERAL.sub('?', query)
+    fingerprint = _NUMBER_LITERAL.sub('?', fingerprint)
+    fingerprint = fingerprint.replace('%s', '?')
+    fingerprint = _PLACEHOLDER_LIST.sub('(?+)', fingerprint)
+    return _WHITESPACE.sub(' ', fingerprint).strip()
+
+
+def _capture_explain(conn, query, params):
+    """Jalankan EXPLAIN untuk query lambat pada koneksi yang sama"""
+    try:
+        cursor = conn.cursor(dictionary=True)
+        try:
+            cursor.execute(f"EXPLAIN {query}", params or ())
+            return cursor.fetchall()
+        finally:
+            cursor.close()
+    except Error as e:
+        return [{"error": str(e)}]
+
+
+def _record_query(conn, query, params, elapsed, rows, error=False):
+    """Catat statistik query per fingerprint, per request, dan slow-query log"""
+    elapsed_ms = elapsed * 1000
+    fingerprint = normalize_query(query)
+
+    with _stats_lock:
+        stats = _query_stats.get(fingerprint)
+        if stats is None:
+            if len(_query_stats) >= DB_STATS_CONFIG['max_fingerprints']:
+                fingerprint = '<other>'
+                stats = _query_stats.get(fingerprint)
+            if stats is None:
+                stats = _query_stats[fingerprint] = {
+                    'calls': 0, 'total_ms': 0.0, 'max_ms': 0.0, 'rows': 0, 'errors': 0
+                }
+        stats['calls'] += 1
+        stats['total_ms'] += elapsed_ms
+        stats['rows'] += rows or 0
+        if elapsed_ms > stats['max_ms']:
+            stats['max_ms'] = elapsed_ms
+        if error:
+            stats['errors'] += 1
+
+    if has_app_context():
+        g.db_query_count = g.get('db_query_count', 0) + 1
+        g.db_query_ms = g.get('db_query_ms', 0.0) + elapsed_ms
+
+    if error or elapsed_ms < DB_STATS_CONFIG['slow_query_ms']:
+        return
+
+    explain = None
+    if DB_STATS_CONFIG['explain'] and fingerprint.upper().startswith(_EXPLAINABLE):
+        now = time.monotonic()
+        with _stats_lock:
+            last = _last_explain.get(fingerprint, 0)
+            due = now - last >= DB_STATS_CONFIG['explain_cooldown_seconds']
+            if due:
+                _last_explain[fingerprint] = now
+        if due:
+            explain = _capture_explain(conn, query, params)
+
+    logger.warning(f"Slow query ({elapsed_ms:.1f} ms): {fingerprint[:200]}")
+    with _stats_lock:
+        _slow_queries.append({
+            'timestamp': datetime.now().isoformat(),
+            'fingerprint': fingerprint,
+            'duration_ms': round(elapsed_ms, 2),
+            'rows': rows,
+            'explain': explain
+        })
+
+
+def get_query_stats(limit=20, order_by='total_ms'):
+    """Return statistik fingerprint teratas (default: total waktu)"""
+    with _stats_lock:
+        items = [dict(stats, fingerprint=fp) for fp, stats in _query_stats.items()]
+
+    for item in items:
+        item['avg_ms'] = round(item['total_ms'] / item['calls'], 2) if item['calls'] else 0
+        item['total_ms'] = round(item['total_ms'], 2)
+        item['max_ms'] = round(item['max_ms'], 2)
+
+    items.sort(key=lambda item: item.get(order_by, 0), reverse=True)
+    return items[:limit]
+
+
+def get_slow_queries():
+    """Return isi slow-query ring buffer (terbaru lebih dulu)"""
+    with _stats_lock:
+        return list(reversed(_slow_queries))
+
+
+def reset_query_stats():
+    """Kosongkan statistik query dan slow-query log"""
+    with _stats_lock:
+        _query_stats.clear()
+        _slow_queries.clear()
+        _last_explain.clear()
+
+
+def init_query_stats(app):
+    """Tambahkan header jumlah/waktu query per request ke setiap response"""
+    @app.after_request
+    def _add_query_headers(response):
+        response.headers['X-Query-Count'] = str(g.get('db_query_count', 0))
+        response.headers['X-Query-Time-Ms'] = f"{g.get('db_query_ms', 0.0):.2f}"
+        return response
+
+
+# ===========================================
+# QUERY HELPERS
+# ===========================================
+_pool_lock = threading.Lock()
+_pool = None
+_pool_retry_at = 0.0
+_pool_stats = {'checkouts': 0, 'exhausted': 0, 'direct': 0}
+
+
+def _get_pool():
+    """Buat connection pool secara lazy; coba lagi 30 detik setelah gagal"""
+    global _pool, _pool_retry_at
+    if _pool or not DB_POOL_CONFIG['enabled']:
+        return _pool
+    with _pool_lock:
+        if _pool is None and time.monotonic() >= _pool_retry_at:
+            try:
+                _pool = pooling.MySQLConnectionPool(
+                    pool_name='absensi',
+                    pool_size=DB_POOL_CONFIG['pool_size'],
+                    **DB_CONFIG
+                )
+            except Error as e:
+                _pool_retry_at = time.monotonic() + 30
+                logger.error(f"Create connection pool error: {e}")
+    return _pool
+
+
+def get_pool_stats():
+    """Ukuran pool, koneksi terpakai dan saturasi"""
+    pool = _pool
+    size = DB_POOL_CONFIG['pool_size'] if pool else 0
+    # _cnx_queue berisi koneksi idle di pool
+    idle = pool._cnx_queue.qsize() if pool else 0
+    with _pool_lock:
+        stats = dict(_pool_stats)
+    stats.update({
+        'enabled': DB_POOL_CONFIG['enabled'],
+        'ready': pool is not None,
+        'size': size,
+        'in_use': size - idle,
+        'idle': idle,
+        'saturation': round((size - idle) / size, 2) if size else 0,
+    })
+    return stats
+
+
 def get_db():
-    """Get database connection"""
+    """Get database connection (dari pool; close() mengembalikan koneksi ke pool)"""
+    pool = _get_pool()
+    if pool:
+        try:
+            conn = pool.get_connection()
+            with _pool_lock:
+                _pool_stats['checkouts'] += 1
+            return conn
+        except PoolError:
+            with _pool_lock:
+                _pool_stats['exhausted'] += 1
+            if not DB_POOL_CONFIG['fallback_direct']:
+                logger.error("Database connection error: pool habis")
+                return None
+        except Error as e:
+            logger.error(f"Database connection error: {e}")
+            return None
+
     try:
         conn = mysql.connector.connect(**DB_CONFIG)
+        with _pool_lock:
+            _pool_stats['direct'] += 1
         return conn
     except Error as e:
         logger.error(f"Database connection error: {e}")
@@ -21,32 +223,42 @@ def fetch_one(query, params=None):
     cursor = None
     try:
         conn = get_db()
+        start = time.perf_counter()  # waktu query saja, tanpa ambil koneksi
         if not conn:
             return None
         cursor = conn.cursor(dictionary=True)
         cursor.execute(query, params or ())
-        return cursor.fetchone()
+        row = cursor.fetchone()
+        cursor.fetchall()  # buang sisa baris agar koneksi bersih untuk EXPLAIN
+        _record_query(conn, query, params, time.perf_counter() - start, 1 if row else 0)
+        return row
     except Error as e:
         logger.error(f"Query error: {e}")
+        _record_query(conn, query, params, time.perf_counter() - start, 0, error=True)
         return None
     finally:
         if cursor: cursor.close()
         if conn: conn.close()
 
-def fetch_all(query, params=None):
-    """Fetch all rows"""
+def fetch_all(query, params=None, strict=False):
+    """Fetch all rows; strict=True return None (bukan []) jika koneksi/query gagal"""
     conn = None
     cursor = None
+    failed = None if strict else []
     try:
         conn = get_db()
+        start = time.perf_counter()
         if not conn:
-            return []
+            return failed
         cursor = conn.cursor(dictionary=True)
         cursor.execute(query, params or ())
-        return cursor.fetchall()
+        rows = cursor.fetchall()
+        _record_query(conn, query, params, time.perf_counter() - start, len(rows))
+        return rows
     except Error as e:
         logger.error(f"Query error: {e}")
-        return []
+        _record_query(conn, query, params, time.perf_counter() - start, 0, error=True)
+        return failed
     finally:
         if cursor: cursor.close()
         if conn: conn.close()
@@ -57,21 +269,81 @@ def execute(query, params=None, commit=False):
     cursor = None
     try:
         conn = get_db()
+        start = time.perf_counter()
         if not conn:
             return {'success': False, 'error': 'Connection failed'}
         cursor = conn.cursor(dictionary=True)
         cursor.execute(query, params or ())
-        
+
         result = {'success': True}
         if commit:
             conn.commit()
             result['rowcount'] = cursor.rowcount
             result['last_id'] = cursor.lastrowid
-        
+
+        _record_query(conn, query, params, time.perf_counter() - start, max(cursor.rowcount, 0))
         return result
     except Error as e:
         logger.error(f"Execute error: {e}")
+        _record_query(conn, query, params, time.perf_counter() - start, 0, error=True)
         return {'success': False, 'error': str(e)}
     finally:
         if cursor: cursor.close()
         if conn: conn.close()
+
+
+class Transaction:
+    """Cursor dalam satu transaksi; setiap query tetap tercatat di query stats"""
+
+    def __init__(self, conn):
+        self.conn = conn
+        self.cursor = conn.cursor(dictionary=True)
+
+    def execute(self, query, params=None):
+        """Return list baris untuk SELECT, rowcount untuk query lain"""
+        start = time.perf_counter()
+        try:
+            self.cursor.execute(query, params or ())
+            # Hasil dibaca dulu agar EXPLAIN slow query bisa memakai koneksi yang sama
+            result = self.cursor.fetchall() if self.cursor.with_rows else self.cursor.rowcount
+        except Error:
+            _record_query(self.conn, query, params, time.perf_counter() - start, 0, error=True)
+            raise
+        rows = len(result) if isinstance(result, list) else max(result, 0)
+        _record_query(self.conn, query, params, time.perf_counter() - start, rows)
+        return result
+
+    def executemany(self, query, seq_params):
+        """Return total rowcount"""
+        start = time.perf_counter()
+        try:
+            self.cursor.executemany(query, seq_params)
+        except Error:
+            _record_query(self.conn, query, None, time.perf_counter() - start, 0, error=True)
+            raise
+        _record_query(self.conn, query, None, time.perf_counter() - start, max(self.cursor.rowcount, 0))
+        return self.cursor.rowcount
+
+
+@contextmanager
+def transaction():
+    """
+    Jalankan beberapa query dalam satu transaksi (commit di akhir blok,
+    rollback jika ada exception):
+
+        with transaction() as tx:
+            tx.execute("UPDATE ...", params)
+    """
+    conn = get_db()
+    if not conn:
+        raise RuntimeError("Database connection failed")
+    tx = Transaction(conn)
+    try:
+        yield tx
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        tx.cursor.close()
+        conn.close()
@@ -0,0 +1,125 @@
+# utils/health.py
+"""
+Health probe database di background
+
+Probe (ambil koneksi dari pool + SELECT 1) dijalankan setiap
+HEALTH_CONFIG['interval_seconds'] oleh satu thread; endpoint health
+hanya membaca hasil terakhir sehingga probe load balancer tidak pernah
+membuka koneksi database sendiri.
+"""
+
+import logging
+import threading
+import time
+from datetime import datetime
+from utils.database import get_db, get_pool_stats
+from utils.cache import get_cache_stats
+from utils.logger import get_logging_stats
+from utils import jobs
+from config import HEALTH_CONFIG
+
+logger = logging.getLogger(__name__)
+
+_lock = threading.Lock()
+_last_probe = None
+_consecutive_failures = 0
+_thread = None
+_started_at = time.time()
+
+
+def probe_database():
+    """Satu kali probe: ambil koneksi, SELECT 1, kembalikan ke pool"""
+    global _last_probe, _consecutive_failures
+
+    start = time.perf_counter()
+    result = {'ok': False, 'checked_at': datetime.now().isoformat(), 'error': None}
+    conn = get_db()
+    if conn:
+        cursor = None
+        try:
+            cursor = conn.cursor()
+            cursor.execute("SELECT 1")
+            cursor.fetchall()
+            result['ok'] = True
+        except Exception as e:
+            result['error'] = str(e)
+        finally:
+            if cursor:
+                cursor.close()
+            conn.close()
+    else:
+        result['error'] = 'Database connection failed'
+    result['latency_ms'] = round((time.perf_counter() - start) * 1000, 2)
+
+    with _lock:
+        _consecutive_failures = 0 if result['ok'] else _consecutive_failures + 1
+        result['consecutive_failures'] = _consecutive_failures
+        if not result['ok'] and _consecutive_failures == 1:
+            logger.warning(f"Health probe database gagal: {result['error']}")
+        _last_probe = result
+        result['_monotonic'] = time.monotonic()
+    return result
+
+
+def start_health_probe():
+    """Jalankan probe berkala di background thread (sekali per proses)"""
+    global _thread
+    if _thread and _thread.is_alive():
+        return _thread
+
+    def loop():
+        while True:
+            try:
+                probe_database()
+            except Exception as e:
+                logger.error(f"Health probe error: {e}")
+            time.sleep(HEALTH_CONFIG['interval_seconds'])
+
+    _thread = threading.Thread(target=loop, name='health-probe', daemon=True)
+    _thread.start()
+    return _thread
+
+
+def get_database_status():
+    """Hasil probe terakhir beserta umur dan status fresh/stale"""
+    with _lock:
+        probe = dict(_last_probe) if _last_probe else None
+    if not probe:
+        return {'ok': False, 'status': 'unknown', 'error': 'Belum ada probe'}
+
+    age = time.monotonic() - probe.pop('_monotonic')
+    probe['age_seconds'] = round(age, 1)
+    probe['stale'] = age > HEALTH_CONFIG['stale_after_seconds']
+    probe['status'] = 'connected' if probe['ok'] and not probe['stale'] else 'disconnected'
+    return probe
+
+
+def is_ready():
+    """Siap menerima trafik: probe terakhir berhasil dan masih fresh"""
+    status = get_database_status()
+    return status['ok'] and not status.get('stale', True)
+
+
+def get_diagnostics():
+    """Ringkasan pool, cache, antrian job/log untuk endpoint health"""
+    pool = get_pool_stats()
+    warnings = []
+    if pool['ready'] and pool['saturation'] >= HEALTH_CONFIG['pool_saturation_warning']:
+        warnings.append(f"Pool koneksi hampir penuh ({pool['in_use']}/{pool['size']})")
+    if pool['exhausted']:
+        warnings.append(f"Pool koneksi pernah habis {pool['exhausted']}x")
+
+    log_stats = get_logging_stats()
+    if log_stats['dropped']:
+        warnings.append(f"{log_stats['dropped']} log record di-drop")
+
+    caches = get_cache_stats()
+    return {
+        'uptime_seconds': round(time.time() - _started_at, 1),
+        'pool': pool,
+        'caches': caches,
+        'caches_warm': sum(1 for c in caches.values() if c.get('warm')),
+        'jobs': jobs.get_stats(),
+        'logging': log_stats,
+        'warnings': warnings,
+    }
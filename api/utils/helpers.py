@@ -2,8 +2,11 @@
 import qrcode
 import io
 import base64
+import logging
 from config import QR_CONFIG
 
+logger = logging.getLogger(__name__)
+
 def generate_qr_image(data):
     """Generate QR code image and return as base64"""
     try:
@@ -35,3 +38,22 @@ def validate_nisn(nisn):
         return False
     nisn_str = str(nisn).strip()
     return len(nisn_str) == 10 and nisn_str.isdigit()
+
+def gender_label(gender):
+    """Convert kode gender (L/P) ke label"""
+    if gender == "L":
+        return "Laki-laki"
+    if gender == "P":
+        return "Perempuan"
+    return "-"
+
+def format_waktu(waktu):
+    """Format kolom TIME MySQL (timedelta/time) menjadi string HH:MM:SS"""
+    if waktu is None:
+        return None
+    # Jika berupa timedelta, konversi ke string HH:MM:SS
+    if hasattr(waktu, "seconds"):
+        total_seconds = waktu.seconds
+        return f"{total_seconds // 3600:02d}:{(total_seconds % 3600) // 60:02d}:{total_seconds % 60:02d}"
+    # Jika sudah berupa string atau tipe lain, konversi ke string
+    return str(waktu)
@@ -0,0 +1,454 @@
+# utils/jobs.py
+"""
+Background job runner untuk endpoint maintenance yang berjalan lama
+
+Job dijalankan oleh ThreadPoolExecutor dengan jumlah worker terbatas.
+Setiap job punya record JSON di JOBS_CONFIG['directory'] (status,
+progress, hasil, error) sehingga /api/jobs/<id> tetap bisa dipolling
+setelah API restart. Fungsi job menerima JobContext sebagai argumen
+pertama untuk melaporkan progress dan memeriksa permintaan cancel.
+
+API berjalan dengan beberapa worker gunicorn, jadi record job juga
+mencatat proses pemiliknya (pid + waktu start proses). is_running()
+membaca record dari disk, cancel() untuk job milik worker lain menulis
+file <id>.cancel yang diperiksa JobContext, dan recover_interrupted()
+hanya menggagalkan job yang pemiliknya sudah mati. submit(...,
+exclusive=True) memeriksa dan mendaftarkan job di bawah flock
+<directory>/.submit.lock sehingga dua worker tidak bisa memulai job
+eksklusif yang sama bersamaan.
+
+Record job yang sudah selesai hanya disimpan di memori sebanyak
+keep_finished_in_memory; sisanya dibaca dari disk oleh get_job().
+
+    job = submit('cleanup', run_cleanup, dry_run=True)
+    return accepted(job, "Cleanup dimulai")
+"""
+
+import fcntl
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from flask import jsonify
+from config import JOBS_CONFIG
+
+logger = logging.getLogger(__name__)
+
+FINISHED = ('completed', 'failed', 'cancelled')
+
+_lock = threading.Lock()
+_jobs = {}  # id -> record job di memori (job proses ini)
+_futures = {}
+_cancel_events = {}
+_executor = None
+
+
+def _process_start(pid):
+    """Waktu start proses (clock ticks sejak boot) dari /proc; None jika tidak tersedia"""
+    try:
+        with open(f"/proc/{pid}/stat") as f:
+            return int(f.read().rsplit(')', 1)[1].split()[19])
+    except (OSError, IndexError, ValueError):
+        return None
+
+
+_owner = {}
+
+
+def _current_owner():
+    """Identitas proses ini; dihitung ulang setelah fork (gunicorn --preload)"""
+    global _owner
+    if _owner.get('pid') != os.getpid():
+        _owner = {'pid': os.getpid(), 'started': _process_start(os.getpid())}
+    return _owner
+
+
+def _owner_alive(record):
+    """True jika proses pemilik job masih hidup (pid tidak dipakai ulang proses lain)"""
+    owner = record.get('owner')
+    if not owner:
+        return False  # record lama sebelum owner dicatat
+    if owner == _current_owner():
+        return True
+    try:
+        os.kill(owner['pid'], 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return owner.get('started') is None or _process_start(owner['pid']) == owner['started']
+
+
+class JobCancelled(Exception):
+    """Dilempar oleh JobContext.check_cancelled() saat job dibatalkan"""
+
+
+class QueueFull(RuntimeError):
+    """Terlalu banyak job yang menunggu/berjalan"""
+
+
+class AlreadyRunning(RuntimeError):
+    """Job eksklusif dengan nama yang sama masih queued/running"""
+
+
+class JobContext:
+    """Handle yang diterima fungsi job untuk progress dan cancel"""
+
+    def __init__(self, job_id):
+        self.job_id = job_id
+        self._cancel = _cancel_events[job_id]
+        self._last_flush = 0.0
+        self._last_poll = 0.0
+
+    def _poll_cancel_file(self):
+        """Cancel dari worker lain (file <id>.cancel), diperiksa per progress_flush_seconds"""
+        now = time.monotonic()
+        if self._cancel.is_set() or now - self._last_poll < JOBS_CONFIG['progress_flush_seconds']:
+            return
+        self._last_poll = now
+        if os.path.exists(_cancel_path(self.job_id)):
+            self._cancel.set()
+            with _lock:
+                _jobs[self.job_id]['cancel_requested'] = True
+
+    @property
+    def cancelled(self):
+        self._poll_cancel_file()
+        return self._cancel.is_set()
+
+    def check_cancelled(self):
+        if self.cancelled:
+            raise JobCancelled()
+
+    def update(self, current=None, total=None, message=None, **extra):
+        """Perbarui progress; disimpan ke disk maksimal sekali per progress_flush_seconds"""
+        with _lock:
+            progress = _jobs[self.job_id]['progress']
+            if current is not None:
+                progress['current'] = current
+            if total is not None:
+                progress['total'] = total
+            if message is not None:
+                progress['message'] = message
+            progress.update(extra)
+            if progress.get('total'):
+                progress['percent'] = min(100.0, round(progress.get('current', 0) * 100 / progress['total'], 1))
+
+        now = time.monotonic()
+        if now - self._last_flush >= JOBS_CONFIG['progress_flush_seconds']:
+            self._last_flush = now
+            _save(self.job_id)
+
+
+def _job_path(job_id):
+    return os.path.join(JOBS_CONFIG['directory'], f"{job_id}.json")
+
+
+def _cancel_path(job_id):
+    return os.path.join(JOBS_CONFIG['directory'], f"{job_id}.cancel")
+
+
+def _save(job_id):
+    with _lock:
+        record = json.loads(json.dumps(_jobs[job_id], default=str))
+    try:
+        os.makedirs(JOBS_CONFIG['directory'], exist_ok=True)
+        tmp_path = f"{_job_path(job_id)}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(record, f, indent=2)
+        os.replace(tmp_path, _job_path(job_id))
+    except OSError as e:
+        logger.error(f"Save job {job_id} error: {e}")
+
+
+def _load(job_id):
+    try:
+        with open(_job_path(job_id)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _get_executor():
+    global _executor
+    with _lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=JOBS_CONFIG['workers'], thread_name_prefix='job')
+        return _executor
+
+
+def _evict_finished():
+    """Buang record selesai tertua dari memori (tetap ada di disk). Panggil dengan _lock"""
+    finished = [job_id for job_id, job in _jobs.items() if job['status'] in FINISHED]
+    excess = len(finished) - JOBS_CONFIG['keep_finished_in_memory']
+    if excess <= 0:
+        return
+    finished.sort(key=lambda job_id: _jobs[job_id]['finished_at'] or '')
+    for job_id in finished[:excess]:
+        _jobs.pop(job_id, None)
+        _cancel_events.pop(job_id, None)
+
+
+def _finish(job_id, status, result=None, error=None):
+    with _lock:
+        record = _jobs[job_id]
+        record.update({
+            'status': status,
+            'finished_at': datetime.now().isoformat(),
+            'result': result,
+            'error': error,
+        })
+        if record.get('started_at'):
+            record['duration_seconds'] = round(
+                (datetime.now() - datetime.fromisoformat(record['started_at'])).total_seconds(), 2)
+        _futures.pop(job_id, None)
+    _save(job_id)
+    if os.path.exists(_cancel_path(job_id)):
+        os.unlink(_cancel_path(job_id))
+    with _lock:
+        _evict_finished()
+
+
+def _execute(job_id, func, args, kwargs):
+    with _lock:
+        if _jobs[job_id]['status'] == 'cancelled':
+            return
+        _jobs[job_id]['status'] = 'running'
+        _jobs[job_id]['started_at'] = datetime.now().isoformat()
+        name = _jobs[job_id]['name']
+    _save(job_id)
+
+    context = JobContext(job_id)
+    try:
+        context.check_cancelled()
+        result = func(context, *args, **kwargs)
+        _finish(job_id, 'completed', result=result)
+        logger.info(f"Job {job_id} ({name}) selesai")
+    except JobCancelled:
+        _finish(job_id, 'cancelled', error='Dibatalkan')
+        logger.info(f"Job {job_id} ({name}) dibatalkan")
+    except Exception as e:
+        _finish(job_id, 'failed', error=str(e))
+        logger.error(f"Job {job_id} ({name}) gagal: {e}")
+
+
+@contextmanager
+def _submit_lock():
+    """flock lintas worker untuk cek + daftar job eksklusif"""
+    os.makedirs(JOBS_CONFIG['directory'], exist_ok=True)
+    with open(os.path.join(JOBS_CONFIG['directory'], '.submit.lock'), 'w') as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def submit(name, func, *args, params=None, exclusive=False, **kwargs):
+    """
+    Jadwalkan func(context, *args, **kwargs) di worker pool; return record job.
+    Raise QueueFull jika job pending sudah mencapai max_pending.
+
+    exclusive=True (atau daftar nama job yang saling mengunci, mis.
+    ('backup', 'restore')) menolak dengan AlreadyRunning jika salah satu
+    nama itu masih queued/running di worker mana pun.
+    """
+    if not exclusive:
+        return _submit(name, func, args, kwargs, params)
+
+    names = (name,) if exclusive is True else tuple(exclusive)
+    with _submit_lock():
+        running = _running_name(names)
+        if running:
+            raise AlreadyRunning(f"Job {running} masih berjalan")
+        return _submit(name, func, args, kwargs, params)
+
+
+def _submit(name, func, args, kwargs, params):
+    with _lock:
+        pending = sum(1 for job in _jobs.values() if job['status'] not in FINISHED)
+        if pending >= JOBS_CONFIG['max_pending']:
+            raise QueueFull(f"Terlalu banyak job berjalan ({pending}), coba lagi nanti")
+
+        job_id = uuid.uuid4().hex[:12]
+        _jobs[job_id] = {
+            'id': job_id,
+            'name': name,
+            'params': params or {},
+            'status': 'queued',
+            'owner': _current_owner(),
+            'progress': {},
+            'created_at': datetime.now().isoformat(),
+            'started_at': None,
+            'finished_at': None,
+            'result': None,
+            'error': None,
+        }
+        _cancel_events[job_id] = threading.Event()
+    _save(job_id)
+
+    future = _get_executor().submit(_execute, job_id, func, args, kwargs)
+    with _lock:
+        if _jobs[job_id]['status'] not in FINISHED:
+            _futures[job_id] = future
+    return get_job(job_id)
+
+
+def accepted(job, message):
+    """Response 202 standar untuk endpoint yang menjalankan job"""
+    return jsonify({
+        "success": True,
+        "message": message,
+        "job": job,
+        "status_url": f"/api/jobs/{job['id']}"
+    }), 202
+
+
+def get_job(job_id):
+    """Record job dari memori atau disk (None jika tidak ada)"""
+    with _lock:
+        record = _jobs.get(job_id)
+        if record:
+            return json.loads(json.dumps(record, default=str))
+    if not job_id.isalnum():
+        return None
+    return _load(job_id)
+
+
+def _disk_records():
+    """Record job di disk (semua worker)"""
+    records = {}
+    directory = JOBS_CONFIG['directory']
+    if os.path.isdir(directory):
+        for filename in os.listdir(directory):
+            if filename.endswith('.json'):
+                record = _load(filename[:-5])
+                if record:
+                    records[record['id']] = record
+    return records
+
+
+def list_jobs(limit=50, name=None):
+    """Job terbaru dulu, gabungan dari disk dan memori"""
+    records = _disk_records()
+    with _lock:
+        for job_id, record in _jobs.items():
+            records[job_id] = json.loads(json.dumps(record, default=str))
+
+    jobs = [r for r in records.values() if name is None or r['name'] == name]
+    jobs.sort(key=lambda r: r['created_at'], reverse=True)
+    return jobs[:limit]
+
+
+def cancel(job_id):
+    """
+    Batalkan job: job queued langsung dibatalkan, job running diberi sinyal
+    (fungsi job berhenti di pemeriksaan check_cancelled berikutnya). Job
+    milik worker lain diberi file <id>.cancel. Return record job, None jika
+    job tidak ada atau pemiliknya sudah mati.
+    """
+    with _lock:
+        record = _jobs.get(job_id)
+    if not record:
+        return _cancel_remote(job_id)
+
+    with _lock:
+        if record['status'] in FINISHED:
+            return json.loads(json.dumps(record, default=str))
+        _cancel_events[job_id].set()
+        future = _futures.get(job_id)
+
+    if record['status'] == 'queued' and future and future.cancel():
+        _finish(job_id, 'cancelled', error='Dibatalkan sebelum berjalan')
+    else:
+        with _lock:
+            record['cancel_requested'] = True
+        _save(job_id)
+    return get_job(job_id)
+
+
+def _cancel_remote(job_id):
+    """Minta worker pemilik job membatalkannya lewat file <id>.cancel"""
+    record = _load(job_id) if job_id.isalnum() else None
+    if not record:
+        return None
+    if record['status'] in FINISHED:
+        return record
+    if not _owner_alive(record):
+        return None
+    try:
+        with open(_cancel_path(job_id), 'w') as f:
+            f.write(datetime.now().isoformat())
+    except OSError as e:
+        logger.error(f"Cancel job {job_id} error: {e}")
+        raise
+    record['cancel_requested'] = True
+    return record
+
+
+def _running_name(names):
+    """Nama pertama dari `names` yang punya job queued/running di worker mana pun"""
+    with _lock:
+        for job in _jobs.values():
+            if job['name'] in names and job['status'] not in FINISHED:
+                return job['name']
+        local = set(_jobs)
+    for record in _disk_records().values():
+        if (record['name'] in names and record['status'] not in FINISHED
+                and record['id'] not in local and _owner_alive(record)):
+            return record['name']
+    return None
+
+
+def is_running(name):
+    """True jika ada job `name` yang masih queued/running di worker mana pun"""
+    return _running_name((name,)) is not None
+
+
+def recover_interrupted():
+    """Tandai job running/queued yang proses pemiliknya sudah mati sebagai failed"""
+    directory = JOBS_CONFIG['directory']
+    if not os.path.isdir(directory):
+        return 0
+
+    cutoff = datetime.now() - timedelta(days=JOBS_CONFIG['keep_days'])
+    recovered = 0
+    for filename in os.listdir(directory):
+        if not filename.endswith('.json'):
+            continue
+        path = os.path.join(directory, filename)
+        record = _load(filename[:-5])
+        if not record:
+            continue
+        if datetime.fromisoformat(record['created_at']) < cutoff:
+            os.unlink(path)
+            continue
+        if record['status'] not in FINISHED and record['id'] not in _jobs and not _owner_alive(record):
+            record.update({
+                'status': 'failed',
+                'error': 'Terhenti karena API restart',
+                'finished_at': datetime.now().isoformat(),
+            })
+            with open(path, 'w') as f:
+                json.dump(record, f, indent=2)
+            if os.path.exists(_cancel_path(record['id'])):
+                os.unlink(_cancel_path(record['id']))
+            recovered += 1
+    return recovered
+
+
+def get_stats():
+    """Ringkasan antrian job untuk diagnostik"""
+    with _lock:
+        statuses = [job['status'] for job in _jobs.values()]
+    return {
+        'workers': JOBS_CONFIG['workers'],
+        'queued': statuses.count('queued'),
+        'running': statuses.count('running'),
+        'max_pending': JOBS_CONFIG['max_pending'],
+    }
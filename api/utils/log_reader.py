@@ -0,0 +1,215 @@
+# utils/log_reader.py
+"""
+Pembaca log dari belakang (tail) untuk endpoint /api/debug/logs
+
+File dibaca mundur per blok dari EOF sehingga biaya sebanding dengan jumlah
+baris yang dikembalikan, bukan ukuran file. File hasil rotasi (api.log.1,
+api.log.2026-01-01, ...) ikut dibaca jika baris di file aktif belum cukup.
+"""
+
+import glob
+import json
+import logging
+import os
+import re
+from datetime import datetime
+
+BLOCK_SIZE = 64 * 1024
+
+LINE_PATTERN = re.compile(
+    r"^(\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2},\d{3}) - (\S+) - ([A-Z]+) - (.*)$"
+)
+
+
+def rotated_files(path):
+    """Return file log aktif + hasil rotasi, terbaru lebih dulu"""
+    files = [path] if os.path.exists(path) else []
+    rotated = [f for f in glob.glob(f"{glob.escape(path)}.*") if os.path.isfile(f)]
+    rotated.sort(key=os.path.getmtime, reverse=True)
+    return files + rotated
+
+
+def _reverse_lines(path, block_size=BLOCK_SIZE):
+    """Yield baris file dari akhir ke awal, membaca per blok"""
+    with open(path, "rb") as f:
+        f.seek(0, os.SEEK_END)
+        position = f.tell()
+        remainder = b""
+
+        while position > 0:
+            read_size = min(block_size, position)
+            position -= read_size
+            f.seek(position)
+            chunk = f.read(read_size) + remainder
+            lines = chunk.split(b"\n")
+            remainder = lines.pop(0)
+            for line in reversed(lines):
+                if line:
+                    yield line.decode("utf-8", errors="replace")
+
+        if remainder:
+            yield remainder.decode("utf-8", errors="replace")
+
+
+def parse_line(line):
+    """Parse satu baris log (format teks atau JSON lines), None jika bukan header"""
+    if line.startswith("{"):
+        try:
+            data = json.loads(line)
+            return {
+                "time": datetime.fromisoformat(data["time"]),
+                "logger": data.get("logger", ""),
+                "level": data.get("level", ""),
+                "message": data.get("message", ""),
+                "raw": line,
+            }
+        except (ValueError, KeyError):
+            return None
+
+    match = LINE_PATTERN.match(line)
+    if not match:
+        return None
+
+    return {
+        "time": datetime.strptime(match.group(1), "%Y-%m-%d %H:%M:%S,%f"),
+        "logger": match.group(2),
+        "level": match.group(3),
+        "message": match.group(4),
+        "raw": line,
+    }
+
+
+def _matches(entry, level=None, logger_name=None, since=None, until=None, contains=None):
+    """Check apakah entry lolos semua filter"""
+    if level and logging.getLevelName(entry["level"]) < level:
+        return False
+    if logger_name and not entry["logger"].startswith(logger_name):
+        return False
+    if since and entry["time"] < since:
+        return False
+    if until and entry["time"] > until:
+        return False
+    if contains and contains not in entry["raw"].lower():
+        return False
+    return True
+
+
+def _normalize_filters(level=None, logger_name=None, since=None, until=None, contains=None):
+    """Konversi parameter filter ke bentuk yang dipakai _matches"""
+    if isinstance(level, str):
+        level = logging.getLevelName(level.upper())
+        if not isinstance(level, int):
+            raise ValueError("Level log tidak valid")
+    return {
+        "level": level,
+        "logger_name": logger_name,
+        "since": since,
+        "until": until,
+        "contains": contains.lower() if contains else None,
+    }
+
+
+def _iter_entries_reverse(paths):
+    """Yield entry dari terbaru ke terlama, baris lanjutan (traceback) digabung ke header"""
+    for path in paths:
+        continuation = []
+        for line in _reverse_lines(path):
+            entry = parse_line(line)
+            if entry is None:
+                continuation.append(line)
+                continue
+            if continuation:
+                entry["raw"] = "\n".join([line] + continuation[::-1])
+                continuation = []
+            yield entry
+
+
+def get_cursor(path):
+    """Cursor posisi EOF file aktif dalam bentuk 'inode:offset'"""
+    stat = os.stat(path)
+    return f"{stat.st_ino}:{stat.st_size}"
+
+
+def tail(path, limit=100, **filters):
+    """
+    Ambil maksimal `limit` entry terakhir yang cocok dengan filter.
+
+    Return (entries, cursor); entries urut kronologis.
+    """
+    filters = _normalize_filters(**filters)
+    cursor = get_cursor(path) if os.path.exists(path) else None
+
+    entries = []
+    for entry in _iter_entries_reverse(rotated_files(path)):
+        if filters["until"] and entry["time"] > filters["until"]:
+            continue
+        if filters["since"] and entry["time"] < filters["since"]:
+            break
+        if _matches(entry, **filters):
+            entries.append(entry)
+            if len(entries) >= limit:
+                break
+
+    entries.reverse()
+    return entries, cursor
+
+
+def follow(path, cursor, limit=100, **filters):
+    """
+    Ambil entry yang ditulis setelah `cursor` (mode follow).
+
+    Jika file aktif sudah dirotasi sejak cursor dibuat, sisa file lama
+    (dicari berdasarkan inode) dibaca lebih dulu. Return (entries, cursor).
+    """
+    filters = _normalize_filters(**filters)
+    try:
+        inode, offset = (int(part) for part in cursor.split(":"))
+    except (AttributeError, ValueError):
+        raise ValueError("Cursor tidak valid")
+
+    if not os.path.exists(path):
+        return [], None
+
+    sources = []
+    current = os.stat(path)
+    if current.st_ino == inode and current.st_size >= offset:
+        sources.append((path, offset))
+    else:
+        for rotated in rotated_files(path)[1:]:
+            if os.stat(rotated).st_ino == inode:
+                sources.append((rotated, offset))
+                break
+        sources.append((path, 0))
+
+    entries = []
+    last_matched = False  # baris lanjutan hanya ikut entry yang lolos filter
+    new_cursor = f"{current.st_ino}:{current.st_size}"
+    for source, start in sources:
+        with open(source, "rb") as f:
+            f.seek(start)
+            while len(entries) < limit:
+                line_start = f.tell()
+                line = f.readline()
+                if not line.endswith(b"\n"):
+                    # Baris belum selesai ditulis, lanjutkan di polling berikutnya
+                    if source == path:
+                        new_cursor = f"{current.st_ino}:{line_start}"
+                    break
+                text = line.decode("utf-8", errors="replace").rstrip("\n")
+                entry = parse_line(text)
+                if entry is None:
+                    if last_matched:
+                        entries[-1]["raw"] += "\n" + text
+                    continue
+                last_matched = _matches(entry, **filters)
+                if last_matched:
+                    entries.append(entry)
+            else:
+                if source == path:
+                    new_cursor = f"{current.st_ino}:{f.tell()}"
+                else:
+                    # Limit tercapai di file lama: ulangi dari posisi ini nanti
+                    new_cursor = f"{inode}:{f.tell()}"
+                    break
+
+    return entries, new_cursor
@@ -0,0 +1,126 @@
+# utils/logger.py
+"""
+Logging non-blocking untuk Absensi API
+
+Request thread hanya memasukkan record ke antrian (QueueHandler); penulisan
+ke file/console dilakukan oleh satu thread QueueListener. File log dirotasi
+berdasarkan ukuran atau waktu sehingga volumenya tetap terbatas.
+"""
+
+import atexit
+import json
+import logging
+import os
+import queue
+from datetime import datetime
+from logging.handlers import (
+    QueueHandler,
+    QueueListener,
+    RotatingFileHandler,
+    TimedRotatingFileHandler,
+)
+from config import LOG_CONFIG
+
+_listener = None
+_queue = None
+
+
+class JsonFormatter(logging.Formatter):
+    """Format record sebagai satu baris JSON"""
+
+    def format(self, record):
+        entry = {
+            "time": datetime.fromtimestamp(record.created).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        if record.exc_info:
+            entry["exc_info"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False)
+
+
+class DroppingQueueHandler(QueueHandler):
+    """QueueHandler yang membuang record (bukan blocking) saat antrian penuh"""
+
+    dropped = 0
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            DroppingQueueHandler.dropped += 1
+
+
+def _build_file_handler(config):
+    """Create rotating file handler sesuai konfigurasi rotasi"""
+    if config["rotation"] == "time":
+        return TimedRotatingFileHandler(
+            config["file"],
+            when=config["when"],
+            interval=config["interval"],
+            backupCount=config["backup_count"],
+            encoding="utf-8",
+        )
+    return RotatingFileHandler(
+        config["file"],
+        maxBytes=config["max_bytes"],
+        backupCount=config["backup_count"],
+        encoding="utf-8",
+    )
+
+
+def setup_logging(config=None):
+    """Setup root logger dengan pipeline QueueHandler -> QueueListener"""
+    global _listener, _queue
+
+    if _listener is not None:
+        return _listener
+
+    config = config or LOG_CONFIG
+    os.makedirs(os.path.dirname(config["file"]), exist_ok=True)
+
+    if config["json"]:
+        formatter = JsonFormatter()
+    else:
+        formatter = logging.Formatter(config["format"])
+
+    handlers = [_build_file_handler(config)]
+    if config["console"]:
+        handlers.append(logging.StreamHandler())
+    for handler in handlers:
+        handler.setFormatter(formatter)
+
+    _queue = queue.Queue(maxsize=config["queue_size"])
+
+    root = logging.getLogger()
+    root.setLevel(config["level"])
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(DroppingQueueHandler(_queue))
+
+    _listener = QueueListener(_queue, *handlers, respect_handler_level=True)
+    _listener.start()
+    atexit.register(stop_logging)
+
+    return _listener
+
+
+def stop_logging():
+    """Flush antrian dan hentikan listener"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        for handler in _listener.handlers:
+            handler.close()
+        _listener = None
+
+
+def get_logging_stats():
+    """Return kedalaman antrian dan jumlah record yang di-drop"""
+    return {
+        "queue_depth": _queue.qsize() if _queue else 0,
+        "queue_size": _queue.maxsize if _queue else 0,
+        "dropped": DroppingQueueHandler.dropped,
+        "running": _listener is not None,
+    }
@@ -0,0 +1,285 @@
+# utils/maintenance.py
+"""
+Fungsi maintenance database yang dijalankan sebagai job (utils.jobs)
+
+Setiap fungsi menerima JobContext sebagai argumen pertama untuk
+melaporkan progress dan memeriksa permintaan cancel (None saat dipanggil
+langsung, mis. mode dry-run).
+"""
+
+import logging
+import re
+import time
+from utils.database import fetch_one, fetch_all, transaction
+from utils.archive import HOT_TABLE, ARCHIVE_TABLE
+from utils.cache import invalidate_all
+from config import CLEANUP_CONFIG
+
+logger = logging.getLogger(__name__)
+
+
+# ===========================================
+# FIX NISN
+# ===========================================
+_NON_DIGIT = re.compile(r'\D')
+NISN_LENGTH = 10
+FIX_NISN_BATCH = 1000
+
+
+def normalize_nisn(value):
+    """Buang karakter non-digit dan ambil 10 digit terakhir; None jika tidak bisa"""
+    if value is None:
+        return None
+    cleaned = _NON_DIGIT.sub('', str(value))[-NISN_LENGTH:]
+    return cleaned if len(cleaned) == NISN_LENGTH else None
+
+
+def plan_nisn_fixes(students):
+    """
+    Hitung perubahan NISN untuk seluruh siswa dalam satu pass.
+
+    Return dict:
+      changes     : [{id, nis, nama, old_nisn, new_nisn}] yang aman ditulis
+      collisions  : perubahan yang bentrok dengan NISN siswa lain
+      unfixable   : NISN tidak valid yang tidak bisa dinormalisasi
+    """
+    # NISN yang sedang dipakai (nilai asli dan hasil trim) -> id siswa
+    owners = {}
+    for student in students:
+        if student['nisn'] is not None:
+            for value in {str(student['nisn']), str(student['nisn']).strip()}:
+                owners.setdefault(value, set()).add(student['id'])
+
+    candidates = []
+    unfixable = []
+    for student in students:
+        original = student['nisn']
+        if original is None or str(original) == '':
+            continue
+        cleaned = normalize_nisn(original)
+        if cleaned is None:
+            unfixable.append({
+                "nis": student['nis'],
+                "nama": student['nama'],
+                "nisn": original
+            })
+        elif cleaned != original:
+            candidates.append((student, cleaned))
+
+    # Hasil normalisasi yang sama untuk beberapa siswa juga dianggap bentrok
+    targets = {}
+    for student, cleaned in candidates:
+        targets.setdefault(cleaned, set()).add(student['id'])
+
+    changes = []
+    collisions = []
+    for student, cleaned in candidates:
+        item = {
+            "id": student['id'],
+            "nis": student['nis'],
+            "nama": student['nama'],
+            "old_nisn": student['nisn'],
+            "new_nisn": cleaned
+        }
+        others = (owners.get(cleaned, set()) | targets[cleaned]) - {student['id']}
+        if others:
+            item['conflict_ids'] = sorted(others)
+            collisions.append(item)
+        else:
+            changes.append(item)
+
+    return {"changes": changes, "collisions": collisions, "unfixable": unfixable}
+
+
+def fix_nisn(job=None, dry_run=False):
+    """
+    Normalisasi NISN secara set-based: hitung semua perubahan sekali jalan,
+    tolak yang bentrok, lalu tulis dalam satu transaksi lewat temporary
+    table + UPDATE JOIN. dry_run=True hanya mengembalikan diff.
+    """
+    students = fetch_all("SELECT id, nis, nisn, nama FROM siswa")
+    plan = plan_nisn_fixes(students)
+    changes = plan['changes']
+
+    result = {
+        "dry_run": dry_run,
+        "total_checked": len(students),
+        "fixed": 0,
+        "details": changes,
+        "collisions": plan['collisions'],
+        "unfixable": plan['unfixable']
+    }
+    if dry_run or not changes:
+        result['message'] = f"{len(changes)} NISN akan diperbaiki, {len(plan['collisions'])} bentrok"
+        return result
+
+    if job:
+        job.update(current=0, total=len(changes), message='fix nisn')
+        job.check_cancelled()
+
+    with transaction() as tx:
+        tx.execute("""
+            CREATE TEMPORARY TABLE tmp_nisn_fix (
+                id INT PRIMARY KEY,
+                nisn VARCHAR(20) NOT NULL
+            )
+        """)
+        for start in range(0, len(changes), FIX_NISN_BATCH):
+            tx.executemany(
+                "INSERT INTO tmp_nisn_fix (id, nisn) VALUES (%s, %s)",
+                [(c['id'], c['new_nisn']) for c in changes[start:start + FIX_NISN_BATCH]]
+            )
+        updated = tx.execute("""
+            UPDATE siswa s
+            JOIN tmp_nisn_fix f ON s.id = f.id
+            SET s.nisn = f.nisn
+        """)
+        tx.execute("DROP TEMPORARY TABLE tmp_nisn_fix")
+
+    if job:
+        job.update(current=len(changes))
+    invalidate_all('fix-nisn')
+
+    result['fixed'] = updated
+    result['message'] = f"Berhasil memperbaiki {updated} NISN"
+    logger.info(f"Fix NISN: {updated} diperbaiki, {len(plan['collisions'])} bentrok")
+    return result
+
+
+# ===========================================
+# DATABASE CLEANUP
+# ===========================================
+# (nama, tabel, SQL id yatim dengan keyset "> %s", SQL hitung, predikat yatim untuk DELETE)
+ORPHAN_TARGETS = [
+    (
+        'orphaned_attendance', HOT_TABLE,
+        f"""SELECT a.id FROM `{HOT_TABLE}` a
+            LEFT JOIN siswa s ON a.siswa_id = s.id
+            WHERE s.id IS NULL AND a.id > %s
+            ORDER BY a.id LIMIT %s""",
+        f"""SELECT COUNT(*) as total FROM `{HOT_TABLE}` a
+            LEFT JOIN siswa s ON a.siswa_id = s.id
+            WHERE s.id IS NULL""",
+        f"NOT EXISTS (SELECT 1 FROM siswa s WHERE s.id = `{HOT_TABLE}`.siswa_id)",
+    ),
+    (
+        'orphaned_archive_attendance', ARCHIVE_TABLE,
+        f"""SELECT a.id FROM `{ARCHIVE_TABLE}` a
+            LEFT JOIN siswa s ON a.siswa_id = s.id
+            WHERE s.id IS NULL AND a.id > %s
+            ORDER BY a.id LIMIT %s""",
+        f"""SELECT COUNT(*) as total FROM `{ARCHIVE_TABLE}` a
+            LEFT JOIN siswa s ON a.siswa_id = s.id
+            WHERE s.id IS NULL""",
+        f"NOT EXISTS (SELECT 1 FROM siswa s WHERE s.id = `{ARCHIVE_TABLE}`.siswa_id)",
+    ),
+    (
+        'invalid_kelas_siswa', 'siswa',
+        """SELECT s.id FROM siswa s
+           LEFT JOIN kelas k ON s.kelas_id = k.id
+           WHERE k.id IS NULL AND s.kelas_id IS NOT NULL AND s.id > %s
+           ORDER BY s.id LIMIT %s""",
+        """SELECT COUNT(*) as total FROM siswa s
+           LEFT JOIN kelas k ON s.kelas_id = k.id
+           WHERE k.id IS NULL AND s.kelas_id IS NOT NULL""",
+        "siswa.kelas_id IS NOT NULL AND NOT EXISTS (SELECT 1 FROM kelas k WHERE k.id = siswa.kelas_id)",
+    ),
+]
+
+
+def _table_exists(table):
+    row = fetch_one(
+        "SELECT COUNT(*) as total FROM information_schema.TABLES "
+        "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s",
+        (table,)
+    )
+    return bool(row and row['total'])
+
+
+def _delete_orphans(job, table, select_sql, orphan_sql, batch_size, batch_sleep, total):
+    """
+    Cari id yatim per chunk lalu hapus berdasarkan primary key, satu transaksi
+    per chunk. Predikat yatim diulang di DELETE sehingga baris yang sudah
+    punya induk lagi (siswa/kelas dibuat ulang di antara SELECT dan DELETE)
+    tidak ikut terhapus.
+    """
+    deleted = 0
+    batches = 0
+    last_id = 0
+    while True:
+        if job:
+            job.check_cancelled()
+        rows = fetch_all(select_sql, (last_id, batch_size))
+        if not rows:
+            break
+        ids = [row['id'] for row in rows]
+        last_id = ids[-1]
+
+        placeholders = ', '.join(['%s'] * len(ids))
+        with transaction() as tx:
+            deleted += tx.execute(
+                f"DELETE FROM `{table}` WHERE id IN ({placeholders}) AND {orphan_sql}", ids)
+        batches += 1
+
+        if job:
+            job.update(current=deleted, total=total)
+        if len(ids) < batch_size:
+            break
+        if batch_sleep:
+            time.sleep(batch_sleep)
+    return deleted, batches
+
+
+def cleanup_orphans(job=None, dry_run=False, batch_size=None, batch_sleep=None):
+    """
+    Hapus record yatim per chunk primary key dengan jeda antar batch sehingga
+    lock singkat dan scan tetap berjalan. dry_run=True hanya menghitung.
+    """
+    batch_size = batch_size or CLEANUP_CONFIG['batch_size']
+    batch_sleep = CLEANUP_CONFIG['batch_sleep_seconds'] if batch_sleep is None else batch_sleep
+
+    counts = {}
+    results = {}
+    started = time.perf_counter()
+    for name, table, select_sql, count_sql, orphan_sql in ORPHAN_TARGETS:
+        if table == ARCHIVE_TABLE and not _table_exists(table):
+            continue
+        row = fetch_one(count_sql)
+        counts[name] = row['total'] if row else 0
+        if dry_run or not counts[name]:
+            continue
+
+        if job:
+            job.update(current=0, total=counts[name], message=name)
+        target_started = time.perf_counter()
+        deleted, batches = _delete_orphans(
+            job, table, select_sql, orphan_sql, batch_size, batch_sleep, counts[name])
+        elapsed = time.perf_counter() - target_started
+        results[name] = {
+            "deleted": deleted,
+            "batches": batches,
+            "duration_seconds": round(elapsed, 2),
+            "rows_per_second": round(deleted / elapsed, 1) if elapsed else 0
+        }
+        logger.info(f"Cleanup {name}: {deleted} baris dalam {batches} batch")
+
+    if dry_run:
+        return {
+            "dry_run": True,
+            "message": f"{sum(counts.values())} record yatim ditemukan",
+            "orphans": counts
+        }
+
+    total_deleted = sum(r['deleted'] for r in results.values())
+    elapsed = time.perf_counter() - started
+    if total_deleted:
+        invalidate_all('cleanup')
+    return {
+        "dry_run": False,
+        "message": "Database cleanup completed",
+        "orphans": counts,
+        "deleted": {name: r['deleted'] for name, r in results.items()},
+        "details": results,
+        "duration_seconds": round(elapsed, 2),
+        "rows_per_second": round(total_deleted / elapsed, 1) if elapsed else 0
+    }
@@ -0,0 +1,241 @@
+# utils/metrics.py
+"""
+Metrik latency per route untuk Absensi API
+
+Setiap request dicatat ke histogram (bucket tetap) per method, route dan
+status code, beserta jumlah request in-flight dan ukuran response.
+Data diekspos dalam format teks Prometheus di /metrics dan diringkas
+sebagai p50/p95/p99 di /api/debug/performance.
+
+Batasan: histogram disimpan di memori setiap proses. Dengan beberapa
+worker gunicorn, satu scrape /metrics hanya berisi counter worker yang
+kebetulan melayani request itu. Karena itu setiap series diberi label
+pid: series tiap worker tidak saling menimpa (tidak terlihat reset), dan
+total dijumlahkan di Prometheus, mis.
+sum without (pid) (rate(absensi_http_request_duration_seconds_count[5m])).
+Series worker yang jarang terkena scrape bisa tertinggal; untuk angka
+yang lengkap jalankan satu worker atau scrape tiap worker secara langsung.
+/api/debug/performance juga hanya meringkas worker yang menjawab.
+"""
+
+import os
+import threading
+import time
+from flask import g, request
+
+# Batas atas bucket dalam detik (+Inf ditambahkan otomatis)
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576)
+
+_lock = threading.Lock()
+_latency = {}      # (method, route, status) -> Histogram
+_sizes = {}        # (method, route) -> Histogram
+_in_flight = {}    # route -> int
+_started_at = time.time()
+
+
+class Histogram:
+    """Histogram kumulatif dengan bucket tetap (kompatibel Prometheus)"""
+
+    __slots__ = ("buckets", "counts", "total", "count")
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+        else:
+            self.counts[-1] += 1
+        self.total += value
+        self.count += 1
+
+    def merge(self, other):
+        for i, value in enumerate(other.counts):
+            self.counts[i] += value
+        self.total += other.total
+        self.count += other.count
+
+    def quantile(self, q):
+        """Estimasi quantile dengan interpolasi linear di dalam bucket"""
+        if self.count == 0:
+            return None
+        rank = q * self.count
+        cumulative = 0
+        lower = 0.0
+        for i, bound in enumerate(self.buckets):
+            in_bucket = self.counts[i]
+            if cumulative + in_bucket >= rank:
+                if in_bucket == 0:
+                    return bound
+                return lower + (bound - lower) * (rank - cumulative) / in_bucket
+            cumulative += in_bucket
+            lower = bound
+        return self.buckets[-1]
+
+
+def _route_label():
+    """Label route berdasarkan url_rule agar kardinalitas tetap kecil"""
+    rule = request.url_rule
+    return rule.rule if rule is not None else "<unmatched>"
+
+
+def _before_request():
+    g._metrics_start = time.perf_counter()
+    g._metrics_route = _route_label()
+    with _lock:
+        _in_flight[g._metrics_route] = _in_flight.get(g._metrics_route, 0) + 1
+
+
+def _after_request(response):
+    start = g.get("_metrics_start")
+    if start is None:
+        return response
+
+    elapsed = time.perf_counter() - start
+    route = g._metrics_route
+    size = response.calculate_content_length()
+
+    with _lock:
+        key = (request.method, route, response.status_code)
+        histogram = _latency.get(key)
+        if histogram is None:
+            histogram = _latency[key] = Histogram(LATENCY_BUCKETS)
+        histogram.observe(elapsed)
+
+        if size is not None:
+            size_key = (request.method, route)
+            size_histogram = _sizes.get(size_key)
+            if size_histogram is None:
+                size_histogram = _sizes[size_key] = Histogram(SIZE_BUCKETS)
+            size_histogram.observe(size)
+
+    return response
+
+
+def _teardown_request(exc):
+    route = g.pop("_metrics_route", None)
+    if route is None:
+        return
+    with _lock:
+        _in_flight[route] = max(0, _in_flight.get(route, 0) - 1)
+
+
+def init_metrics(app):
+    """Pasang middleware timing ke Flask app (berlaku untuk semua blueprint)"""
+    app.before_request(_before_request)
+    app.after_request(_after_request)
+    app.teardown_request(_teardown_request)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _render_histogram(lines, name, labels, histogram):
+    label_str = ",".join(f'{k}="{_escape(v)}"' for k, v in labels)
+    prefix = f"{label_str}," if label_str else ""
+    cumulative = 0
+    for bound, count in zip(histogram.buckets, histogram.counts):
+        cumulative += count
+        lines.append(f'{name}_bucket{{{prefix}le="{bound}"}} {cumulative}')
+    lines.append(f'{name}_bucket{{{prefix}le="+Inf"}} {histogram.count}')
+    lines.append(f"{name}_sum{{{label_str}}} {histogram.total}")
+    lines.append(f"{name}_count{{{label_str}}} {histogram.count}")
+
+
+def render_prometheus():
+    """Render semua metrik dalam format teks Prometheus (exposition 0.0.4)"""
+    with _lock:
+        latency = {key: _copy(h) for key, h in _latency.items()}
+        sizes = {key: _copy(h) for key, h in _sizes.items()}
+        in_flight = dict(_in_flight)
+
+    pid = ("pid", os.getpid())
+    lines = [
+        "# HELP absensi_http_request_duration_seconds Latency request HTTP per route",
+        "# TYPE absensi_http_request_duration_seconds histogram",
+    ]
+    for (method, route, status), histogram in sorted(latency.items()):
+        _render_histogram(
+            lines,
+            "absensi_http_request_duration_seconds",
+            (pid, ("method", method), ("route", route), ("status", status)),
+            histogram,
+        )
+
+    lines += [
+        "# HELP absensi_http_response_size_bytes Ukuran body response HTTP per route",
+        "# TYPE absensi_http_response_size_bytes histogram",
+    ]
+    for (method, route), histogram in sorted(sizes.items()):
+        _render_histogram(
+            lines,
+            "absensi_http_response_size_bytes",
+            (pid, ("method", method), ("route", route)),
+            histogram,
+        )
+
+    lines += [
+        "# HELP absensi_http_requests_in_flight Request yang sedang diproses per route",
+        "# TYPE absensi_http_requests_in_flight gauge",
+    ]
+    for route, value in sorted(in_flight.items()):
+        lines.append(f'absensi_http_requests_in_flight{{pid="{pid[1]}",route="{_escape(route)}"}} {value}')
+
+    lines += [
+        "# HELP absensi_process_start_time_seconds Waktu start proses (unix epoch)",
+        "# TYPE absensi_process_start_time_seconds gauge",
+        f'absensi_process_start_time_seconds{{pid="{pid[1]}"}} {_started_at}',
+    ]
+    return "\n".join(lines) + "\n"
+
+
+def _copy(histogram):
+    clone = Histogram(histogram.buckets)
+    clone.merge(histogram)
+    return clone
+
+
+def _round_ms(value):
+    return round(value * 1000, 2) if value is not None else None
+
+
+def summarize_latency():
+    """Ringkasan p50/p95/p99 (ms) per route, semua status digabung"""
+    with _lock:
+        per_route = {}
+        errors = {}
+        for (method, route, status), histogram in _latency.items():
+            key = f"{method} {route}"
+            merged = per_route.get(key)
+            if merged is None:
+                merged = per_route[key] = Histogram(LATENCY_BUCKETS)
+            merged.merge(histogram)
+            if status >= 500:
+                errors[key] = errors.get(key, 0) + histogram.count
+        in_flight = sum(_in_flight.values())
+
+    routes = []
+    for key, histogram in per_route.items():
+        routes.append({
+            "route": key,
+            "count": histogram.count,
+            "errors_5xx": errors.get(key, 0),
+            "avg_ms": _round_ms(histogram.total / histogram.count),
+            "p50_ms": _round_ms(histogram.quantile(0.50)),
+            "p95_ms": _round_ms(histogram.quantile(0.95)),
+            "p99_ms": _round_ms(histogram.quantile(0.99)),
+        })
+    routes.sort(key=lambda r: r["p95_ms"] or 0, reverse=True)
+
+    return {
+        "uptime_seconds": round(time.time() - _started_at),
+        "in_flight": in_flight,
+        "routes": routes,
+    }
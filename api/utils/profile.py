@@ -0,0 +1,203 @@
+# utils/profile.py
+"""
+Profil siswa (detail + statistik + 10 absensi terakhir) dalam satu query
+
+Halaman siswa/resiswa.html dan siswa/recard.html memanggil detail siswa
+berulang kali. build_profile() merangkai profil, statistik (dari
+absensi_rekap jika siap, selain itu agregasi), absensi terakhir dan
+status absen hari ini dengan satu round trip: baris absensi terakhir
+dari tabel hot di-join ke baris profil sehingga hasilnya 1-10 baris.
+Tabel arsip hanya dibaca (query kedua) jika tabel hot berisi kurang dari
+10 absensi siswa tersebut.
+
+Profil yang sudah dirangkai di-cache per NIS selama
+PROFILE_CONFIG['ttl_seconds']. Endpoint tulis (siswa, kelas, guru,
+absensi) memanggil invalidate_profile(); TTL yang pendek menutup
+penulisan langsung ke database dari luar API (manual.php, scanner-api.py).
+"""
+
+import logging
+import threading
+import time
+from utils.database import fetch_all
+from utils.helpers import gender_label, format_waktu
+from utils.archive import get_archive_boundary, HOT_TABLE, ARCHIVE_TABLE
+from utils.cache import register_invalidator
+from utils import rekap
+from config import PROFILE_CONFIG
+
+logger = logging.getLogger(__name__)
+
+RECENT_LIMIT = 10
+RECENT_COLUMNS = "tanggal, waktu, status, metode, scanner_lokasi"
+STAT_COLUMNS = ('total', 'hadir', 'izin', 'sakit', 'alpha', 'terlambat')
+
+_lock = threading.Lock()
+_cache = {}  # nis -> (expires: time.monotonic(), profile)
+_generation = 0  # naik setiap invalidasi; hasil query yang mendahuluinya tidak disimpan
+_hits = 0
+_misses = 0
+
+SISWA_ID = "(SELECT id FROM siswa WHERE nis = %s LIMIT 1)"
+
+
+def _stats_source(nis, archived):
+    """(sql, params) tabel counter jika siap, selain itu agregasi satu siswa"""
+    if rekap.is_ready():
+        return f"`{rekap.TABLE}`", ()
+    # Filter siswa di setiap cabang UNION agar index siswa_id terpakai
+    tables = (HOT_TABLE, ARCHIVE_TABLE) if archived else (HOT_TABLE,)
+    source = ' UNION ALL '.join(
+        f"SELECT siswa_id, status, tanggal FROM `{table}` WHERE siswa_id = {SISWA_ID}" for table in tables)
+    return f"""(
+            SELECT
+                siswa_id,
+                COUNT(*) as total,
+                COUNT(CASE WHEN status = 'Hadir' THEN 1 END) as hadir,
+                COUNT(CASE WHEN status = 'Izin' THEN 1 END) as izin,
+                COUNT(CASE WHEN status = 'Sakit' THEN 1 END) as sakit,
+                COUNT(CASE WHEN status = 'Alpha' THEN 1 END) as alpha,
+                COUNT(CASE WHEN status = 'Terlambat' THEN 1 END) as terlambat,
+                MAX(tanggal) as last_date
+            FROM ({source}) a
+            GROUP BY siswa_id
+        )""", (nis,) * len(tables)
+
+
+def _archived_recent(siswa_id, limit):
+    """Absensi terakhir seorang siswa dari tabel arsip"""
+    rows = fetch_all(f"""
+        SELECT {RECENT_COLUMNS}
+        FROM `{ARCHIVE_TABLE}`
+        WHERE siswa_id = %s
+        ORDER BY tanggal DESC, waktu DESC
+        LIMIT {int(limit)}
+    """, (siswa_id,), strict=True)
+    if rows is None:
+        raise RuntimeError("Gagal membaca arsip absensi dari database")
+    return rows
+
+
+def build_profile(nis):
+    """Rangkai profil siswa dari database; None jika NIS tidak ditemukan"""
+    archived = get_archive_boundary() is not None
+    stats_source, stats_params = _stats_source(nis, archived)
+
+    rows = fetch_all(f"""
+        SELECT
+            s.id, s.nis, s.nisn, s.nama, s.gender,
+            s.kelas_id, s.card_version,
+            k.nama_kelas as kelas,
+            k.tingkat,
+            j.nama as jurusan,
+            j.kode as jurusan_kode,
+            g.nama as wali_kelas_nama,
+            {', '.join(f'st.{col}' for col in STAT_COLUMNS)}, st.last_date,
+            EXISTS(
+                SELECT 1 FROM `{HOT_TABLE}` t
+                WHERE t.siswa_id = s.id AND t.tanggal = CURDATE()
+            ) as attended_today,
+            r.tanggal, r.waktu, r.status, r.metode, r.scanner_lokasi
+        FROM siswa s
+        LEFT JOIN kelas k ON s.kelas_id = k.id
+        LEFT JOIN jurusan j ON k.jurusan_id = j.id
+        LEFT JOIN guru g ON k.wali_kelas_id = g.id
+        LEFT JOIN {stats_source} st ON st.siswa_id = s.id
+        LEFT JOIN (
+            SELECT siswa_id, {RECENT_COLUMNS}
+            FROM `{HOT_TABLE}`
+            WHERE siswa_id = {SISWA_ID}
+            ORDER BY tanggal DESC, waktu DESC
+            LIMIT {RECENT_LIMIT}
+        ) r ON r.siswa_id = s.id
+        WHERE s.nis = %s
+        ORDER BY r.tanggal DESC, r.waktu DESC
+    """, stats_params + (nis, nis), strict=True)
+
+    if rows is None:
+        raise RuntimeError("Gagal membaca profil siswa dari database")
+    if not rows:
+        return None
+
+    student = rows[0]
+    recent = [row for row in rows if row["tanggal"] is not None]
+    if len(recent) < RECENT_LIMIT and archived:
+        # Semua baris arsip lebih tua dari batas arsip, jadi cukup disambung
+        recent += _archived_recent(student["id"], RECENT_LIMIT - len(recent))
+
+    return {
+        "student": {
+            "id": student["id"],
+            "nis": student["nis"] or "",
+            "nisn": student["nisn"] or "",
+            "nama": student["nama"] or "",
+            "gender": student["gender"],
+            "gender_label": gender_label(student["gender"]),
+            "kelas_id": student["kelas_id"],
+            "kelas": student["kelas"] or "",
+            "tingkat": student["tingkat"] or "",
+            "jurusan": student["jurusan"] or "",
+            "jurusan_kode": student["jurusan_kode"] or "",
+            "wali_kelas_nama": student["wali_kelas_nama"] or "",
+            "card_version": student["card_version"] or 1,
+        },
+        "statistics": {
+            "total_attendance": student["total"] or 0,
+            **{col: student[col] or 0 for col in STAT_COLUMNS[1:]},
+            "last_attendance_date": str(student["last_date"]) if student["last_date"] else None,
+        },
+        "attended_today": bool(student["attended_today"]),
+        "recent_attendance": [
+            {
+                "tanggal": row["tanggal"],
+                "waktu": format_waktu(row["waktu"]),
+                "status": row["status"],
+                "metode": row["metode"],
+                "scanner_lokasi": row["scanner_lokasi"],
+            }
+            for row in recent
+        ],
+    }
+
+
+def get_profile(nis):
+    """Profil siswa dari cache; dirangkai ulang jika belum ada/kedaluwarsa"""
+    global _hits, _misses
+    now = time.monotonic()
+    with _lock:
+        entry = _cache.get(nis)
+        if entry and entry[0] > now:
+            _hits += 1
+            return entry[1]
+        _misses += 1
+        generation = _generation
+
+    profile = build_profile(nis)
+    if profile is None:
+        return None
+
+    with _lock:
+        if generation == _generation:
+            if len(_cache) >= PROFILE_CONFIG['max_entries'] and nis not in _cache:
+                _cache.pop(next(iter(_cache)))  # buang entri tertua
+            _cache[nis] = (now + PROFILE_CONFIG['ttl_seconds'], profile)
+    return profile
+
+
+def invalidate_profile(*nis_list):
+    """Hapus profil NIS tertentu dari cache; tanpa argumen kosongkan semua"""
+    global _generation
+    with _lock:
+        _generation += 1
+        if not nis_list:
+            _cache.clear()
+        for nis in nis_list:
+            _cache.pop(nis, None)
+
+
+def _profile_stats():
+    with _lock:
+        return {'warm': bool(_cache), 'entries': len(_cache), 'hits': _hits, 'misses': _misses}
+
+
+register_invalidator('student_profile', invalidate_profile, stats=_profile_stats)
@@ -0,0 +1,168 @@
+# utils/qr_sign.py
+"""
+Payload QR kartu siswa yang ditandatangani (HMAC-SHA256, QR_SECRET_KEY)
+
+Format payload:
+
+    S1.<siswa_id>.<nisn>.<card_version>.<tag>
+
+tag = HMAC-SHA256(QR_SECRET_KEY, "S1.<siswa_id>.<nisn>.<card_version>")
+dipotong QR_SIGN_CONFIG['tag_bytes'] byte lalu di-encode base32 tanpa
+padding. Semua karakter berada di charset alfanumerik QR (angka, huruf
+besar, titik) sehingga QR tetap kecil.
+
+verify_payload() memeriksa tag lalu membandingkan versi kartu dengan
+siswa.card_version di database (satu lookup primary key, di-cache per
+siswa selama QR_SIGN_CONFIG['student_ttl_seconds']). Kartu palsu ditolak
+tanpa query; kartu yang dicabut lewat worker mana pun (card_version
+dinaikkan) ditolak paling lambat setelah TTL tersebut.
+
+Kartu lama berisi NISN polos tidak bisa dicabut per versi, jadi
+check_plain_card() menolaknya begitu siswa sudah punya kartu baru
+(card_version > 1).
+"""
+
+import base64
+import hashlib
+import hmac
+import logging
+import threading
+import time
+from utils.database import fetch_one
+from utils.cache import register_invalidator
+from config import QR_SECRET_KEY, QR_SIGN_CONFIG
+
+logger = logging.getLogger(__name__)
+
+PREFIX = QR_SIGN_CONFIG['prefix']
+
+STUDENT_QUERY = """
+    SELECT s.id, s.nis, s.nisn, s.nama, s.gender, s.kelas_id, s.card_version, k.tingkat
+    FROM siswa s
+    LEFT JOIN kelas k ON s.kelas_id = k.id
+    WHERE s.id = %s
+"""
+
+_lock = threading.Lock()
+_students = {}  # siswa_id -> (expires: time.monotonic(), baris siswa)
+
+
+class InvalidQR(ValueError):
+    """Payload QR ditolak; status = kode HTTP yang sesuai"""
+
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+def _tag(message):
+    digest = hmac.new(QR_SECRET_KEY.encode(), message.encode(), hashlib.sha256).digest()
+    return base64.b32encode(digest[:QR_SIGN_CONFIG['tag_bytes']]).decode().rstrip('=')
+
+
+def sign_payload(siswa_id, nisn, card_version):
+    """Payload QR bertanda tangan untuk kartu siswa"""
+    message = f"{PREFIX}.{int(siswa_id)}.{str(nisn).strip()}.{int(card_version or 1)}"
+    return f"{message}.{_tag(message)}"
+
+
+def card_payload(siswa_id, nisn, card_version):
+    """Isi QR kartu: payload bertanda tangan, atau NISN polos jika sign_cards dimatikan"""
+    if QR_SIGN_CONFIG['sign_cards']:
+        return sign_payload(siswa_id, nisn, card_version)
+    return str(nisn).strip()
+
+
+def is_signed(qr_data):
+    """True jika qr_data berformat payload bertanda tangan (bukan NISN polos)"""
+    return qr_data.strip().upper().startswith(f"{PREFIX}.")
+
+
+def parse_payload(qr_data):
+    """
+    Periksa format dan tag payload; return (siswa_id, nisn, card_version).
+    Raise InvalidQR jika format salah atau tag tidak cocok.
+    """
+    parts = qr_data.strip().upper().split('.')
+    if len(parts) != 5 or parts[0] != PREFIX:
+        raise InvalidQR("Format QR tidak valid")
+
+    _, siswa_id, nisn, card_version, tag = parts
+    if not (siswa_id.isdigit() and nisn.isdigit() and card_version.isdigit()):
+        raise InvalidQR("Format QR tidak valid")
+
+    expected = _tag(f"{PREFIX}.{int(siswa_id)}.{nisn}.{int(card_version)}")
+    if not hmac.compare_digest(expected, tag):
+        raise InvalidQR("Tanda tangan QR tidak valid", status=401)
+    return int(siswa_id), nisn, int(card_version)
+
+
+def _get_student(siswa_id, nisn, card_version):
+    """
+    Baris siswa (+ tingkat) dari cache; dibaca ulang dari database jika
+    belum ada, kedaluwarsa, atau kartu tidak cocok dengan yang di-cache
+    (dicetak ulang / NISN diubah di worker lain atau PHP). None jika siswa
+    tidak ada.
+    """
+    now = time.monotonic()
+    with _lock:
+        entry = _students.get(siswa_id)
+    if (entry and entry[0] > now and str(entry[1]['nisn']).strip() == nisn
+            and card_version <= (entry[1]['card_version'] or 1)):
+        return entry[1]
+
+    student = fetch_one(STUDENT_QUERY, (siswa_id,))
+    if not student:
+        return None
+    with _lock:
+        if len(_students) >= QR_SIGN_CONFIG['student_cache_size'] and siswa_id not in _students:
+            _students.pop(next(iter(_students)))  # buang entri tertua
+        _students[siswa_id] = (now + QR_SIGN_CONFIG['student_ttl_seconds'], student)
+    return student
+
+
+def verify_payload(qr_data):
+    """
+    Autentikasi payload dan cari siswanya. Return baris siswa (id, nis,
+    nisn, nama, gender, kelas_id, card_version, tingkat). Raise InvalidQR
+    jika tag salah, kartu dicabut/lama, atau siswa tidak ada.
+    """
+    siswa_id, nisn, card_version = parse_payload(qr_data)
+
+    student = _get_student(siswa_id, nisn, card_version)
+    if not student or str(student['nisn']).strip() != nisn:
+        raise InvalidQR("Siswa tidak valid", status=404)
+
+    # Kartu dicabut = card_version di database sudah dinaikkan
+    if card_version < (student['card_version'] or 1):
+        raise InvalidQR("Kartu sudah dicabut atau tidak berlaku, gunakan kartu terbaru", status=403)
+    return student
+
+
+def check_plain_card(student):
+    """Raise InvalidQR jika kartu NISN polos siswa sudah diganti (card_version > 1)"""
+    if (student['card_version'] or 1) > 1:
+        raise InvalidQR("Kartu lama sudah tidak berlaku, gunakan kartu terbaru", status=403)
+
+
+def revoke(siswa_id, card_version):
+    """Kartu versi card_version dicabut (card_version di database sudah dinaikkan)"""
+    forget_student(siswa_id)
+    logger.info(f"Kartu QR dicabut: siswa_id={siswa_id} versi={card_version}")
+
+
+def forget_student(*siswa_ids):
+    """Hapus siswa dari cache verifikasi; tanpa argumen kosongkan semua"""
+    with _lock:
+        if not siswa_ids:
+            _students.clear()
+        for siswa_id in siswa_ids:
+            _students.pop(int(siswa_id), None)
+
+
+def _student_stats():
+    with _lock:
+        return {'warm': bool(_students), 'entries': len(_students)}
+
+
+register_invalidator('qr_students', forget_student, stats=_student_stats)
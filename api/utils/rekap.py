@@ -0,0 +1,358 @@
+# utils/rekap.py
+"""
+Counter absensi per siswa (tabel absensi_rekap)
+
+Satu baris per siswa berisi jumlah record per status serta tanggal
+absensi pertama/terakhir, mencakup tabel hot dan arsip. Counter dijaga
+oleh trigger AFTER INSERT/UPDATE/DELETE pada absensi dan absensi_arsip
+sehingga semua jalur tulis (API, absensi/manual.php, scanner-api.py,
+penandaan Alpha, pemindahan arsip) ikut terhitung. Halaman profil cukup
+membaca satu baris berdasarkan primary key.
+
+Jika tabel/trigger belum bisa dibuat (mis. user database tidak punya
+privilege TRIGGER), is_ready() bernilai False dan pemanggil kembali
+memakai agregasi COUNT(...) biasa.
+
+DDL dan rebuild diserialisasi dengan GET_LOCK('absensi_rekap') sehingga
+beberapa worker gunicorn yang start/diinvalidasi bersamaan tidak saling
+membuat trigger atau rebuild berbarengan; worker yang menunggu memakai
+hasil worker pertama.
+
+    python -m utils.rekap ensure      # buat tabel + trigger, rebuild jika baru
+    python -m utils.rekap rebuild     # hitung ulang semua counter
+    python -m utils.rekap show 123    # counter satu siswa
+"""
+
+import logging
+import threading
+import time
+from datetime import datetime
+from mysql.connector import Error
+from utils.database import get_db, fetch_one, fetch_all, transaction
+from utils.archive import HOT_TABLE, ARCHIVE_TABLE, ensure_archive_table
+from utils.cache import register_invalidator
+from config import REKAP_CONFIG
+
+logger = logging.getLogger(__name__)
+
+TABLE = REKAP_CONFIG['table']
+STATUS_COLUMNS = {
+    'hadir': 'Hadir',
+    'izin': 'Izin',
+    'sakit': 'Sakit',
+    'alpha': 'Alpha',
+    'terlambat': 'Terlambat',
+}
+SOURCE_TABLES = (HOT_TABLE, ARCHIVE_TABLE)
+LOCK_NAME = 'absensi_rekap'
+ER_TRG_ALREADY_EXISTS = 1359
+
+_lock = threading.Lock()
+_ready = False
+_rebuilt_at = None
+_ensure_thread = None
+
+
+# ===========================================
+# DDL (tabel + trigger)
+# ===========================================
+def _history(siswa_expr, aggregate):
+    """Subquery MIN/MAX tanggal seorang siswa di tabel hot + arsip"""
+    union = ' UNION ALL '.join(
+        f"SELECT tanggal FROM `{table}` WHERE siswa_id = {siswa_expr}" for table in SOURCE_TABLES)
+    return f"(SELECT {aggregate}(tanggal) FROM ({union}) h)"
+
+
+def _add_sql(row):
+    """Tambahkan record row (NEW/OLD) ke counter"""
+    columns = ', '.join(STATUS_COLUMNS)
+    values = ', '.join(f"{row}.status <=> '{status}'" for status in STATUS_COLUMNS.values())
+    updates = ',\n                '.join(
+        f"{col} = {col} + ({row}.status <=> '{status}')" for col, status in STATUS_COLUMNS.items())
+    return f"""
+            INSERT INTO `{TABLE}` (siswa_id, total, {columns}, first_date, last_date)
+            VALUES ({row}.siswa_id, 1, {values}, {row}.tanggal, {row}.tanggal)
+            ON DUPLICATE KEY UPDATE
+                total = total + 1,
+                {updates},
+                first_date = IF(first_date IS NULL OR {row}.tanggal < first_date, {row}.tanggal, first_date),
+                last_date = IF(last_date IS NULL OR {row}.tanggal > last_date, {row}.tanggal, last_date);"""
+
+
+def _remove_sql(row):
+    """Kurangi counter untuk record row; tanggal dihitung ulang jika batasnya terhapus"""
+    updates = ',\n                '.join(
+        f"{col} = {col} - ({row}.status <=> '{status}')" for col, status in STATUS_COLUMNS.items())
+    return f"""
+            UPDATE `{TABLE}` SET
+                total = total - 1,
+                {updates}
+            WHERE siswa_id = {row}.siswa_id;
+            UPDATE `{TABLE}` SET
+                first_date = {_history(f'{row}.siswa_id', 'MIN')},
+                last_date = {_history(f'{row}.siswa_id', 'MAX')}
+            WHERE siswa_id = {row}.siswa_id
+                AND (first_date = {row}.tanggal OR last_date = {row}.tanggal);"""
+
+
+def _trigger_sql(table):
+    """nama trigger -> CREATE TRIGGER untuk satu tabel sumber"""
+    return {
+        f"trg_{table}_rekap_ai": f"""
+            CREATE TRIGGER `trg_{table}_rekap_ai` AFTER INSERT ON `{table}` FOR EACH ROW
+            BEGIN
+                IF NEW.siswa_id IS NOT NULL THEN {_add_sql('NEW')}
+                END IF;
+            END""",
+        f"trg_{table}_rekap_au": f"""
+            CREATE TRIGGER `trg_{table}_rekap_au` AFTER UPDATE ON `{table}` FOR EACH ROW
+            BEGIN
+                IF NOT (OLD.siswa_id <=> NEW.siswa_id AND OLD.status <=> NEW.status
+                        AND OLD.tanggal <=> NEW.tanggal) THEN
+                    IF OLD.siswa_id IS NOT NULL THEN {_remove_sql('OLD')}
+                    END IF;
+                    IF NEW.siswa_id IS NOT NULL THEN {_add_sql('NEW')}
+                    END IF;
+                END IF;
+            END""",
+        f"trg_{table}_rekap_ad": f"""
+            CREATE TRIGGER `trg_{table}_rekap_ad` AFTER DELETE ON `{table}` FOR EACH ROW
+            BEGIN
+                IF OLD.siswa_id IS NOT NULL THEN {_remove_sql('OLD')}
+                END IF;
+            END""",
+    }
+
+
+def _get_lock(cursor, timeout):
+    cursor.execute("SELECT GET_LOCK(%s, %s)", (LOCK_NAME, timeout))
+    return cursor.fetchone()[0] == 1
+
+
+def ensure_rekap(rebuild=False, job=None, coalesce=False):
+    """
+    Buat tabel counter dan trigger yang belum ada. Counter dibangun ulang
+    jika tabel/trigger baru dibuat (record sebelumnya belum terhitung)
+    atau rebuild=True. coalesce=True: jika worker lain sedang memegang
+    lock, tunggu lalu pakai hasilnya tanpa rebuild lagi. Return ringkasan;
+    raise jika DDL gagal.
+    """
+    global _ready
+    # Trigger tabel hot ikut membaca tabel arsip, jadi arsip harus ada
+    if not ensure_archive_table():
+        raise RuntimeError(f"Tabel {ARCHIVE_TABLE} tidak bisa dibuat")
+
+    # Koneksi ini memegang GET_LOCK sampai DDL + rebuild selesai
+    conn = get_db()
+    if not conn:
+        raise RuntimeError("Database connection failed")
+    cursor = conn.cursor()
+    created = []
+    locked = False
+    try:
+        waited = not _get_lock(cursor, 0)
+        if waited:
+            logger.info("Rekap absensi sedang disiapkan worker lain, menunggu")
+            if not _get_lock(cursor, REKAP_CONFIG['lock_timeout_seconds']):
+                raise RuntimeError("Timeout menunggu lock rekap absensi")
+            if coalesce:
+                rebuild = False
+        locked = True
+
+        cursor.execute(
+            "SELECT COUNT(*) FROM information_schema.TABLES "
+            "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s", (TABLE,))
+        if not cursor.fetchone()[0]:
+            cursor.execute(f"""
+                CREATE TABLE IF NOT EXISTS `{TABLE}` (
+                    siswa_id INT NOT NULL PRIMARY KEY,
+                    total INT NOT NULL DEFAULT 0,
+                    {' '.join(f'{col} INT NOT NULL DEFAULT 0,' for col in STATUS_COLUMNS)}
+                    first_date DATE NULL,
+                    last_date DATE NULL
+                )
+            """)
+            created.append(TABLE)
+
+        cursor.execute(
+            "SELECT TRIGGER_NAME FROM information_schema.TRIGGERS WHERE TRIGGER_SCHEMA = DATABASE()")
+        existing = {row[0] for row in cursor.fetchall()}
+        for table in SOURCE_TABLES:
+            for name, sql in _trigger_sql(table).items():
+                if name in existing:
+                    continue
+                try:
+                    cursor.execute(sql)
+                    created.append(name)
+                except Error as e:
+                    if e.errno != ER_TRG_ALREADY_EXISTS:
+                        raise
+        conn.commit()
+
+        result = {'created': created, 'rebuilt': None}
+        if created or rebuild:
+            result['rebuilt'] = rebuild_rekap(job=job)
+    except Error as e:
+        with _lock:
+            _ready = False
+        raise RuntimeError(f"Tabel/trigger {TABLE} gagal dibuat: {e}")
+    finally:
+        if locked:
+            try:
+                cursor.execute("SELECT RELEASE_LOCK(%s)", (LOCK_NAME,))
+                cursor.fetchone()
+            except Error as e:
+                logger.warning(f"Release lock rekap error: {e}")
+        cursor.close()
+        conn.close()
+
+    with _lock:
+        _ready = True
+    if created:
+        logger.info(f"Rekap absensi: dibuat {', '.join(created)}")
+    return result
+
+
+# ===========================================
+# REBUILD
+# ===========================================
+def rebuild_rekap(chunk_size=None, job=None):
+    """
+    Hitung ulang counter dari tabel hot + arsip per rentang siswa_id.
+    Setiap rentang (DELETE + INSERT ... SELECT) satu transaksi sehingga
+    scan hanya tertahan sebentar dan update dari trigger tidak hilang.
+    """
+    global _rebuilt_at
+    chunk_size = chunk_size or REKAP_CONFIG['rebuild_chunk_size']
+    bounds = fetch_one(
+        f"SELECT MIN(siswa_id) as first_id, MAX(siswa_id) as last_id FROM ("
+        + " UNION ALL ".join(
+            f"SELECT MIN(siswa_id) as siswa_id FROM `{t}` UNION ALL SELECT MAX(siswa_id) FROM `{t}`"
+            for t in SOURCE_TABLES)
+        + ") b")
+    if bounds is None:
+        raise RuntimeError("Gagal membaca rentang siswa_id")
+
+    start = time.perf_counter()
+    result = {'students': 0, 'chunks': 0}
+    first_id, last_id = bounds['first_id'], bounds['last_id']
+    with transaction() as tx:
+        # Counter siswa di luar rentang (semua record-nya sudah terhapus)
+        if first_id is None:
+            tx.execute(f"DELETE FROM `{TABLE}`")
+        else:
+            tx.execute(f"DELETE FROM `{TABLE}` WHERE siswa_id < %s OR siswa_id > %s", (first_id, last_id))
+
+    columns = ', '.join(STATUS_COLUMNS)
+    sums = ', '.join(f"SUM(status <=> '{status}')" for status in STATUS_COLUMNS.values())
+    union = ' UNION ALL '.join(
+        f"SELECT siswa_id, status, tanggal FROM `{t}` WHERE siswa_id BETWEEN %s AND %s"
+        for t in SOURCE_TABLES)
+
+    low = first_id
+    while low is not None and low <= last_id:
+        high = low + chunk_size - 1
+        with transaction() as tx:
+            tx.execute(f"DELETE FROM `{TABLE}` WHERE siswa_id BETWEEN %s AND %s", (low, high))
+            result['students'] += tx.execute(f"""
+                INSERT INTO `{TABLE}` (siswa_id, total, {columns}, first_date, last_date)
+                SELECT siswa_id, COUNT(*), {sums}, MIN(tanggal), MAX(tanggal)
+                FROM ({union}) h
+                GROUP BY siswa_id
+            """, (low, high) * len(SOURCE_TABLES))
+        result['chunks'] += 1
+        if job:
+            job.update(high - first_id + 1, last_id - first_id + 1, f"siswa_id s/d {high}")
+            job.check_cancelled()
+        low = high + 1
+
+    result['duration_seconds'] = round(time.perf_counter() - start, 2)
+    with _lock:
+        _rebuilt_at = datetime.now().isoformat(timespec='seconds')
+    logger.info(f"Rekap absensi dibangun ulang: {result['students']} siswa ({result['duration_seconds']} s)")
+    return result
+
+
+def rebuild_job(job):
+    """Fungsi job untuk utils.jobs.submit: pastikan trigger ada lalu rebuild"""
+    return ensure_rekap(rebuild=True, job=job)
+
+
+def ensure_rekap_async(rebuild=False):
+    """Jalankan ensure_rekap di background thread (startup / setelah restore)"""
+    global _ensure_thread
+    with _lock:
+        if _ensure_thread and _ensure_thread.is_alive():
+            return _ensure_thread
+
+        def run():
+            try:
+                ensure_rekap(rebuild=rebuild, coalesce=True)
+            except Exception as e:
+                logger.warning(f"Rekap absensi tidak aktif, memakai agregasi biasa: {e}")
+
+        _ensure_thread = threading.Thread(target=run, name='rekap-ensure', daemon=True)
+        _ensure_thread.start()
+        return _ensure_thread
+
+
+# ===========================================
+# READ
+# ===========================================
+def is_ready():
+    """True jika tabel + trigger terpasang dan counter sudah dibangun"""
+    with _lock:
+        return _ready
+
+
+def get_rekap(siswa_id):
+    """
+    Counter satu siswa (primary key lookup). Return None jika rekap belum
+    siap atau query gagal; siswa tanpa absensi mendapat counter nol.
+    """
+    if not is_ready():
+        return None
+    rows = fetch_all(f"""
+        SELECT total, {', '.join(STATUS_COLUMNS)}, first_date, last_date
+        FROM `{TABLE}` WHERE siswa_id = %s
+    """, (siswa_id,), strict=True)
+    if rows is None:
+        return None
+    if not rows:
+        return {'total': 0, **{col: 0 for col in STATUS_COLUMNS}, 'first_date': None, 'last_date': None}
+    return rows[0]
+
+
+def invalidate_rekap():
+    """Isi database diganti massal (restore): pasang ulang trigger dan rebuild"""
+    global _ready
+    with _lock:
+        _ready = False
+    ensure_rekap_async(rebuild=True)
+
+
+def _rekap_stats():
+    with _lock:
+        return {'warm': _ready, 'rebuilt_at': _rebuilt_at}
+
+
+register_invalidator('rekap', invalidate_rekap, stats=_rekap_stats)
+
+
+if __name__ == '__main__':
+    import argparse
+    import json
+
+    parser = argparse.ArgumentParser(description='Counter absensi per siswa (absensi_rekap)')
+    parser.add_argument('command', choices=['ensure', 'rebuild', 'show'])
+    parser.add_argument('siswa_id', nargs='?', type=int)
+    args = parser.parse_args()
+
+    if args.command == 'show':
+        if args.siswa_id is None:
+            parser.error('show membutuhkan siswa_id')
+        ensure_rekap()
+        output = get_rekap(args.siswa_id)
+    else:
+        output = ensure_rekap(rebuild=args.command == 'rebuild')
+    print(json.dumps(output, indent=2, default=str))
@@ -0,0 +1,105 @@
+# utils/roster.py
+"""
+Cache roster siswa per kelas in-memory
+
+Roster (siswa + kelas) dimuat dengan dua query lalu disimpan sebagai
+snapshot yang tidak diubah; endpoint yang butuh daftar siswa per kelas
+(absentee, dll.) cukup membaca snapshot tanpa query ke tabel siswa.
+Endpoint tulis siswa/kelas memanggil invalidate_roster() dan snapshot
+dimuat ulang pada pemakaian berikutnya, atau paling lambat setelah
+ROSTER_CONFIG['ttl_seconds'].
+"""
+
+import logging
+import threading
+import time
+from datetime import datetime
+from utils.database import fetch_all
+from utils.cache import register_invalidator
+from config import ROSTER_CONFIG
+
+logger = logging.getLogger(__name__)
+
+STUDENT_QUERY = """
+    SELECT id, nis, nisn, nama, gender, kelas_id, card_version
+    FROM siswa
+    ORDER BY nama
+"""
+KELAS_QUERY = """
+    SELECT k.id, k.nama_kelas, k.tingkat, j.nama as jurusan
+    FROM kelas k
+    LEFT JOIN jurusan j ON k.jurusan_id = j.id
+    ORDER BY k.tingkat, j.nama, k.nama_kelas
+"""
+
+
+class Roster:
+    """Snapshot roster; jangan diubah setelah dibuat"""
+
+    def __init__(self, students, kelas, version):
+        self.version = version
+        self.loaded_at = datetime.now().isoformat(timespec='seconds')
+        self.students = {s['id']: s for s in students}
+        self.kelas = {k['id']: k for k in kelas}  # urutan: tingkat, jurusan, nama_kelas
+        self.by_kelas = {kelas_id: [] for kelas_id in self.kelas}
+        self.without_kelas = []  # siswa dengan kelas_id kosong/tidak valid
+        for student in students:
+            self.by_kelas.get(student['kelas_id'], self.without_kelas).append(student['id'])
+
+    def __len__(self):
+        return len(self.students)
+
+
+_lock = threading.Lock()
+_roster = None
+_loaded = 0.0  # time.monotonic() saat dimuat
+_version = 0
+
+
+def load_roster():
+    """Muat roster dari database dan jadikan snapshot aktif"""
+    global _roster, _loaded, _version
+    students = fetch_all(STUDENT_QUERY, strict=True)
+    kelas = fetch_all(KELAS_QUERY, strict=True)
+    if students is None or kelas is None:
+        raise RuntimeError("Gagal membaca roster dari database")
+
+    with _lock:
+        _version += 1
+        _roster = Roster(students, kelas, _version)
+        _loaded = time.monotonic()
+        return _roster
+
+
+def get_roster():
+    """Snapshot roster aktif; dimuat ulang jika kosong/diinvalidasi/kedaluwarsa"""
+    with _lock:
+        roster = _roster
+        fresh = roster is not None and time.monotonic() - _loaded < ROSTER_CONFIG['ttl_seconds']
+    if fresh:
+        return roster
+    return load_roster()
+
+
+def invalidate_roster():
+    """Paksa roster dimuat ulang pada pemakaian berikutnya"""
+    global _roster
+    with _lock:
+        _roster = None
+
+
+def _roster_stats():
+    with _lock:
+        roster = _roster
+    if roster is None:
+        return {'warm': False}
+    return {
+        'warm': True,
+        'version': roster.version,
+        'students': len(roster),
+        'kelas': len(roster.kelas),
+        'loaded_at': roster.loaded_at,
+    }
+
+
+register_invalidator('roster', invalidate_roster, stats=_roster_stats)
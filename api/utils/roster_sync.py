@@ -0,0 +1,176 @@
+# utils/roster_sync.py
+"""
+Snapshot roster ringkas + delta untuk kiosk scan (absensi/scan.html, scanner.html)
+
+Kiosk mengunduh snapshot (id, nisn, nis, nama, kelas) sekali lalu hanya
+meminta perubahan sejak versi yang dimilikinya, sehingga NISN bisa
+langsung dicocokkan di browser dan tetap jalan saat server sebentar
+tidak terjangkau.
+
+sync() membandingkan roster aktif (utils.roster) dengan roster yang
+terakhir dipublikasikan. Jika ada perubahan, versi naik, perubahannya
+disimpan di riwayat (ROSTER_CONFIG['delta_history'] versi terakhir) dan
+snapshot JSON + gzip dibangun ulang sekali; request berikutnya cukup
+mengirim blob tersebut.
+
+ETag snapshot adalah hash isi roster, jadi sama di semua worker gunicorn
+dan kiosk tetap mendapat 304 walaupun request-nya berpindah worker.
+Riwayat delta hanya ada di memori satu proses: versi berbentuk
+"<epoch>.<seq>" dengan epoch unik per proses (pid + acak), sehingga versi
+dari worker lain atau sebelum restart selalu dijawab dengan reset.
+Reset tidak menyertakan roster: /api/roster/delta menjawab 409 dan kiosk
+mengunduh ulang /api/roster/snapshot (yang bisa dijawab 304 lewat ETag).
+"""
+
+import gzip
+import hashlib
+import json
+import logging
+import os
+import secrets
+import threading
+from collections import deque
+from datetime import datetime
+from utils.roster import get_roster
+from utils.json_encoder import CustomJSONEncoder
+from config import ROSTER_CONFIG
+
+logger = logging.getLogger(__name__)
+
+FIELDS = ('id', 'nisn', 'nis', 'nama', 'kelas')
+
+_lock = threading.Lock()
+_epoch = None  # (pid, epoch); dibuat ulang setelah fork (gunicorn --preload)
+_seq = 0
+_roster_version = None  # versi utils.roster yang terakhir dibandingkan
+_entries = {}  # siswa_id -> (id, nisn, nis, nama, kelas)
+_history = deque(maxlen=ROSTER_CONFIG['delta_history'])  # (seq, upserts, removed)
+_snapshot = None
+
+
+class Snapshot:
+    """Snapshot yang sudah di-encode; jangan diubah setelah dibuat"""
+
+    def __init__(self, version, entries):
+        self.version = version
+        students = list(entries.values())  # urut nama seperti roster
+        content = json.dumps(students, cls=CustomJSONEncoder, separators=(',', ':')).encode('utf-8')
+        self.etag = f"roster-{hashlib.sha1(content).hexdigest()[:16]}"
+        self.count = len(entries)
+        self.generated_at = datetime.now().isoformat(timespec='seconds')
+        self.body = json.dumps({
+            'success': True,
+            'version': version,
+            'generated_at': self.generated_at,
+            'fields': FIELDS,
+            'count': self.count,
+            'students': students,
+        }, cls=CustomJSONEncoder, separators=(',', ':')).encode('utf-8')
+        self.gzipped = gzip.compress(self.body, compresslevel=ROSTER_CONFIG['gzip_level'])
+
+
+def _current_epoch():
+    """Epoch proses ini: pid + acak, berbeda di setiap worker dan setiap restart"""
+    global _epoch
+    if _epoch is None or _epoch[0] != os.getpid():
+        _epoch = (os.getpid(), f"{os.getpid():x}{secrets.token_hex(3)}")
+    return _epoch[1]
+
+
+def _version():
+    return f"{_current_epoch()}.{_seq}"
+
+
+def _roster_entries(roster):
+    entries = {}
+    for student in roster.students.values():
+        kelas = roster.kelas.get(student['kelas_id'])
+        entries[student['id']] = (
+            student['id'],
+            student['nisn'] or '',
+            student['nis'] or '',
+            student['nama'] or '',
+            kelas['nama_kelas'] if kelas else '',
+        )
+    return entries
+
+
+def sync():
+    """Publikasikan roster aktif jika berubah; return Snapshot terbaru"""
+    global _seq, _roster_version, _entries, _snapshot
+    roster = get_roster()
+    with _lock:
+        if _snapshot is not None and roster.version == _roster_version:
+            return _snapshot
+
+        entries = _roster_entries(roster)
+        upserts = {sid: entry for sid, entry in entries.items() if _entries.get(sid) != entry}
+        removed = set(_entries) - set(entries)
+        if upserts or removed or _snapshot is None:
+            _seq += 1
+            _history.append((_seq, upserts, removed))
+            _entries = entries
+            _snapshot = Snapshot(_version(), entries)
+            logger.info(f"Roster kiosk versi {_snapshot.version}: "
+                        f"{len(upserts)} berubah, {len(removed)} dihapus")
+        _roster_version = roster.version
+        return _snapshot
+
+
+def parse_version(since):
+    """'<epoch>.<seq>' -> (epoch, seq); ValueError jika formatnya salah"""
+    epoch, seq = since.split('.')
+    if not epoch.isalnum():
+        raise ValueError(since)
+    return epoch.lower(), int(seq)
+
+
+def delta(since):
+    """
+    Perubahan roster sejak versi since. Jika versi tidak dikenal (worker
+    lain, API restart, terlalu lama, atau kosong) hasilnya reset=True
+    tanpa upserts; kiosk harus mengambil ulang snapshot.
+    """
+    sync()
+    with _lock:
+        version, etag = _version(), _snapshot.etag
+        epoch, seq = parse_version(since) if since else (None, None)
+        oldest = _history[0][0] - 1 if _history else _seq
+        reset = epoch != _current_epoch() or seq > _seq or seq < oldest
+
+        upserts, removed = {}, set()
+        if not reset:
+            for change_seq, changed, deleted in _history:
+                if change_seq <= seq:
+                    continue
+                upserts.update(changed)
+                removed.difference_update(changed)
+                for sid in deleted:
+                    upserts.pop(sid, None)
+                    removed.add(sid)
+
+    return {
+        'version': version,
+        'etag': etag,
+        'since': since,
+        'reset': reset,
+        'fields': FIELDS,
+        'upserts': list(upserts.values()),
+        'removed': sorted(removed),
+    }
+
+
+def get_sync_stats():
+    """Status roster kiosk untuk diagnostik"""
+    with _lock:
+        if _snapshot is None:
+            return {'warm': False}
+        return {
+            'warm': True,
+            'version': _snapshot.version,
+            'students': _snapshot.count,
+            'history': len(_history),
+            'bytes': len(_snapshot.body),
+            'gzip_bytes': len(_snapshot.gzipped),
+            'generated_at': _snapshot.generated_at,
+        }
@@ -0,0 +1,199 @@
+# utils/sampler.py
+"""
+Sampler metrik sistem di background untuk /api/system/info
+
+Setiap SAMPLER_CONFIG['interval_seconds'] thread sampler mencatat CPU,
+memori, disk, RSS proses, jumlah thread dan file descriptor ke ring
+buffer. cpu_percent dipanggil tanpa interval (non-blocking, dihitung
+sejak sample sebelumnya). Jumlah baris tabel di-cache dan di-refresh
+oleh thread yang sama, sehingga endpoint tidak pernah menjalankan
+COUNT(*) atau menunggu psutil.
+"""
+
+import logging
+import os
+import platform
+import socket
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from utils.database import fetch_one
+from utils.archive import HOT_TABLE, ARCHIVE_TABLE
+from utils.cache import register_invalidator
+from config import SAMPLER_CONFIG
+
+try:
+    import psutil
+except ImportError:  # tanpa psutil hanya thread/fd yang disample
+    psutil = None
+
+logger = logging.getLogger(__name__)
+
+COUNTED_TABLES = {
+    'student_count': 'siswa',
+    'attendance_count': HOT_TABLE,
+    'archived_attendance_count': ARCHIVE_TABLE,
+    'user_count': 'users',
+}
+
+_lock = threading.Lock()
+_samples = deque(maxlen=SAMPLER_CONFIG['history_size'])
+_table_counts = {}
+_counts_refreshed = 0.0  # time.monotonic() refresh terakhir, 0 = perlu refresh
+_counts_updated_at = None
+_static = None  # info sistem yang tidak berubah, diisi saat pertama dipakai
+_thread = None
+_process = psutil.Process() if psutil else None
+
+
+def _open_fds():
+    if _process and hasattr(_process, 'num_fds'):
+        return _process.num_fds()
+    try:
+        return len(os.listdir('/proc/self/fd'))
+    except OSError:
+        return None
+
+
+def take_sample():
+    """Ambil satu sample dan simpan ke ring buffer"""
+    sample = {
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'threads': threading.active_count(),
+        'open_fds': _open_fds(),
+    }
+    if psutil:
+        memory = psutil.virtual_memory()
+        sample.update({
+            'cpu_percent': psutil.cpu_percent(interval=None),
+            'memory_percent': memory.percent,
+            'disk_percent': psutil.disk_usage(SAMPLER_CONFIG['disk_path']).percent,
+            'process_rss_mb': round(_process.memory_info().rss / (1024 ** 2), 1),
+            'process_cpu_percent': _process.cpu_percent(interval=None),
+        })
+    with _lock:
+        _samples.append(sample)
+    return sample
+
+
+def _table_exists(table):
+    row = fetch_one(
+        "SELECT COUNT(*) as total FROM information_schema.TABLES "
+        "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s",
+        (table,),
+    )
+    return bool(row and row['total'])
+
+
+def refresh_table_counts():
+    """Jalankan COUNT(*) untuk tabel di COUNTED_TABLES dan simpan hasilnya"""
+    global _counts_refreshed, _counts_updated_at
+    counts = {}
+    for key, table in COUNTED_TABLES.items():
+        if table == ARCHIVE_TABLE and not _table_exists(table):
+            counts[key] = 0
+            continue
+        row = fetch_one(f"SELECT COUNT(*) as total FROM `{table}`")
+        counts[key] = row['total'] if row else None
+
+    with _lock:
+        # Database tidak terjangkau: pertahankan hasil sebelumnya
+        if counts['student_count'] is not None:
+            _table_counts.update(counts)
+            _counts_updated_at = datetime.now().isoformat(timespec='seconds')
+        _counts_refreshed = time.monotonic()
+    return counts
+
+
+def invalidate_table_counts():
+    """Paksa jumlah baris di-refresh pada tick sampler berikutnya"""
+    global _counts_refreshed
+    with _lock:
+        _counts_refreshed = 0.0
+
+
+def _counts_stats():
+    with _lock:
+        return {'warm': bool(_table_counts), 'updated_at': _counts_updated_at}
+
+
+register_invalidator('table_counts', invalidate_table_counts, stats=_counts_stats)
+
+
+def start_sampler():
+    """Jalankan sampler di background thread (sekali per proses)"""
+    global _thread
+    if _thread and _thread.is_alive():
+        return _thread
+
+    if psutil:
+        # Panggilan pertama cpu_percent(None) selalu 0.0; jadikan titik awal
+        psutil.cpu_percent(interval=None)
+        _process.cpu_percent(interval=None)
+
+    def loop():
+        while True:
+            try:
+                take_sample()
+                with _lock:
+                    due = (not _counts_refreshed or time.monotonic() - _counts_refreshed
+                           >= SAMPLER_CONFIG['table_counts_ttl_seconds'])
+                if due:
+                    refresh_table_counts()
+            except Exception as e:
+                logger.error(f"System sampler error: {e}")
+            time.sleep(SAMPLER_CONFIG['interval_seconds'])
+
+    _thread = threading.Thread(target=loop, name='system-sampler', daemon=True)
+    _thread.start()
+    return _thread
+
+
+def _static_info():
+    info = {
+        'hostname': socket.gethostname(),
+        'os': platform.system(),
+        'os_version': platform.version(),
+        'python_version': platform.python_version(),
+        'processor': platform.processor(),
+        'architecture': platform.machine(),
+    }
+    if psutil:
+        memory = psutil.virtual_memory()
+        disk = psutil.disk_usage(SAMPLER_CONFIG['disk_path'])
+        info.update({
+            'cpu_cores': psutil.cpu_count(),
+            'memory_total_gb': round(memory.total / (1024 ** 3), 2),
+            'disk_total_gb': round(disk.total / (1024 ** 3), 2),
+        })
+    return info
+
+
+def get_system_info(history=60):
+    """Sample terakhir, history pendek per metrik, info statis dan jumlah baris tabel"""
+    global _static
+    if _static is None:
+        _static = _static_info()
+
+    with _lock:
+        samples = list(_samples)[-history:] if history else []
+        latest = _samples[-1] if _samples else None
+        counts = dict(_table_counts)
+        counts_updated_at = _counts_updated_at
+
+    metrics = [k for k in (latest or {}) if k != 'timestamp']
+    return {
+        'system': _static,
+        'psutil': psutil is not None,
+        'interval_seconds': SAMPLER_CONFIG['interval_seconds'],
+        'current': latest,
+        'history': {
+            'timestamps': [s['timestamp'] for s in samples],
+            **{key: [s.get(key) for s in samples] for key in metrics},
+        },
+        'database': {
+            'counts': counts,
+            'counts_updated_at': counts_updated_at,
+        },
+    }
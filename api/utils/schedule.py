@@ -0,0 +1,225 @@
+# utils/schedule.py
+"""
+Jadwal jam masuk per tingkat dan per hari, untuk klasifikasi Hadir/Terlambat
+
+Jadwal disimpan di tabel jadwal_masuk dan di-cache di memori. Kolom
+tingkat '' berarti semua tingkat dan hari 0 berarti semua hari
+(1 = Senin ... 7 = Minggu, isoweekday). Urutan pencarian jadwal:
+
+    (tingkat, hari) -> (tingkat, semua hari) -> (semua tingkat, hari)
+    -> (semua, semua) -> SCHEDULE_CONFIG['default_start']
+
+classify_arrival() dipanggil endpoint scan saat insert dengan tingkat
+yang sudah dibaca bersama data siswa (JOIN kelas), jadi scan tidak
+bergantung pada roster. Cache
+dikosongkan saat jadwal diubah lewat set_schedules() dan dimuat ulang
+paling lambat setelah SCHEDULE_CONFIG['ttl_seconds'].
+"""
+
+import logging
+import threading
+import time
+from datetime import datetime, timedelta
+from mysql.connector import Error
+from utils.database import get_db, fetch_all, transaction
+from utils.cache import register_invalidator
+from config import SCHEDULE_CONFIG
+
+logger = logging.getLogger(__name__)
+
+TABLE = 'jadwal_masuk'
+ALL_TINGKAT = ''
+ALL_DAYS = 0
+HADIR = 'Hadir'
+TERLAMBAT = 'Terlambat'
+
+_lock = threading.Lock()
+_schedules = None  # (tingkat, hari) -> (jam_masuk: time, toleransi_menit)
+_loaded = 0.0
+_table_ready = False
+
+
+def ensure_schedule_table():
+    """Buat tabel jadwal_masuk jika belum ada"""
+    global _table_ready
+    if _table_ready:
+        return True
+    conn = get_db()
+    if not conn:
+        return False
+    cursor = conn.cursor()
+    try:
+        cursor.execute(f"""
+            CREATE TABLE IF NOT EXISTS `{TABLE}` (
+                id INT AUTO_INCREMENT PRIMARY KEY,
+                tingkat VARCHAR(2) NOT NULL DEFAULT '',
+                hari TINYINT NOT NULL DEFAULT 0,
+                jam_masuk TIME NOT NULL,
+                toleransi_menit SMALLINT NOT NULL DEFAULT 0,
+                UNIQUE KEY uniq_tingkat_hari (tingkat, hari)
+            )
+        """)
+        _table_ready = True
+        return True
+    except Error as e:
+        logger.error(f"Create schedule table error: {e}")
+        return False
+    finally:
+        cursor.close()
+        conn.close()
+
+
+def _as_time(value):
+    """Kolom TIME dibaca mysql.connector sebagai timedelta"""
+    if isinstance(value, timedelta):
+        return (datetime.min + value).time()
+    return value
+
+
+def _default_entry():
+    start = datetime.strptime(SCHEDULE_CONFIG['default_start'], '%H:%M').time()
+    return start, SCHEDULE_CONFIG['default_grace_minutes']
+
+
+def load_schedules():
+    """Muat semua jadwal dari database ke cache"""
+    global _schedules, _loaded
+    rows = fetch_all(f"SELECT tingkat, hari, jam_masuk, toleransi_menit FROM `{TABLE}`", strict=True) \
+        if ensure_schedule_table() else None
+    if rows is None:
+        # Database/tabel belum siap: pakai jadwal default, coba lagi setelah TTL
+        logger.warning("Jadwal masuk tidak bisa dibaca, memakai jadwal default")
+        rows = []
+
+    schedules = {
+        (str(row['tingkat']), row['hari']): (_as_time(row['jam_masuk']), row['toleransi_menit'])
+        for row in rows
+    }
+    with _lock:
+        _schedules = schedules
+        _loaded = time.monotonic()
+    return schedules
+
+
+def get_schedules():
+    """Cache jadwal; dimuat ulang jika kosong/diinvalidasi/kedaluwarsa"""
+    with _lock:
+        schedules = _schedules
+        fresh = schedules is not None and time.monotonic() - _loaded < SCHEDULE_CONFIG['ttl_seconds']
+    if fresh:
+        return schedules
+    return load_schedules()
+
+
+def invalidate_schedules():
+    """Paksa jadwal dimuat ulang pada pemakaian berikutnya"""
+    global _schedules
+    with _lock:
+        _schedules = None
+
+
+def _schedule_stats():
+    with _lock:
+        return {'warm': _schedules is not None, 'entries': len(_schedules or {})}
+
+
+register_invalidator('schedules', invalidate_schedules, stats=_schedule_stats)
+
+
+def schedule_for(tingkat, day):
+    """(jam_masuk, toleransi_menit) yang berlaku untuk tingkat pada tanggal day"""
+    schedules = get_schedules()
+    tingkat = str(tingkat) if tingkat is not None else ALL_TINGKAT
+    hari = day.isoweekday()
+    for key in ((tingkat, hari), (tingkat, ALL_DAYS), (ALL_TINGKAT, hari), (ALL_TINGKAT, ALL_DAYS)):
+        entry = schedules.get(key)
+        if entry:
+            return entry
+    return _default_entry()
+
+
+def classify_arrival(tingkat, now=None):
+    """
+    Status absensi scan untuk siswa di tingkat (None jika tanpa kelas):
+    'Hadir' atau 'Terlambat' jika now melewati jam masuk + toleransi.
+    Return (status, jam_masuk).
+    """
+    now = now or datetime.now()
+    jam_masuk, toleransi = schedule_for(tingkat, now.date())
+    batas = datetime.combine(now.date(), jam_masuk) + timedelta(minutes=toleransi)
+    return (TERLAMBAT if now > batas else HADIR), jam_masuk
+
+
+def list_schedules():
+    """Semua jadwal tersimpan beserta default"""
+    start, grace = _default_entry()
+    entries = [
+        {
+            'tingkat': tingkat or None,
+            'hari': hari or None,
+            'jam_masuk': jam_masuk.strftime('%H:%M'),
+            'toleransi_menit': toleransi,
+        }
+        for (tingkat, hari), (jam_masuk, toleransi) in sorted(get_schedules().items())
+    ]
+    return {
+        'default': {'jam_masuk': start.strftime('%H:%M'), 'toleransi_menit': grace},
+        'schedules': entries,
+    }
+
+
+def parse_entry(entry):
+    """Validasi satu entri jadwal dari request; raise ValueError jika tidak valid"""
+    tingkat = entry.get('tingkat')
+    tingkat = ALL_TINGKAT if tingkat in (None, '') else str(tingkat)
+    if tingkat not in (ALL_TINGKAT, '1', '2', '3'):
+        raise ValueError("tingkat harus 1, 2, 3 atau kosong (semua tingkat)")
+
+    hari = entry.get('hari') or ALL_DAYS
+    if not isinstance(hari, int) or not 0 <= hari <= 7:
+        raise ValueError("hari harus 1 (Senin) - 7 (Minggu) atau kosong (semua hari)")
+
+    try:
+        jam_masuk = datetime.strptime(str(entry.get('jam_masuk')), '%H:%M').time()
+    except ValueError:
+        raise ValueError("jam_masuk harus berformat HH:MM")
+
+    toleransi = entry.get('toleransi_menit', 0)
+    if not isinstance(toleransi, int) or not 0 <= toleransi <= 240:
+        raise ValueError("toleransi_menit harus 0 - 240")
+    return tingkat, hari, jam_masuk, toleransi
+
+
+def set_schedules(entries, replace=False):
+    """
+    Simpan entri jadwal (upsert per tingkat+hari). replace=True menghapus
+    jadwal lain yang tidak ada di entries. Cache langsung dikosongkan.
+    """
+    parsed = [parse_entry(entry) for entry in entries]
+    if not ensure_schedule_table():
+        raise RuntimeError("Tabel jadwal_masuk tidak tersedia")
+
+    with transaction() as tx:
+        if replace:
+            tx.execute(f"DELETE FROM `{TABLE}`")
+        if parsed:
+            tx.executemany(f"""
+                INSERT INTO `{TABLE}` (tingkat, hari, jam_masuk, toleransi_menit)
+                VALUES (%s, %s, %s, %s)
+                ON DUPLICATE KEY UPDATE
+                    jam_masuk = VALUES(jam_masuk),
+                    toleransi_menit = VALUES(toleransi_menit)
+            """, parsed)
+
+    invalidate_schedules()
+    return list_schedules()
+
+
+def delete_schedule(tingkat=None, hari=None):
+    """Hapus satu entri jadwal; return True jika ada yang dihapus"""
+    tingkat = ALL_TINGKAT if tingkat in (None, '') else str(tingkat)
+    with transaction() as tx:
+        deleted = tx.execute(f"DELETE FROM `{TABLE}` WHERE tingkat = %s AND hari = %s",
+                             (tingkat, hari or ALL_DAYS))
+    invalidate_schedules()
+    return bool(deleted)
@@ -0,0 +1,280 @@
+# utils/schema.py
+"""
+Index manager untuk tabel Absensi API
+
+Mendeklarasikan index/unique key yang dibutuhkan query hot path
+(scanner, attendance, qrcode), membuat index yang belum ada, dan
+memverifikasi lewat EXPLAIN bahwa query utama benar-benar memakainya.
+Hasil pemeriksaan terakhir disimpan di memori untuk /api/debug/performance.
+
+Jalankan manual:
+
+    python -m utils.schema            # cek saja
+    python -m utils.schema --apply    # buat index yang belum ada
+"""
+
+import logging
+import threading
+from datetime import date, datetime
+from mysql.connector import Error
+from utils.database import get_db
+
+logger = logging.getLogger(__name__)
+
+# (table, nama index, kolom, unique)
+REQUIRED_INDEXES = [
+    ('siswa', 'nis', ('nis',), True),
+    ('siswa', 'nisn', ('nisn',), True),
+    ('siswa', 'kelas_id', ('kelas_id',), False),
+    ('absensi', 'uniq_siswa_tanggal', ('siswa_id', 'tanggal'), True),
+    ('absensi', 'idx_tanggal', ('tanggal',), False),
+    ('kelas', 'idx_wali_kelas', ('wali_kelas_id',), False),
+]
+
+# Query utama yang harus memakai index: (nama, sql, params, alias tabel di EXPLAIN)
+KEY_QUERIES = [
+    (
+        'scanner.find_student_by_nisn',
+        "SELECT id, nis, nisn, nama, gender, kelas_id FROM siswa WHERE nisn = %s",
+        ('0000000000',), 'siswa',
+    ),
+    (
+        'scanner.find_student_by_nis',
+        "SELECT id, nis, nisn, nama, gender, kelas_id FROM siswa WHERE nis = %s",
+        ('0',), 'siswa',
+    ),
+    (
+        'scanner.attended_today',
+        "SELECT id FROM absensi WHERE siswa_id = %s AND tanggal = %s",
+        (0, date(2000, 1, 1)), 'absensi',
+    ),
+    (
+        'attendance.today',
+        """SELECT a.*, s.nama FROM absensi a
+           JOIN siswa s ON a.siswa_id = s.id
+           WHERE a.tanggal = %s""",
+        (date(2000, 1, 1),), 'a',
+    ),
+    (
+        'attendance.statistics_range',
+        "SELECT tanggal, COUNT(*) FROM absensi WHERE tanggal BETWEEN %s AND %s GROUP BY tanggal",
+        (date(2000, 1, 1), date(2000, 1, 31)), 'absensi',
+    ),
+    (
+        'attendance.student_history',
+        "SELECT tanggal, waktu, status FROM absensi WHERE siswa_id = %s ORDER BY tanggal DESC LIMIT 10",
+        (0,), 'absensi',
+    ),
+    (
+        'qrcode.generate_by_nis',
+        "SELECT id, nis, nisn, nama, gender, kelas_id, card_version FROM siswa WHERE nis = %s",
+        ('0',), 'siswa',
+    ),
+    (
+        'classes.by_wali_kelas',
+        "SELECT id, nama_kelas FROM kelas WHERE wali_kelas_id = %s",
+        (0,), 'kelas',
+    ),
+]
+
+_report_lock = threading.Lock()
+_last_report = None
+
+
+def _existing_indexes(cursor):
+    """Return {(table, index_name): (kolom..., unique)} dari information_schema"""
+    cursor.execute("""
+        SELECT TABLE_NAME, INDEX_NAME, COLUMN_NAME, NON_UNIQUE
+        FROM information_schema.STATISTICS
+        WHERE TABLE_SCHEMA = DATABASE()
+        ORDER BY TABLE_NAME, INDEX_NAME, SEQ_IN_INDEX
+    """)
+    indexes = {}
+    for row in cursor.fetchall():
+        key = (row['TABLE_NAME'], row['INDEX_NAME'])
+        columns, _ = indexes.get(key, ((), True))
+        indexes[key] = (columns + (row['COLUMN_NAME'],), not row['NON_UNIQUE'])
+    return indexes
+
+
+def _find_covering(indexes, table, columns, unique):
+    """Cari index yang memenuhi kebutuhan (kolom awal sama; unique harus persis)"""
+    for (index_table, index_name), (index_columns, index_unique) in indexes.items():
+        if index_table != table:
+            continue
+        if unique:
+            if index_unique and index_columns == columns:
+                return index_name
+        elif index_columns[:len(columns)] == columns:
+            return index_name
+    return None
+
+
+def has_unique_index(table, columns):
+    """True jika table punya unique index persis pada columns; None jika gagal dicek"""
+    conn = get_db()
+    if not conn:
+        return None
+    cursor = conn.cursor(dictionary=True)
+    try:
+        return _find_covering(_existing_indexes(cursor), table, tuple(columns), True) is not None
+    except Error as e:
+        logger.error(f"Cek unique index {table} error: {e}")
+        return None
+    finally:
+        cursor.close()
+        conn.close()
+
+
+def ensure_indexes(apply=False):
+    """Cek index yang dibutuhkan; buat yang belum ada jika apply=True"""
+    conn = get_db()
+    if not conn:
+        return {'error': 'Database connection failed'}
+
+    results = []
+    cursor = conn.cursor(dictionary=True)
+    try:
+        indexes = _existing_indexes(cursor)
+        for table, name, columns, unique in REQUIRED_INDEXES:
+            item = {
+                'table': table,
+                'index': name,
+                'columns': list(columns),
+                'unique': unique,
+            }
+            covering = _find_covering(indexes, table, columns, unique)
+            if covering:
+                item['status'] = 'ok'
+                item['existing_index'] = covering
+            elif not apply:
+                item['status'] = 'missing'
+            else:
+                kind = 'UNIQUE INDEX' if unique else 'INDEX'
+                column_list = ', '.join(f'`{c}`' for c in columns)
+                try:
+                    cursor.execute(f"ALTER TABLE `{table}` ADD {kind} `{name}` ({column_list})")
+                    item['status'] = 'created'
+                    logger.info(f"Index created: {table}.{name} ({column_list})")
+                except Error as e:
+                    item['status'] = 'error'
+                    item['error'] = str(e)
+                    logger.error(f"Create index {table}.{name} failed: {e}")
+            results.append(item)
+    finally:
+        cursor.close()
+        conn.close()
+
+    return {'indexes': results}
+
+
+def _uses_index(row):
+    """
+    Baris EXPLAIN memakai index. Parameter contoh tidak cocok dengan baris
+    mana pun, sehingga lookup unique/const bisa tampil dengan key=NULL dan
+    Extra 'no matching row in const table' / 'Impossible WHERE ...': index
+    tetap dipakai untuk memastikan barisnya tidak ada.
+    """
+    extra = (row.get('Extra') or '').lower()
+    if row.get('type') in ('system', 'const', 'eq_ref'):
+        return True
+    if 'no matching row' in extra or 'impossible where' in extra or 'const row not found' in extra:
+        return True
+    return bool(row.get('key')) and row.get('type') != 'ALL'
+
+
+def verify_query_plans():
+    """EXPLAIN query utama dan pastikan masing-masing memakai index"""
+    conn = get_db()
+    if not conn:
+        return [{'error': 'Database connection failed'}]
+
+    plans = []
+    cursor = conn.cursor(dictionary=True)
+    try:
+        for name, sql, params, table in KEY_QUERIES:
+            item = {'query': name}
+            try:
+                cursor.execute(f"EXPLAIN {sql}", params)
+                rows = cursor.fetchall()
+                row = next((r for r in rows if r.get('table') == table), rows[0] if rows else {})
+                item.update({
+                    'table': row.get('table'),
+                    'type': row.get('type'),
+                    'key': row.get('key'),
+                    'rows': row.get('rows'),
+                    'extra': row.get('Extra'),
+                    'uses_index': _uses_index(row),
+                })
+            except Error as e:
+                item.update({'uses_index': False, 'error': str(e)})
+            plans.append(item)
+    finally:
+        cursor.close()
+        conn.close()
+
+    return plans
+
+
+def check_schema(apply=False):
+    """Jalankan cek index + EXPLAIN, simpan hasilnya sebagai laporan terakhir"""
+    global _last_report
+
+    index_result = ensure_indexes(apply=apply)
+    plans = verify_query_plans()
+
+    problems = []
+    if 'error' in index_result:
+        problems.append(index_result['error'])
+    for item in index_result.get('indexes', []):
+        if item['status'] in ('missing', 'error'):
+            problems.append(
+                f"Index {item['table']}.{item['index']} ({', '.join(item['columns'])}) {item['status']}"
+                + (f": {item['error']}" if item.get('error') else '')
+            )
+    for plan in plans:
+        if 'query' in plan and not plan.get('uses_index'):
+            problems.append(f"Query {plan['query']} tidak memakai index (type={plan.get('type')})")
+
+    report = {
+        'checked_at': datetime.now().isoformat(),
+        'healthy': not problems,
+        'problems': problems,
+        'indexes': index_result.get('indexes', []),
+        'query_plans': plans,
+    }
+    with _report_lock:
+        _last_report = report
+    return report
+
+
+def get_schema_report():
+    """Laporan pemeriksaan terakhir (None jika belum pernah dicek)"""
+    with _report_lock:
+        return _last_report
+
+
+def check_schema_async(apply=False):
+    """Jalankan check_schema di background thread (dipakai saat startup)"""
+    def run():
+        try:
+            report = check_schema(apply=apply)
+            for problem in report['problems']:
+                logger.warning(f"Schema check: {problem}")
+        except Exception as e:
+            logger.error(f"Schema check error: {e}")
+
+    thread = threading.Thread(target=run, name='schema-check', daemon=True)
+    thread.start()
+    return thread
+
+
+if __name__ == '__main__':
+    import argparse
+    import json
+
+    parser = argparse.ArgumentParser(description='Cek/buat index yang dibutuhkan Absensi API')
+    parser.add_argument('--apply', action='store_true', help='Buat index yang belum ada')
+    args = parser.parse_args()
+
+    print(json.dumps(check_schema(apply=args.apply), indent=2, default=str))
@@ -0,0 +1,390 @@
+# utils/search.py
+"""
+Index pencarian in-memory untuk siswa dan guru (/api/search)
+
+Nama, NIS, NISN dan NIP dinormalisasi (huruf kecil, tanpa aksen dan
+tanda baca) lalu dipecah menjadi token. Setiap token kueri dicocokkan
+dengan kosakata index secara bertingkat:
+
+    exact       token sama persis                        skor 1.0
+    prefix      token diawali kueri (search-as-you-type) skor 0.7 - 0.9
+    typo        jarak edit 1 (kueri >= 4 huruf)          skor 0.6
+    infix       kueri muncul di tengah token (>= 3 char) skor 0.5
+
+Prefix memakai kosakata terurut + bisect, typo memakai index deletion
+(setiap token huruf disimpan juga dalam bentuk "dihapus satu huruf"),
+infix memakai trigram kosakata. Semua token kueri harus cocok (AND);
+skor akhir adalah rata-rata skor token.
+
+Index dibangun dari database saat pertama dipakai (atau di background
+saat startup) dan diperbarui per record oleh endpoint tulis siswa/guru.
+Perubahan massal (restore, fix-nisn, cleanup) memanggil invalidate_all()
+sehingga index dibangun ulang di background sementara pencarian tetap
+dilayani index lama. Index juga dibangun ulang setelah
+SEARCH_CONFIG['ttl_seconds'] agar perubahan dari worker lain atau dari
+luar API (PHP, import langsung) ikut masuk.
+"""
+
+import heapq
+import logging
+import re
+import threading
+import time
+import unicodedata
+from bisect import bisect_left, insort
+from datetime import datetime
+from utils.database import fetch_one, fetch_all
+from utils.cache import register_invalidator
+from config import SEARCH_CONFIG
+
+logger = logging.getLogger(__name__)
+
+TYPES = ('siswa', 'guru')
+
+STUDENT_QUERY = """
+    SELECT s.id, s.nis, s.nisn, s.nama, s.kelas_id, k.nama_kelas as kelas, s.gender
+    FROM siswa s
+    LEFT JOIN kelas k ON s.kelas_id = k.id
+"""
+TEACHER_QUERY = "SELECT id, nip, nama, telp, email FROM guru"
+
+_APOSTROPHE = re.compile(r"['`’]")
+_NON_ALNUM = re.compile(r'[^a-z0-9]+')
+
+
+def normalize(text):
+    """'Muh. Ma'ruf Ñ' -> ['muh', 'maruf', 'n']"""
+    if not text:
+        return []
+    text = unicodedata.normalize('NFKD', str(text))
+    text = ''.join(c for c in text if not unicodedata.combining(c)).lower()
+    return _NON_ALNUM.sub(' ', _APOSTROPHE.sub('', text)).split()
+
+
+def _deletes(token):
+    return {token[:i] + token[i + 1:] for i in range(len(token))}
+
+
+def _trigrams(token):
+    return {token[i:i + 3] for i in range(len(token) - 2)}
+
+
+def _within_one_edit(a, b):
+    """Jarak Damerau (optimal string alignment) antara a dan b <= 1"""
+    if a == b:
+        return True
+    la, lb = len(a), len(b)
+    if abs(la - lb) > 1:
+        return False
+    i = 0
+    while i < min(la, lb) and a[i] == b[i]:
+        i += 1
+    if la == lb:
+        if a[i + 1:] == b[i + 1:]:
+            return True  # substitusi
+        return a[i:i + 2] == b[i:i + 2][::-1] and a[i + 2:] == b[i + 2:]  # transposisi
+    if la > lb:
+        return a[i + 1:] == b[i:]
+    return a[i:] == b[i + 1:]
+
+
+class SearchIndex:
+    """Struktur index; tidak thread-safe, akses lewat fungsi modul"""
+
+    def __init__(self):
+        self.docs = {}         # (type, id) -> payload response
+        self.doc_tokens = {}   # (type, id) -> set token
+        self.postings = {}     # token -> set (type, id)
+        self.vocab = []        # token terurut untuk pencarian prefix
+        self.deletions = {}    # token dengan satu huruf dihapus -> set token
+        self.trigrams = {}     # trigram -> set token
+
+    def __len__(self):
+        return len(self.docs)
+
+    def _add_token(self, token):
+        insort(self.vocab, token)
+        if token.isalpha() and len(token) >= SEARCH_CONFIG['typo_min_length']:
+            for variant in _deletes(token):
+                self.deletions.setdefault(variant, set()).add(token)
+        for gram in _trigrams(token):
+            self.trigrams.setdefault(gram, set()).add(token)
+
+    def _drop_token(self, token):
+        del self.postings[token]
+        del self.vocab[bisect_left(self.vocab, token)]
+        if token.isalpha() and len(token) >= SEARCH_CONFIG['typo_min_length']:
+            for variant in _deletes(token):
+                self._discard(self.deletions, variant, token)
+        for gram in _trigrams(token):
+            self._discard(self.trigrams, gram, token)
+
+    @staticmethod
+    def _discard(mapping, key, value):
+        values = mapping.get(key)
+        if values is not None:
+            values.discard(value)
+            if not values:
+                del mapping[key]
+
+    def add(self, doc_type, doc, fields):
+        key = (doc_type, doc['id'])
+        self.remove(key)
+        tokens = set()
+        for value in fields:
+            tokens.update(normalize(value))
+        self.docs[key] = {'type': doc_type, **doc}
+        self.doc_tokens[key] = tokens
+        for token in tokens:
+            if token not in self.postings:
+                self.postings[token] = set()
+                self._add_token(token)
+            self.postings[token].add(key)
+
+    def remove(self, key):
+        tokens = self.doc_tokens.pop(key, None)
+        if tokens is None:
+            return False
+        del self.docs[key]
+        for token in tokens:
+            keys = self.postings[token]
+            keys.discard(key)
+            if not keys:
+                self._drop_token(token)
+        return True
+
+    def _candidates(self, query):
+        """token kosakata -> skor untuk satu token kueri"""
+        matches = {}
+        if query in self.postings:
+            matches[query] = 1.0
+
+        i = bisect_left(self.vocab, query)
+        vocab = self.vocab
+        while i < len(vocab) and vocab[i].startswith(query):
+            token = vocab[i]
+            if token != query:
+                matches[token] = 0.7 + 0.2 * len(query) / len(token)
+            i += 1
+
+        if query.isalpha() and len(query) >= SEARCH_CONFIG['typo_min_length']:
+            typo = set(self.deletions.get(query, ()))
+            for variant in _deletes(query):
+                typo.update(self.deletions.get(variant, ()))
+                if variant in self.postings:
+                    typo.add(variant)
+            for token in typo:
+                if token not in matches and _within_one_edit(query, token):
+                    matches[token] = 0.6
+
+        if len(query) >= 3:
+            grams = sorted((self.trigrams.get(g, set()) for g in _trigrams(query)), key=len)
+            if grams and grams[0]:
+                for token in grams[0].intersection(*grams[1:]):
+                    if token not in matches and query in token:
+                        matches[token] = 0.5
+        return matches
+
+    def search(self, query_tokens, doc_type=None, limit=20):
+        scores = None
+        for query in query_tokens:
+            token_scores = {}
+            for token, score in self._candidates(query).items():
+                for key in self.postings[token]:
+                    if doc_type and key[0] != doc_type:
+                        continue
+                    if scores is not None and key not in scores:
+                        continue
+                    if token_scores.get(key, 0) < score:
+                        token_scores[key] = score
+            if scores is not None:
+                token_scores = {key: scores[key] + s for key, s in token_scores.items()}
+            scores = token_scores
+            if not scores:
+                return 0, []
+
+        n = len(query_tokens)
+        best = heapq.nsmallest(
+            limit, scores.items(),
+            key=lambda item: (-item[1], self.docs[item[0]]['nama'] or '', item[0]),
+        )
+        return len(scores), [{**self.docs[key], 'score': round(score / n, 3)} for key, score in best]
+
+
+_lock = threading.Lock()
+_build_lock = threading.Lock()  # build pertama cukup dijalankan satu request
+_index = None
+_built_at = None
+_built_mono = 0.0  # time.monotonic() saat index aktif dibangun
+_build_ms = None
+_stale = False
+_dirty_during_build = False
+_rebuilding = False
+
+
+def _student_doc(row):
+    doc = {
+        'id': row['id'],
+        'nis': row['nis'],
+        'nisn': row['nisn'],
+        'nama': row['nama'],
+        'kelas_id': row['kelas_id'],
+        'kelas': row['kelas'],
+        'gender': row['gender'],
+    }
+    return doc, (row['nama'], row['nis'], row['nisn'])
+
+
+def _teacher_doc(row):
+    doc = {
+        'id': row['id'],
+        'nip': row['nip'],
+        'nama': row['nama'],
+        'telp': row['telp'],
+        'email': row['email'],
+    }
+    return doc, (row['nama'], row['nip'])
+
+
+def build_index():
+    """Bangun index baru dari database dan ganti index aktif"""
+    global _index, _built_at, _built_mono, _build_ms, _stale, _dirty_during_build
+    start = time.perf_counter()
+    with _lock:
+        _dirty_during_build = False
+
+    students = fetch_all(STUDENT_QUERY, strict=True)
+    teachers = fetch_all(TEACHER_QUERY, strict=True)
+    if students is None or teachers is None:
+        raise RuntimeError("Gagal membaca siswa/guru dari database")
+
+    index = SearchIndex()
+    for row in students:
+        index.add('siswa', *_student_doc(row))
+    for row in teachers:
+        index.add('guru', *_teacher_doc(row))
+
+    with _lock:
+        _index = index
+        _built_at = datetime.now().isoformat(timespec='seconds')
+        _built_mono = time.monotonic()
+        _build_ms = round((time.perf_counter() - start) * 1000, 1)
+        # Update per record selama build bisa tertimpa; bangun ulang lagi nanti
+        _stale = _dirty_during_build
+    logger.info(f"Search index dibangun: {len(students)} siswa, {len(teachers)} guru ({_build_ms} ms)")
+    return index
+
+
+def _rebuild_async():
+    global _rebuilding
+    with _lock:
+        if _rebuilding:
+            return
+        _rebuilding = True
+
+    def run():
+        global _rebuilding
+        try:
+            build_index()
+        except Exception as e:
+            logger.error(f"Search index rebuild error: {e}")
+        finally:
+            with _lock:
+                _rebuilding = False
+
+    threading.Thread(target=run, name='search-index', daemon=True).start()
+
+
+def build_index_async():
+    """Bangun index di background (dipanggil saat startup)"""
+    _rebuild_async()
+
+
+def _get_index():
+    with _lock:
+        index, stale = _index, _stale
+        expired = time.monotonic() - _built_mono >= SEARCH_CONFIG['ttl_seconds']
+    if index is None:
+        with _build_lock:
+            return _index or build_index()
+    if stale or expired:
+        _rebuild_async()
+    return index
+
+
+def search(q, doc_type=None, limit=20):
+    """
+    Cari siswa/guru; return (total_cocok, hasil). doc_type: 'siswa',
+    'guru' atau None untuk keduanya. Hasil diurutkan skor lalu nama.
+    """
+    tokens = normalize(q)
+    if not tokens:
+        return 0, []
+    index = _get_index()
+    with _lock:
+        return index.search(tokens, doc_type=doc_type, limit=limit)
+
+
+def _apply(change):
+    """Jalankan perubahan per record pada index aktif (jika sudah dibangun)"""
+    global _dirty_during_build
+    with _lock:
+        if _index is None:
+            return
+        change(_index)
+        _dirty_during_build = True
+
+
+def refresh_student(student_id):
+    """Muat ulang satu siswa dari database ke index"""
+    row = fetch_one(f"{STUDENT_QUERY} WHERE s.id = %s", (student_id,))
+    if row:
+        _apply(lambda index: index.add('siswa', *_student_doc(row)))
+    else:
+        # Tidak bisa dibedakan antara record terhapus dan query gagal
+        invalidate_search_index()
+
+
+def remove_student(student_id):
+    _apply(lambda index: index.remove(('siswa', student_id)))
+
+
+def refresh_teacher(teacher_id):
+    """Muat ulang satu guru dari database ke index"""
+    row = fetch_one(f"{TEACHER_QUERY} WHERE id = %s", (teacher_id,))
+    if row:
+        _apply(lambda index: index.add('guru', *_teacher_doc(row)))
+    else:
+        # Tidak bisa dibedakan antara record terhapus dan query gagal
+        invalidate_search_index()
+
+
+def remove_teacher(teacher_id):
+    _apply(lambda index: index.remove(('guru', teacher_id)))
+
+
+def invalidate_search_index():
+    """Tandai index basi; dibangun ulang di background saat pencarian berikutnya"""
+    global _stale
+    with _lock:
+        _stale = True
+
+
+def get_index_stats():
+    with _lock:
+        index = _index
+        stats = {
+            'warm': index is not None,
+            'stale': _stale,
+            'built_at': _built_at,
+            'build_ms': _build_ms,
+        }
+        if index is not None:
+            stats.update({
+                'documents': len(index),
+                'tokens': len(index.vocab),
+            })
+    return stats
+
+
+register_invalidator('search_index', invalidate_search_index, stats=get_index_stats)